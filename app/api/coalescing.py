@@ -0,0 +1,44 @@
+from concurrent.futures import Future
+from typing import Any, Callable, Hashable
+import threading
+
+
+class RequestCoalescer:
+    """Lets concurrent callers with the same key share one computation.
+
+    The first caller for a key computes the value; callers arriving while it runs wait for
+    that result (or its exception) instead of starting their own. Nothing is kept after the
+    computation finishes, so the next caller computes again.
+    """
+
+    def __init__(self):
+        """Initializes the coalescer with no computations in flight."""
+        self._lock = threading.Lock()
+        self._in_flight: dict[Hashable, Future] = {}
+
+    def run(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Returns the result of `compute`, shared with concurrent calls for the same key.
+
+        Args:
+            key (Hashable): Identifies computations with the same result.
+            compute (Callable[[], Any]): Computes the result.
+
+        Returns:
+            Any: The result of this or of the concurrently running computation.
+        """
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = self._in_flight[key] = Future()
+        if not owner:
+            return future.result()
+
+        try:
+            future.set_result(compute())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._in_flight[key]
+        return future.result()
@@ -0,0 +1,361 @@
+from collections import OrderedDict
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Hashable, Mapping
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import hashlib
+import json
+import logging
+import threading
+import time
+
+from app.api.coalescing import RequestCoalescer
+from app.file_manager.file_watcher import FileWatcher
+from app.file_manager.snapshot_cache import SnapshotCache, snapshot_cache
+from app.model.agency import Agency, AgencyChanges, AgencyRepo, agency_repo
+from app.persistence.dao import AgencyDbRepo, TripDbDao, summary_dao, trip_db_dao
+from app.persistence.model import Trip
+from app.service.agency_service import AgencyService
+from app.service.report_snapshots import ReportSnapshots
+
+logger = logging.getLogger(__name__)
+
+
+def _int(text: str) -> int:
+    """Parses a positive integer query parameter."""
+    value = int(text)
+    if value <= 0:
+        raise ValueError(f"must be positive: {text}")
+    return value
+
+
+def _percentiles(text: str) -> tuple[float, ...]:
+    """Parses a comma-separated list of percentiles between 0 and 100; integral values stay ints."""
+    values = tuple(float(part) for part in text.split(','))
+    if not all(0 <= value <= 100 for value in values):
+        raise ValueError(f"percentiles must be between 0 and 100: {text}")
+    return tuple(int(value) if value.is_integer() else value for value in values)
+
+
+# Reports served by the API: query parameters with their parser and default value.
+REPORTS: dict[str, dict[str, tuple[Callable[[str], Any], Any]]] = {
+    'offer': {},
+    'top_k_agencies_by_trips': {'k': (_int, 10)},
+    'find_agency_with_max_trips': {},
+    'top_k_agencies_by_income': {'k': (_int, 10)},
+    'find_agency_with_max_income': {},
+    'top_k_countries': {'k': (_int, 10)},
+    'find_country_with_max_trips': {},
+    'mean_report_for_agencies': {},
+    'percentile_report_for_agencies': {'percentiles': (_percentiles, (50,))},
+    'percentile_report_for_destinations': {'percentiles': (_percentiles, (50,))},
+    'median_report_for_agencies': {},
+    'report_agencies_with_max_trips_for_each_country': {},
+    'report_trips_for_people_quantity': {},
+}
+
+
+def to_json(value: Any) -> Any:
+    """Converts a report into JSON-compatible values.
+
+    Agencies become `{id, name}`, or their ID when used as a key since names need not be
+    unique. Trips become an object of their fields, decimals strings so that no precision is
+    lost, and sets lists in a stable order.
+
+    Args:
+        value (Any): Report or part of a report.
+
+    Returns:
+        Any: Value serializable by `json.dumps`.
+    """
+    if isinstance(value, dict):
+        return {str(key.id if isinstance(key, Agency) else key): to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted((to_json(item) for item in value), key=lambda item: json.dumps(item, sort_keys=True))
+    if isinstance(value, Agency):
+        return {'id': value.id, 'name': value.name}
+    if isinstance(value, Trip):
+        return {'id': value.id, 'destination': value.destination, 'price': to_json(value.price),
+                'num_of_people': value.num_of_people, 'agency_id': value.agency_id}
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class ReportApi:
+    """Serves `AgencyService` reports as JSON, independently of the HTTP server.
+
+    The data versions of the trips and agencies are checked at most once per `version_ttl`
+    seconds, however many requests arrive. Each response carries an ETag derived from the
+    report, its arguments and the versions of its inputs: a request whose `If-None-Match`
+    matches gets `304 Not Modified` without computing anything. Encoded responses are kept
+    in memory per version, concurrent requests for the same missing response share one
+    computation, and reports are read through `ReportSnapshots`, so a restart does not
+    recompute reports of unchanged data either.
+
+    The service is reused while the data versions it was created for are current. With
+    `watch_agencies`, a changed agency file re-keys the offer of that service instead of
+    loading the trips again.
+    """
+
+    def __init__(self, service_factory: Callable[[], AgencyService], trip_db_dao: TripDbDao,
+                 agency_repo: AgencyRepo | AgencyDbRepo, cache: SnapshotCache | None = snapshot_cache,
+                 version_ttl: float = 5.0, max_responses: int = 256, clock: Callable[[], float] = time.monotonic):
+        """Initializes the API without reading any data.
+
+        Args:
+            service_factory (Callable[[], AgencyService]): Creates the service computing the reports.
+            trip_db_dao (TripDbDao): DAO of the trips the reports are computed from.
+            agency_repo (AgencyRepo | AgencyDbRepo): Repository of the agencies the reports are computed from.
+            cache (SnapshotCache | None): Store of the report snapshots. None keeps responses in memory only.
+            version_ttl (float): Seconds during which checked data versions are trusted.
+            max_responses (int): Number of encoded responses kept in memory.
+            clock (Callable[[], float]): Monotonic clock in seconds.
+        """
+        self._service_factory = service_factory
+        self._trip_db_dao = trip_db_dao
+        self._agency_repo = agency_repo
+        self._cache = cache
+        self._version_ttl = version_ttl
+        self._max_responses = max_responses
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._snapshots: ReportSnapshots | None = None
+        self._checked_at = 0.0
+        self._invalidations = 0
+        self._responses: OrderedDict[Hashable, bytes] = OrderedDict()
+        self._coalescer = RequestCoalescer()
+        self._service_lock = threading.Lock()
+        self._service: tuple[tuple[Hashable, ...] | None, AgencyService] | None = None
+
+    def handle(self, target: str, headers: Mapping[str, str]) -> tuple[int, dict[str, str], bytes]:
+        """Answers a GET request.
+
+        Routes are `/reports` (names of the reports) and `/reports/<name>?<arguments>`.
+
+        Args:
+            target (str): Request target, i.e. path and query string.
+            headers (Mapping[str, str]): Request headers.
+
+        Returns:
+            tuple[int, dict[str, str], bytes]: Status code, response headers and body.
+        """
+        url = urlsplit(target)
+        path = url.path.rstrip('/')
+        if path in ('', '/reports'):
+            return ReportApi._json(200, sorted(REPORTS))
+        name = path.removeprefix('/reports/')
+        if name == path or name not in REPORTS:
+            return ReportApi._json(404, {'error': f"Unknown report: {path}"})
+        try:
+            arguments = ReportApi._arguments(name, parse_qs(url.query))
+        except ValueError as e:
+            return ReportApi._json(400, {'error': str(e)})
+
+        try:
+            snapshots = self._current_snapshots()
+            version = snapshots.version(name)
+            key = (name, tuple(sorted(arguments.items())), version)
+            response_headers = {'Cache-Control': 'no-cache'}
+            if version is not None:
+                etag = f'"{hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:20]}"'
+                response_headers['ETag'] = etag
+                if ReportApi._matches(headers.get('If-None-Match'), etag):
+                    return 304, response_headers, b''
+            body = self._cached_response(key) if version is not None else None
+            if body is None:
+                body = self._coalescer.run(key, lambda: ReportApi._encode(snapshots.report(name, **arguments)))
+                if version is not None:
+                    self._store_response(key, body)
+        except Exception as e:
+            logger.error(f"Report {name} failed: {e!r}")
+            return ReportApi._json(500, {'error': f"Report {name} failed"})
+        return 200, {'Content-Type': 'application/json; charset=utf-8'} | response_headers, body
+
+    def _current_snapshots(self) -> ReportSnapshots:
+        """Returns the report snapshots, re-reading the data versions if they are older than `version_ttl`.
+
+        The previous snapshots, and with them an already created service, are kept while the
+        versions are known and unchanged. The versions are read without holding the lock, so
+        requests arriving meanwhile are answered from the previous snapshots.
+        """
+        with self._lock:
+            now = self._clock()
+            if self._snapshots is not None and now - self._checked_at < self._version_ttl:
+                return self._snapshots
+            invalidations = self._invalidations
+        # The service is created after the versions are read, so the factory sees `version`.
+        snapshots = ReportSnapshots(lambda: self._service_for(version),
+                                    self._trip_db_dao, self._agency_repo, self._cache)
+        version = snapshots.version('offer')
+        with self._lock:
+            if self._snapshots is None or version is None or version != self._snapshots.version('offer'):
+                self._snapshots = snapshots
+            if invalidations == self._invalidations:
+                self._checked_at = now
+            return self._snapshots
+
+    def _service_for(self, version: tuple[Hashable, ...] | None) -> AgencyService:
+        """Returns the service for the given data versions, reusing the last one if they match."""
+        with self._service_lock:
+            if self._service is None or version is None or self._service[0] != version:
+                self._service = version, self._service_factory()
+            return self._service[1]
+
+    def agencies_changed(self, changes: AgencyChanges | None = None) -> None:
+        """Re-keys the offer of the current service by the reloaded agencies.
+
+        The service stays valid for the new agency data version, and the data versions are
+        read again on the next request, so responses naming agencies are recomputed.
+
+        Args:
+            changes (AgencyChanges | None): Changes reported by the repository.
+        """
+        with self._service_lock:
+            if self._service is not None:
+                version, service = self._service
+                service.on_agencies_changed(changes)
+                self._service = (version[0], self._agency_repo.data_version()) if version else None, service
+        with self._lock:
+            self._checked_at = float('-inf')
+            self._invalidations += 1
+
+    def watch_agencies(self, interval: float = 1.0) -> FileWatcher:
+        """Starts reloading the agencies of an `AgencyRepo` whenever its file changes.
+
+        Args:
+            interval (float): Seconds between checks of the agency file.
+
+        Returns:
+            FileWatcher: The running watcher; call `stop()` to end watching.
+        """
+        return self._agency_repo.watch(interval, self.agencies_changed)
+
+    def _cached_response(self, key: Hashable) -> bytes | None:
+        """Returns a stored response body, marking it as recently used."""
+        with self._lock:
+            body = self._responses.get(key)
+            if body is not None:
+                self._responses.move_to_end(key)
+            return body
+
+    def _store_response(self, key: Hashable, body: bytes) -> None:
+        """Stores a response body, evicting the least recently used ones beyond `max_responses`."""
+        with self._lock:
+            self._responses[key] = body
+            self._responses.move_to_end(key)
+            while len(self._responses) > self._max_responses:
+                self._responses.popitem(last=False)
+
+    @staticmethod
+    def _arguments(name: str, query: dict[str, list[str]]) -> dict[str, Any]:
+        """Parses the query parameters of a report, filling in defaults.
+
+        Raises:
+            ValueError: If a parameter is unknown or invalid.
+        """
+        parameters = REPORTS[name]
+        unknown = sorted(set(query) - set(parameters))
+        if unknown:
+            raise ValueError(f"Unknown parameters for {name}: {', '.join(unknown)}")
+        arguments = {}
+        for parameter, (parse, default) in parameters.items():
+            if parameter not in query:
+                arguments[parameter] = default
+                continue
+            try:
+                arguments[parameter] = parse(query[parameter][-1])
+            except ValueError as e:
+                raise ValueError(f"Invalid {parameter}: {e}") from e
+        return arguments
+
+    @staticmethod
+    def _matches(if_none_match: str | None, etag: str) -> bool:
+        """Tells whether an `If-None-Match` header matches the ETag."""
+        if not if_none_match:
+            return False
+        tags = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+        return '*' in tags or etag in tags
+
+    @staticmethod
+    def _encode(value: Any) -> bytes:
+        """Encodes a report as UTF-8 JSON."""
+        return json.dumps(to_json(value), ensure_ascii=False).encode('utf-8')
+
+    @staticmethod
+    def _json(status: int, value: Any) -> tuple[int, dict[str, str], bytes]:
+        """Builds an uncached JSON response."""
+        return status, {'Content-Type': 'application/json; charset=utf-8', 'Cache-Control': 'no-store'}, \
+            ReportApi._encode(value)
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """Passes GET requests to the `ReportApi` of its `ReportServer`."""
+
+    server: 'ReportServer'
+
+    def do_GET(self) -> None:
+        """Answers a GET request."""
+        status, headers, body = self.server.api.handle(self.path, self.headers)
+        self.send_response(status)
+        for header, value in headers.items():
+            self.send_header(header, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Logs requests through `logging` instead of stderr."""
+        logger.info(f"{self.address_string()} {format % args}")
+
+
+class ReportServer(ThreadingHTTPServer):
+    """HTTP server answering each request in its own thread.
+
+    Attributes:
+        api (ReportApi): Answers the requests.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], api: ReportApi):
+        """Binds the server.
+
+        Args:
+            address (tuple[str, int]): Host and port; port 0 picks a free port.
+            api (ReportApi): Answers the requests.
+        """
+        super().__init__(address, ReportRequestHandler)
+        self.api = api
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Serves travel agency reports as JSON over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--version-ttl', type=float, default=5.0,
+                        help='seconds between checks of the trips and agencies versions (default: 5)')
+    parser.add_argument('--watch-agencies', type=float, default=1.0,
+                        help='seconds between checks of the agency file; 0 disables watching (default: 1)')
+    args = parser.parse_args()
+
+    api = ReportApi(lambda: AgencyService(agency_repo, trip_db_dao, summary_dao=summary_dao), trip_db_dao, agency_repo,
+                    version_ttl=args.version_ttl)
+    watcher = api.watch_agencies(args.watch_agencies) if args.watch_agencies > 0 else None
+    try:
+        with ReportServer((args.host, args.port), api) as server:
+            logger.info(f"Serving reports on http://{args.host}:{server.server_address[1]}/reports")
+            server.serve_forever()
+    finally:
+        if watcher is not None:
+            watcher.stop()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,215 @@
+"""Deterministic generator of large synthetic trip and agency datasets.
+
+Usage:
+    python -m app.data.generator trips trips.csv --rows 1000000 --invalid-rate 0.01 --seed 7
+    python -m app.data.generator agencies agencies.txt --count 500
+"""
+import argparse
+import csv
+import random
+from bisect import bisect_left
+from dataclasses import dataclass
+from decimal import Decimal
+from itertools import accumulate
+from typing import Iterator
+
+from app.persistence.model import Trip
+
+CSV_HEADER = ['id', 'destination', 'price', 'num_of_people', 'agency_id']
+CITIES = ['Warszawa', 'Kraków', 'Gdańsk', 'Wrocław', 'Poznań', 'Opole', 'Szczecin', 'Lublin', 'Katowice', 'Toruń']
+INVALID_KINDS = ['columns', 'type', 'destination', 'price', 'people']
+
+
+@dataclass(frozen=True)
+class GeneratorConfig:
+    """Parameters of a synthetic trips dataset.
+
+    Attributes:
+        rows (int): Number of data rows (without the header).
+        agencies (int): Number of agency IDs (1..agencies).
+        destinations (int): Number of distinct destinations.
+        zipf_s (float): Zipf exponent of destination and agency popularity; 0 gives a uniform distribution.
+        invalid_rate (float): Fraction of rows made invalid, between 0 and 1.
+        seed (int): Random seed; the same config always produces the same data.
+    """
+    rows: int = 100_000
+    agencies: int = 100
+    destinations: int = 200
+    zipf_s: float = 1.1
+    invalid_rate: float = 0.0
+    seed: int = 0
+
+
+class ZipfSampler:
+    """Samples 0-based ranks with probability proportional to 1 / (rank + 1) ** s."""
+
+    def __init__(self, n: int, s: float, rng: random.Random):
+        """Precomputes cumulative weights.
+
+        Args:
+            n (int): Number of ranks.
+            s (float): Zipf exponent.
+            rng (random.Random): Source of randomness.
+        """
+        self._cumulative = list(accumulate(1 / (rank + 1) ** s for rank in range(n)))
+        self._rng = rng
+
+    def sample(self) -> int:
+        """Returns a random rank in O(log n)."""
+        return bisect_left(self._cumulative, self._rng.random() * self._cumulative[-1])
+
+
+def destination_name(index: int) -> str:
+    """Returns a destination name that passes trip validation (letters and spaces only).
+
+    Args:
+        index (int): Destination number.
+
+    Returns:
+        str: A name such as "Country Ab".
+    """
+    letters = ''
+    while True:
+        letters = chr(ord('a') + index % 26) + letters
+        index //= 26
+        if not index:
+            return f"Country {letters.capitalize()}"
+
+
+def _invalid_row(kind: str, row: list[str]) -> list[str]:
+    """Breaks a valid CSV row in the given way.
+
+    `columns` and `type` rows are rejected by `csv_rows.validate_row`; `destination`,
+    `price` and `people` rows are loaded but rejected by `TripDbDao.find_all_valid`.
+    """
+    match kind:
+        case 'columns':
+            return row[:-1]
+        case 'type':
+            return [row[0], row[1], 'not a price', row[3], row[4]]
+        case 'destination':
+            return [row[0], '123###', row[2], row[3], row[4]]
+        case 'price':
+            return [row[0], row[1], f'-{row[2]}', row[3], row[4]]
+        case 'people':
+            return [row[0], row[1], row[2], f'-{row[3]}', row[4]]
+
+
+def generate_trip_rows(config: GeneratorConfig) -> Iterator[list[str]]:
+    """Lazily generates CSV rows of trips, including the configured share of invalid rows.
+
+    Args:
+        config (GeneratorConfig): Dataset parameters.
+
+    Yields:
+        list[str]: CSV fields in `CSV_HEADER` order.
+    """
+    rng = random.Random(config.seed)
+    destinations = ZipfSampler(config.destinations, config.zipf_s, rng)
+    agencies = ZipfSampler(config.agencies, config.zipf_s, rng)
+    for id_ in range(1, config.rows + 1):
+        row = [str(id_), destination_name(destinations.sample()), f'{rng.randint(100, 5000)}.{rng.randint(0, 99):02d}',
+               str(rng.randint(1, 20)), str(agencies.sample() + 1)]
+        if rng.random() < config.invalid_rate:
+            row = _invalid_row(rng.choice(INVALID_KINDS), row)
+        yield row
+
+
+def generate_trips(config: GeneratorConfig) -> Iterator[Trip]:
+    """Lazily generates valid Trip entities; invalid rows configured by `invalid_rate` are skipped.
+
+    Args:
+        config (GeneratorConfig): Dataset parameters.
+
+    Yields:
+        Trip: Trips matching the rows of `generate_trip_rows`.
+    """
+    for row in generate_trip_rows(config):
+        try:
+            trip = Trip(int(row[0]), row[1], Decimal(row[2]), int(row[3]), int(row[4]))
+        except (IndexError, ArithmeticError, ValueError):
+            continue
+        if trip.destination.replace(' ', '').isalpha() and trip.price >= 0 and trip.num_of_people >= 0:
+            yield trip
+
+
+def write_trips_csv(path: str, config: GeneratorConfig) -> int:
+    """Streams a trips CSV file in the format of `trips_to_database.csv`.
+
+    Args:
+        path (str): Output file path.
+        config (GeneratorConfig): Dataset parameters.
+
+    Returns:
+        int: Number of data rows written.
+    """
+    written = 0
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        for row in generate_trip_rows(config):
+            writer.writerow(row)
+            written += 1
+    return written
+
+
+def generate_agency_lines(count: int, seed: int = 0) -> Iterator[str]:
+    """Lazily generates agency lines in the `travel_agency.txt` format.
+
+    Args:
+        count (int): Number of agencies (IDs 1..count).
+        seed (int): Random seed.
+
+    Yields:
+        str: Lines such as "1, Agency Bc, Kraków".
+    """
+    rng = random.Random(seed)
+    for id_ in range(1, count + 1):
+        yield f"{id_}, Agency {destination_name(id_).split()[1]}, {rng.choice(CITIES)}"
+
+
+def write_agencies_file(path: str, count: int, seed: int = 0) -> int:
+    """Streams an agencies file in the `travel_agency.txt` format.
+
+    Args:
+        path (str): Output file path.
+        count (int): Number of agencies.
+        seed (int): Random seed.
+
+    Returns:
+        int: Number of lines written.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        for number, line in enumerate(generate_agency_lines(count, seed)):
+            f.write(f"\n{line}" if number else line)
+    return count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Generates synthetic trips and agencies datasets.')
+    subparsers = parser.add_subparsers(dest='dataset', required=True)
+
+    trips = subparsers.add_parser('trips', help='trips CSV file')
+    trips.add_argument('path')
+    trips.add_argument('--rows', type=int, default=GeneratorConfig.rows)
+    trips.add_argument('--agencies', type=int, default=GeneratorConfig.agencies)
+    trips.add_argument('--destinations', type=int, default=GeneratorConfig.destinations)
+    trips.add_argument('--zipf-s', type=float, default=GeneratorConfig.zipf_s)
+    trips.add_argument('--invalid-rate', type=float, default=GeneratorConfig.invalid_rate)
+    trips.add_argument('--seed', type=int, default=GeneratorConfig.seed)
+
+    agencies = subparsers.add_parser('agencies', help='agencies text file')
+    agencies.add_argument('path')
+    agencies.add_argument('--count', type=int, default=GeneratorConfig.agencies)
+    agencies.add_argument('--seed', type=int, default=GeneratorConfig.seed)
+
+    args = parser.parse_args()
+    if args.dataset == 'trips':
+        config = GeneratorConfig(args.rows, args.agencies, args.destinations, args.zipf_s, args.invalid_rate, args.seed)
+        print(f"{write_trips_csv(args.path, config)} trips written to {args.path}")
+    else:
+        print(f"{write_agencies_file(args.path, args.count, args.seed)} agencies written to {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,23 +1,34 @@
+import mmap
 import os
+from typing import Iterator
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
 
 class FileManager:
     """A dynamic file manager that supports operations such as reading, writing, and deleting files.
 
+    The 'read', 'write' and 'delete' operations create `<operation>_file` methods. The streaming
+    operations 'iter_lines', 'iter_chunks' and 'iter_mmap_lines' create methods of the same name
+    that return iterators, so large files are read with constant memory.
+
     Attributes:
-        operations (list[str]): List of operations to dynamically create methods for. Supported operations: 'read', 'write', 'delete'.
+        operations (list[str]): List of operations to dynamically create methods for. Supported operations: 'read', 'write', 'delete',
+            'iter_lines', 'iter_chunks', 'iter_mmap_lines'.
     """
 
     def __init__(self, operations: list[str]) -> None:
         """Initializes the FileManager and dynamically creates methods based on the provided operations.
 
         Args:
-            operations (list[str]): List of operations to support ('read', 'write', 'delete').
+            operations (list[str]): List of operations to support ('read', 'write', 'delete', 'iter_lines',
+                'iter_chunks', 'iter_mmap_lines').
 
         Raises:
             ValueError: If an unsupported operation is provided.
         """
         for operation in operations:
-            method_name = f"{operation}_file"
+            method_name = operation if operation.startswith("iter_") else f"{operation}_file"
             method = self._create_file_method(operation)
             setattr(self, method_name, method)
 
@@ -26,7 +37,8 @@ class FileManager:
         """Creates a file operation method dynamically based on the operation type.
 
         Args:
-            operation (str): The file operation to create ('read', 'write', 'delete').
+            operation (str): The file operation to create ('read', 'write', 'delete', 'iter_lines', 'iter_chunks',
+                'iter_mmap_lines').
 
         Returns:
             function: A method corresponding to the operation.
@@ -74,6 +86,90 @@ class FileManager:
                     except Exception as e:
                         raise IOError(f"Failed to read file: {file_path}. Error: {e}")
 
+            case "iter_lines":
+                def method(file_path: str) -> Iterator[str]:
+                    """Lazily reads lines from a file, one at a time.
+
+                    Args:
+                        file_path (str): Path to the file to read from.
+
+                    Returns:
+                        Iterator[str]: Lines of the file without the trailing newline.
+
+                    Raises:
+                        FileNotFoundError: If the file does not exist (raised by this call).
+                        IOError: If reading the file fails (raised while iterating).
+                    """
+                    if not os.path.exists(file_path):
+                        raise FileNotFoundError(f"File not found: {file_path}")
+
+                    def lines():
+                        try:
+                            with open(file_path, "r", encoding="utf-8") as f:
+                                for line in f:
+                                    yield line.rstrip('\n')
+                        except Exception as e:
+                            raise IOError(f"Failed to read file: {file_path}. Error: {e}")
+                    return lines()
+
+            case "iter_chunks":
+                def method(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+                    """Lazily reads a file in binary chunks.
+
+                    Args:
+                        file_path (str): Path to the file to read from.
+                        chunk_size (int): Maximum number of bytes per chunk.
+
+                    Returns:
+                        Iterator[bytes]: Consecutive chunks of the file; only the last one may be shorter.
+
+                    Raises:
+                        FileNotFoundError: If the file does not exist (raised by this call).
+                        IOError: If reading the file fails (raised while iterating).
+                    """
+                    if not os.path.exists(file_path):
+                        raise FileNotFoundError(f"File not found: {file_path}")
+
+                    def chunks():
+                        try:
+                            with open(file_path, "rb") as f:
+                                while chunk := f.read(chunk_size):
+                                    yield chunk
+                        except Exception as e:
+                            raise IOError(f"Failed to read file: {file_path}. Error: {e}")
+                    return chunks()
+
+            case "iter_mmap_lines":
+                def method(file_path: str) -> Iterator[str]:
+                    """Lazily reads lines from a memory-mapped file.
+
+                    The operating system pages the file in on demand, so no read buffers are
+                    copied in Python; useful for files much larger than memory.
+
+                    Args:
+                        file_path (str): Path to the file to read from.
+
+                    Returns:
+                        Iterator[str]: Lines of the file without the trailing newline.
+
+                    Raises:
+                        FileNotFoundError: If the file does not exist (raised by this call).
+                        IOError: If mapping or reading the file fails (raised while iterating).
+                    """
+                    if not os.path.exists(file_path):
+                        raise FileNotFoundError(f"File not found: {file_path}")
+
+                    def lines():
+                        try:
+                            if os.path.getsize(file_path) == 0:
+                                return  # empty files cannot be mapped
+                            with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                                for line in iter(mapped.readline, b""):
+                                    yield line.rstrip(b"\n").removesuffix(b"\r").decode("utf-8")
+                        except Exception as e:
+                            raise IOError(f"Failed to read file: {file_path}. Error: {e}")
+                    return lines()
+
             case "delete":
                 def method(file_path: str):
                     """Deletes a file.
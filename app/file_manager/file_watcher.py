@@ -0,0 +1,92 @@
+from typing import Callable, Self
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class FileWatcher:
+    """Polls a file's modification time and size and calls back when they change.
+
+    Polling works on every platform and file system, including network shares where change
+    notifications are unreliable. A change is reported once per new (mtime, size) pair, so a
+    file written in several steps may be reported more than once; callbacks should tolerate
+    reading an incomplete file and wait for the next change.
+
+    Attributes:
+        path (str): Watched file.
+        interval (float): Seconds between polls.
+    """
+
+    def __init__(self, path: str | os.PathLike, on_change: Callable[[], None], interval: float = 1.0):
+        """Initializes a stopped watcher.
+
+        Args:
+            path (str | os.PathLike): File to watch; it may not exist yet.
+            on_change (Callable[[], None]): Called from the watcher thread after each change.
+            interval (float): Seconds between polls.
+        """
+        self.path = os.fspath(path)
+        self.interval = interval
+        self._on_change = on_change
+        self._signature = self._stat()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> Self:
+        """Starts polling in a daemon thread.
+
+        Returns:
+            FileWatcher: This watcher.
+        """
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name=f'FileWatcher({self.path})', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stops polling and waits for a running callback to finish."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        self.stop()
+        return False
+
+    def check(self) -> bool:
+        """Polls the file once and calls back if it changed since the last poll.
+
+        Errors raised by the callback are logged, so one bad update does not stop the watcher.
+
+        Returns:
+            bool: True if a change was detected.
+        """
+        signature = self._stat()
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        if signature is not None:
+            try:
+                self._on_change()
+            except Exception as e:
+                logger.error(f"Handling a change of {self.path} failed: {e!r}")
+        return True
+
+    def _run(self) -> None:
+        """Polls until stopped."""
+        while not self._stopped.wait(self.interval):
+            self.check()
+
+    def _stat(self) -> tuple[int, int] | None:
+        """Returns the file's (mtime in ns, size), or None if it does not exist."""
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
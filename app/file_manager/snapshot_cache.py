@@ -0,0 +1,127 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Hashable
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+# Directory of the snapshot files; set it to an empty string to disable the cache.
+CACHE_DIR_ENV = 'TRAVEL_AGENCY_CACHE_DIR'
+DEFAULT_CACHE_DIR = '.snapshot_cache'
+# Bump when the pickled classes change shape, so older snapshots are ignored.
+SNAPSHOT_FORMAT = 2
+
+
+@dataclass(frozen=True)
+class _Snapshot:
+    """Pickled content of a snapshot file: the value and the key and version it was built for."""
+    format: int
+    key: str
+    version: Hashable
+    value: Any
+
+
+class SnapshotCache:
+    """Caches values parsed from text files as pickle (protocol 5) snapshots.
+
+    A snapshot is keyed by the absolute path of its source file and remembers the source's
+    modification time and size. It is used only while both still match, so editing or
+    replacing the source file triggers a new parse. `get_or_build_versioned` caches other
+    values under a name and an explicit version in the same way. Snapshots are written atomically and
+    unreadable ones are ignored. They are trusted local files: never point the cache
+    directory at data from elsewhere, since unpickling can run arbitrary code.
+
+    Attributes:
+        directory (str | None): Directory of the snapshot files. If None, `TRAVEL_AGENCY_CACHE_DIR`
+            is read on every call, defaulting to `.snapshot_cache`.
+    """
+
+    def __init__(self, directory: str | None = None):
+        """Initializes the cache.
+
+        Args:
+            directory (str | None): Directory of the snapshot files, or None to follow the environment.
+        """
+        self.directory = directory
+
+    def get_or_build(self, source_path: str, build: Callable[[], Any]) -> Any:
+        """Returns the snapshot of a source file, building and storing it if missing or stale.
+
+        Args:
+            source_path (str): File the value is parsed from.
+            build (Callable[[], Any]): Parses the source file.
+
+        Returns:
+            Any: The cached or freshly built value.
+        """
+        try:
+            stat = os.stat(source_path)
+        except OSError:
+            return build()
+        return self.get_or_build_versioned(os.path.abspath(source_path), (stat.st_mtime_ns, stat.st_size), build)
+
+    def get_or_build_versioned(self, key: str, version: Hashable, build: Callable[[], Any]) -> Any:
+        """Returns the snapshot stored under a key, building and storing it if missing or of another version.
+
+        Args:
+            key (str): Name of the snapshot, e.g. the absolute path of its source file.
+            version (Hashable): Picklable version of the inputs the value is built from.
+            build (Callable[[], Any]): Builds the value.
+
+        Returns:
+            Any: The cached or freshly built value.
+        """
+        directory = self._directory()
+        if not directory:
+            return build()
+
+        snapshot_path = os.path.join(directory, f'{hashlib.sha1(key.encode("utf-8")).hexdigest()}.pickle')
+        snapshot = self._load(snapshot_path)
+        if snapshot is not None and (snapshot.format, snapshot.key, snapshot.version) == (SNAPSHOT_FORMAT, key, version):
+            logger.debug(f"Loaded snapshot of {key}")
+            return snapshot.value
+
+        value = build()
+        self._store(snapshot_path, _Snapshot(SNAPSHOT_FORMAT, key, version, value))
+        return value
+
+    def _directory(self) -> str:
+        """Returns the configured snapshot directory, or an empty string if caching is disabled."""
+        if self.directory is not None:
+            return self.directory
+        return os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR)
+
+    @staticmethod
+    def _load(snapshot_path: str) -> _Snapshot | None:
+        """Reads a snapshot file, or returns None if it is missing or unreadable."""
+        try:
+            with open(snapshot_path, 'rb') as f:
+                snapshot = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable snapshot {snapshot_path}: {e}")
+            return None
+        return snapshot if isinstance(snapshot, _Snapshot) else None
+
+    @staticmethod
+    def _store(snapshot_path: str, snapshot: _Snapshot) -> None:
+        """Atomically writes a snapshot file; failures are logged and otherwise ignored."""
+        directory = os.path.dirname(snapshot_path)
+        temporary_path = None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            with tempfile.NamedTemporaryFile('wb', dir=directory, suffix='.tmp', delete=False) as f:
+                temporary_path = f.name
+                pickle.dump(snapshot, f, protocol=5)
+            os.replace(temporary_path, snapshot_path)
+        except Exception as e:
+            logger.warning(f"Could not write snapshot {snapshot_path}: {e}")
+            if temporary_path and os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+
+snapshot_cache = SnapshotCache()
@@ -1,7 +1,17 @@
-from typing import Self
-from dataclasses import dataclass
+from typing import Callable, Iterable, Iterator, Self
+from dataclasses import dataclass, field
 from app.file_manager.file_manager import FileManager
+from app.file_manager.file_watcher import FileWatcher
+from app.file_manager.snapshot_cache import SnapshotCache, snapshot_cache
+import logging
+import os
 import re
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Directory of the data files shipped with the package.
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
 
 
 @dataclass(frozen=True)
@@ -46,21 +56,29 @@ class Agency:
         Raises:
             AttributeError: If the input data format does not match the expected pattern.
         """
-        if not re.match(cls.pattern, data):
+        if not _AGENCY_PATTERN.match(data):
             raise AttributeError(f'Invalid data: {data}')
         items = data.split(',')
         return Agency(int(items[0]), items[1], items[2])
 
 
+_AGENCY_PATTERN = re.compile(Agency.pattern)
+# One match per line: the fields of a valid line (same rules as Agency.pattern), or the whole invalid line.
+_AGENCY_LINES_PATTERN = re.compile(
+    r'^(?:(?P<id>\d+),(?P<name>[A-Za-z ]+),(?P<localization>[A-Za-ęóąśłżźćń ]+)|(?P<invalid>.*?))\r?$',
+    re.MULTILINE)
+
+
 class AgencyConverter:
     """Class for converting text data into Agency objects."""
 
     @staticmethod
-    def to_agencies(data: list[str]) -> dict[int, Agency]:
-        """Converts a list of text data into a dictionary of Agency objects.
+    def to_agencies(data: Iterable[str]) -> dict[int, Agency]:
+        """Converts text data into a dictionary of Agency objects.
 
         Args:
-            data (list[str]): A list of strings containing agency data.
+            data (Iterable[str]): Strings containing agency data, consumed one at a time,
+                e.g. the lines of `FileManager.iter_lines`.
 
         Returns:
             dict[int, Agency]: A dictionary where the key is the agency ID and the value is an Agency object.
@@ -71,19 +89,207 @@ class AgencyConverter:
             agencies.update({agency.id: agency})
         return agencies
 
+    @staticmethod
+    def parse_agencies(chunks: Iterable[bytes], errors: list[str] | None = None) -> dict[int, Agency]:
+        """Parses UTF-8 agency data given in arbitrary binary chunks into a dictionary of Agency objects.
+
+        Whole lines of each chunk are matched at once with a single precompiled pattern, so memory use
+        depends on the chunk size, not the file size. Unlike `to_agencies`, a bad line does not
+        stop parsing: every invalid line is collected.
+
+        Args:
+            chunks (Iterable[bytes]): The data, e.g. from `FileManager.iter_chunks`; lines may span chunks.
+            errors (list[str] | None): Receives a message for every invalid line. If None, an
+                AttributeError listing the invalid lines is raised after parsing.
+
+        Returns:
+            dict[int, Agency]: A dictionary where the key is the agency ID and the value is an Agency object.
+
+        Raises:
+            AttributeError: If `errors` is None and some lines are invalid.
+        """
+        agencies: dict[int, Agency] = {}
+        found_errors = errors if errors is not None else []
+        line_number = 0
+        for text in AgencyConverter._complete_lines(chunks):
+            for id_, name, localization, invalid in _AGENCY_LINES_PATTERN.findall(text):
+                line_number += 1
+                if id_:
+                    agencies[int(id_)] = Agency(int(id_), name, localization)
+                else:
+                    found_errors.append(f'Line {line_number}: Invalid data: {invalid}')
+        if errors is None and found_errors:
+            raise AttributeError(f'{len(found_errors)} invalid lines, first: {found_errors[0]}')
+        return agencies
+
+    @staticmethod
+    def _complete_lines(chunks: Iterable[bytes]) -> Iterator[str]:
+        """Regroups binary chunks into decoded texts of whole lines, without the final newline.
+
+        Chunks are cut after their last newline, so no line or multi-byte character is split.
+        """
+        remainder = b''
+        for chunk in chunks:
+            buffer = remainder + chunk
+            end = buffer.rfind(b'\n')
+            if end < 0:
+                remainder = buffer
+                continue
+            remainder = buffer[end + 1:]
+            yield buffer[:end].decode('utf-8')
+        if remainder:
+            yield remainder.decode('utf-8')
+
+
+@dataclass(frozen=True)
+class AgencyChanges:
+    """Differences between two versions of the agency data.
+
+    Attributes:
+        added (list[Agency]): Agencies with new IDs.
+        removed (list[Agency]): Agencies whose IDs disappeared.
+        updated (list[Agency]): New versions of agencies whose data changed.
+    """
+    added: list[Agency] = field(default_factory=list)
+    removed: list[Agency] = field(default_factory=list)
+    updated: list[Agency] = field(default_factory=list)
+
+    @classmethod
+    def between(cls, old: dict[int, Agency], new: dict[int, Agency]) -> Self:
+        """Compares two agency maps.
+
+        Args:
+            old (dict[int, Agency]): Previous agencies by ID.
+            new (dict[int, Agency]): Current agencies by ID.
+
+        Returns:
+            AgencyChanges: Agencies added, removed and updated, each ordered by ID.
+        """
+        return cls([new[id_] for id_ in sorted(new.keys() - old.keys())],
+                   [old[id_] for id_ in sorted(old.keys() - new.keys())],
+                   [new[id_] for id_ in sorted(new.keys() & old.keys()) if new[id_] != old[id_]])
+
+    def __bool__(self) -> bool:
+        """Returns whether anything changed."""
+        return bool(self.added or self.removed or self.updated)
+
 
 class AgencyRepo:
-    """Repository for managing agency data."""
-    agencies: dict[int, Agency]
+    """Repository for managing agency data.
+
+    A lazy repository reads its file on the first access to `agencies`, so creating it
+    does no I/O. Concurrent first accesses load the file once.
+
+    `reload` (or a watcher started with `watch`) parses the file again and swaps in the new
+    agencies map with a single assignment: lookups never wait for a reload and always see
+    either the old or the new map, never a mix.
+    """
 
-    def __init__(self, path: str | None = None):
+    def __init__(self, path: str | os.PathLike | None = None, cache: SnapshotCache | None = snapshot_cache,
+                 lazy: bool = False):
         """Initializes the agency repository.
 
         Args:
-            path (str | None): Path to the file containing agency data.
+            path (str | os.PathLike | None): Path to the file containing agency data.
+            cache (SnapshotCache | None): Cache of parsed files, reused while the file is unchanged.
+                None parses the file every time.
+            lazy (bool): Defer reading the file until the agencies are first used.
         """
-        if path:
-            self.agencies = AgencyConverter.to_agencies(FileManager(['read']).read_file(path))
+        self._path = path
+        self._cache = cache
+        self._agencies: dict[int, Agency] | None = None if path else {}
+        self._version: tuple[str, int, int] | None = None
+        self._lock = threading.Lock()
+        if path and not lazy:
+            self._load()
+
+    @property
+    def agencies(self) -> dict[int, Agency]:
+        """Returns the agencies by ID, reading the file first if it has not been read yet."""
+        if self._agencies is None:
+            self._load()
+        return self._agencies
+
+    @agencies.setter
+    def agencies(self, agencies: dict[int, Agency]) -> None:
+        """Replaces the stored agencies; they no longer have a `data_version`."""
+        self._agencies, self._version = agencies, None
+
+    def _load(self) -> None:
+        """Reads and parses the agency file, unless another thread already did."""
+        with self._lock:
+            if self._agencies is None:
+                self._agencies, self._version = self._read()
+
+    def _read(self) -> tuple[dict[int, Agency], tuple[str, int, int] | None]:
+        """Parses the agency file, or takes it from the snapshot cache if the file is unchanged.
+
+        Returns:
+            tuple: The agencies and the version of the file they were read from.
+        """
+        path = os.fspath(self._path)
+        version = self._file_version()
+
+        def parse():
+            return AgencyConverter.parse_agencies(FileManager(['iter_chunks']).iter_chunks(path))
+        return self._cache.get_or_build(path, parse) if self._cache else parse(), version
+
+    def _file_version(self) -> tuple[str, int, int] | None:
+        """Returns the absolute path, modification time (ns) and size of the agency file, or None if it is missing."""
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None
+        return os.path.abspath(self._path), stat.st_mtime_ns, stat.st_size
+
+    def data_version(self) -> tuple[str, int, int] | None:
+        """Returns a fingerprint of the agency file the agencies come from.
+
+        Before the first load it is the fingerprint of the file as it is now, so checking it
+        does not read the file.
+
+        Returns:
+            tuple[str, int, int] | None: Path, modification time (ns) and size of the file, or None
+            if the agencies were not read from a file.
+        """
+        if self._agencies is None:
+            return self._file_version()
+        return self._version
+
+    def reload(self) -> AgencyChanges:
+        """Parses the agency file again and atomically replaces the agencies.
+
+        If the file cannot be parsed the current agencies are kept and the error is raised.
+
+        Returns:
+            AgencyChanges: Differences from the previous agencies.
+        """
+        agencies, version = self._read()
+        with self._lock:
+            previous, self._agencies, self._version = self._agencies or {}, agencies, version
+        changes = AgencyChanges.between(previous, agencies)
+        logger.info(f"Agencies reloaded from {os.fspath(self._path)}: {len(changes.added)} added, "
+                    f"{len(changes.removed)} removed, {len(changes.updated)} updated.")
+        return changes
+
+    def watch(self, interval: float = 1.0, on_change: Callable[[AgencyChanges], None] | None = None) -> FileWatcher:
+        """Starts reloading the agencies in a background thread whenever the file changes.
+
+        A file that fails to parse (e.g. while it is being written) is logged and skipped;
+        the current agencies stay in place until the next change.
+
+        Args:
+            interval (float): Seconds between checks of the file's modification time and size.
+            on_change (Callable[[AgencyChanges], None] | None): Called after each reload that changed agencies.
+
+        Returns:
+            FileWatcher: The running watcher; call `stop()` to end watching.
+        """
+        def reload():
+            changes = self.reload()
+            if changes and on_change:
+                on_change(changes)
+        return FileWatcher(self._path, reload, interval).start()
 
     def get_agencies(self) -> list[Agency]:
         """Returns a list of all agencies.
@@ -116,4 +322,8 @@ class AgencyRepo:
         return self.agencies.get(agency_id, 'Unknown agency').name
 
 
-agency_repo = AgencyRepo('.\\app\\data\\travel_agency.txt')
\ No newline at end of file
+# Agency file of the shared repository; the environment variable overrides the packaged file.
+AGENCIES_FILE_ENV = 'TRAVEL_AGENCY_AGENCIES_FILE'
+AGENCIES_FILE_PATH = os.environ.get(AGENCIES_FILE_ENV) or os.path.join(DATA_DIR, 'travel_agency.txt')
+
+agency_repo = AgencyRepo(AGENCIES_FILE_PATH, lazy=True)
\ No newline at end of file
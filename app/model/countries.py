@@ -1,7 +1,11 @@
-from typing import Self
+from typing import Iterable, Self
 from dataclasses import dataclass
 from app.file_manager.file_manager import FileManager
+from app.file_manager.snapshot_cache import SnapshotCache, snapshot_cache
+from app.model.agency import DATA_DIR
+import os
 import re
+import threading
 
 
 @dataclass
@@ -44,27 +48,31 @@ class Country:
         Returns:
             Country: The created Country object.
         """
-        if not re.match(cls.pattern, data):
+        if not _COUNTRY_PATTERN.match(data):
             raise AttributeError(f'Data is not correct: {data}')
 
         return Country(data)
 
 
+_COUNTRY_PATTERN = re.compile(Country.pattern)
+
+
 class CountryConverter:
     """
     A utility class for converting a list of country names to a dictionary of Country objects.
 
     Methods:
-        to_countries: Converts a list of country names into a dictionary of Country objects, indexed by an integer.
+        to_countries: Converts country names into a dictionary of Country objects, indexed by an integer.
     """
 
     @staticmethod
-    def to_countries(data: list[str]) -> dict[int, Country]:
+    def to_countries(data: Iterable[str]) -> dict[int, Country]:
         """
-        Converts a list of country names into a dictionary of Country objects.
+        Converts country names into a dictionary of Country objects.
 
         Args:
-            data (list[str]): A list of country names to be converted.
+            data (Iterable[str]): Country names to be converted, consumed one at a time,
+                e.g. the lines of `FileManager.iter_lines`.
 
         Returns:
             dict[int, Country]: A dictionary where the keys are integers (country IDs) and the values are Country objects.
@@ -86,30 +94,124 @@ class CountryRepo:
         countries (dict[int, Country]): A dictionary of Country objects, indexed by country ID.
 
     Methods:
-        __init__: Initializes the repository and optionally loads country data from a file.
-        get_countries: Returns a list of country names stored in the repository.
+        __init__: Initializes the repository and optionally loads country data from a file, now or on first use.
+        get_countries: Returns a frozen set of country names stored in the repository.
     """
 
-    countries: dict[int, Country]
+    _countries: dict[int, Country] | None
+    _names: frozenset[str]
 
-    def __init__(self, path: str = None):
+    def __init__(self, path: str | os.PathLike = None, cache: SnapshotCache | None = snapshot_cache,
+                 lazy: bool = False):
         """
         Initializes the CountryRepo with an optional path to a file containing country data.
 
         Args:
-            path (str, optional): The file path to read country names from. Defaults to None.
+            path (str | os.PathLike, optional): The file path to read country names from. Defaults to None.
+            cache (SnapshotCache, optional): Cache of parsed files, reused while the file is unchanged.
+                None parses the file every time.
+            lazy (bool, optional): Defer reading the file until the countries are first used. Defaults to False.
+        """
+        self._path = path
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._countries = None
+        self._version: tuple[str, int, int] | None = None
+        if not path:
+            self.countries = {}
+        elif not lazy:
+            self._load()
+
+    @property
+    def countries(self) -> dict[int, Country]:
+        """
+        Returns the Country objects stored in the repository, reading the file on first use.
+
+        Returns:
+            dict[int, Country]: A dictionary of Country objects, indexed by country ID.
         """
-        if path:
-            self.countries = CountryConverter.to_countries(FileManager(['read']).read_file(path))
+        if self._countries is None:
+            self._load()
+        return self._countries
 
-    def get_countries(self) -> set[str]:
+    @countries.setter
+    def countries(self, countries: dict[int, Country]) -> None:
         """
-        Retrieves a set of country names from the repository.
+        Replaces the stored countries and precomputes the frozen set of their names. The countries
+        no longer come from the file, so they have no `data_version`.
+
+        Args:
+            countries (dict[int, Country]): A dictionary of Country objects, indexed by country ID.
+        """
+        self._publish(countries, None)
+
+    def _publish(self, countries: dict[int, Country], version: tuple[str, int, int] | None) -> None:
+        """
+        Stores the countries with their names and file version.
+
+        `_countries` is assigned last: readers that see it set without taking the lock must
+        also see the names and version that belong to it.
+        """
+        self._names = frozenset(country.name for country in countries.values())
+        self._version = version
+        self._countries = countries
+
+    def _load(self) -> None:
+        """
+        Reads and parses the country file, unless another thread already did.
+        """
+        with self._lock:
+            if self._countries is not None:
+                return
+            path = os.fspath(self._path)
+            version = self._file_version()
+
+            def parse():
+                return CountryConverter.to_countries(FileManager(['iter_lines']).iter_lines(path))
+            self._publish(self._cache.get_or_build(path, parse) if self._cache else parse(), version)
+
+    def _file_version(self) -> tuple[str, int, int] | None:
+        """
+        Returns the absolute path, modification time (ns) and size of the country file, or None if it is missing.
+        """
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return None
+        return os.path.abspath(self._path), stat.st_mtime_ns, stat.st_size
+
+    def data_version(self) -> tuple[str, int, int] | None:
+        """
+        Returns a fingerprint of the country file the countries come from.
+
+        Before the first load it is the fingerprint of the file as it is now, so checking it
+        does not read the file.
 
         Returns:
-            set[str]: A set of country names.
+            tuple[str, int, int] | None: Path, modification time (ns) and size of the file, or None
+            if the countries were not read from a file.
+        """
+        if not self._path:
+            return None
+        if self._countries is None:
+            return self._file_version()
+        return self._version
+
+    def get_countries(self) -> frozenset[str]:
         """
-        return set([country.name for country in self.countries.values()])
+        Retrieves the precomputed set of country names from the repository.
+
+        Returns:
+            frozenset[str]: A frozen set of country names.
+        """
+        if self._countries is None:
+            self._load()
+        return self._names
+
 
+# Country file of the shared repository; the environment variable overrides the packaged file.
+EUROPEAN_COUNTRIES_FILE_ENV = 'TRAVEL_AGENCY_EUROPEAN_COUNTRIES_FILE'
+EUROPEAN_COUNTRIES_FILE_PATH = (os.environ.get(EUROPEAN_COUNTRIES_FILE_ENV)
+                                or os.path.join(DATA_DIR, 'european_countries.txt'))
 
-european_countries_repo = CountryRepo('.\\app\\data\\european_countries.txt')
+european_countries_repo = CountryRepo(EUROPEAN_COUNTRIES_FILE_PATH, lazy=True)
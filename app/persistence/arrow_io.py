@@ -0,0 +1,190 @@
+from typing import Any, Iterable, Iterator, Sequence
+import importlib
+import os
+
+from app.persistence.model import Trip
+
+# Column layout of exported trips, in `Trip` field order.
+TRIP_COLUMNS = ('id', 'destination', 'price', 'num_of_people', 'agency_id')
+# File formats by extension; other extensions need an explicit `file_format`.
+FILE_FORMATS = {'.parquet': 'parquet', '.pq': 'parquet', '.arrow': 'arrow', '.feather': 'arrow', '.ipc': 'arrow'}
+DEFAULT_BATCH_SIZE = 65536
+
+
+def _pyarrow(module: str = 'pyarrow') -> Any:
+    """Imports a pyarrow module on first use, so the rest of the application works without it.
+
+    Args:
+        module (str): Module to import, e.g. 'pyarrow' or 'pyarrow.parquet'.
+
+    Raises:
+        ImportError: If pyarrow is not installed.
+
+    Returns:
+        Any: The imported module.
+    """
+    try:
+        return importlib.import_module(module)
+    except ImportError as e:
+        raise ImportError("Parquet/Arrow files need pyarrow: pip install pyarrow") from e
+
+
+def file_format_for(path: str | os.PathLike, file_format: str | None = None) -> str:
+    """Returns the file format to use for a path.
+
+    Args:
+        path (str | os.PathLike): File path.
+        file_format (str | None): 'parquet' or 'arrow' (Arrow IPC file), or None to use the extension.
+
+    Raises:
+        ValueError: If the format is unknown or cannot be derived from the extension.
+
+    Returns:
+        str: 'parquet' or 'arrow'.
+    """
+    if file_format is None:
+        file_format = FILE_FORMATS.get(os.path.splitext(os.fspath(path))[1].lower())
+    if file_format not in ('parquet', 'arrow'):
+        raise ValueError(f"Unknown file format for {os.fspath(path)}: {file_format}")
+    return file_format
+
+
+def trip_schema() -> Any:
+    """Returns the Arrow schema of exported trips; prices keep the `DECIMAL(10,2)` column type.
+
+    Returns:
+        pyarrow.Schema: Schema with the `TRIP_COLUMNS` fields.
+    """
+    pa = _pyarrow()
+    return pa.schema([
+        pa.field('id', pa.int64()),
+        pa.field('destination', pa.string()),
+        pa.field('price', pa.decimal128(10, 2)),
+        pa.field('num_of_people', pa.int32()),
+        pa.field('agency_id', pa.int32()),
+    ])
+
+
+def rows_to_batch(rows: Sequence[Sequence[Any]], schema: Any) -> Any:
+    """Converts row tuples into a record batch.
+
+    Args:
+        rows (Sequence[Sequence[Any]]): Rows with one value per schema field, in schema order.
+        schema (pyarrow.Schema): Schema of the batch.
+
+    Returns:
+        pyarrow.RecordBatch: The rows as columns.
+    """
+    pa = _pyarrow()
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    return pa.RecordBatch.from_arrays([pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+                                      schema=schema)
+
+
+def batch_to_trips(batch: Any) -> list[Trip]:
+    """Converts a record batch with the `TRIP_COLUMNS` columns into trips.
+
+    Args:
+        batch (pyarrow.RecordBatch): Batch of exported trips.
+
+    Returns:
+        list[Trip]: One Trip per row.
+    """
+    columns = [batch.column(name).to_pylist() for name in TRIP_COLUMNS]
+    return [Trip(*row) for row in zip(*columns)]
+
+
+def write_batches(path: str | os.PathLike, schema: Any, batches: Iterable[Any], file_format: str | None = None) -> int:
+    """Writes record batches to a Parquet or Arrow IPC file one at a time.
+
+    Only one batch is held in memory at a time. The file is written to a temporary name and
+    moved into place when complete, so readers never see a partial file.
+
+    Args:
+        path (str | os.PathLike): Output file.
+        schema (pyarrow.Schema): Schema of every batch.
+        batches (Iterable[pyarrow.RecordBatch]): Batches, consumed lazily.
+        file_format (str | None): 'parquet', 'arrow', or None to use the extension.
+
+    Returns:
+        int: Number of rows written.
+    """
+    file_format = file_format_for(path, file_format)
+    path = os.fspath(path)
+    temporary_path = f'{path}.tmp'
+    rows = 0
+    try:
+        if file_format == 'parquet':
+            writer = _pyarrow('pyarrow.parquet').ParquetWriter(temporary_path, schema)
+        else:
+            writer = _pyarrow('pyarrow.ipc').new_file(temporary_path, schema)
+        with writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        os.replace(temporary_path, path)
+    finally:
+        if os.path.exists(temporary_path):
+            os.remove(temporary_path)
+    return rows
+
+
+def read_batches(path: str | os.PathLike, file_format: str | None = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[Any]:
+    """Reads a Parquet or Arrow IPC file as a stream of record batches.
+
+    Arrow IPC files are memory-mapped, so their batches reference the file pages without
+    copying. Parquet files are decoded `batch_size` rows at a time.
+
+    Args:
+        path (str | os.PathLike): Input file.
+        file_format (str | None): 'parquet', 'arrow', or None to use the extension.
+        batch_size (int): Rows per batch read from Parquet files.
+
+    Yields:
+        pyarrow.RecordBatch: Batches in file order.
+    """
+    file_format = file_format_for(path, file_format)
+    path = os.fspath(path)
+    if file_format == 'parquet':
+        parquet_file = _pyarrow('pyarrow.parquet').ParquetFile(path)
+        try:
+            yield from parquet_file.iter_batches(batch_size=batch_size)
+        finally:
+            parquet_file.close()
+        return
+    pa = _pyarrow()
+    with pa.memory_map(path, 'r') as source:
+        reader = pa.ipc.open_file(source)
+        for index in range(reader.num_record_batches):
+            yield reader.get_batch(index)
+
+
+def write_rows(path: str | os.PathLike, columns: Sequence[str], rows: Iterable[Sequence[Any]],
+               file_format: str | None = None, batch_size: int = DEFAULT_BATCH_SIZE) -> int:
+    """Writes rows of plain Python values to a Parquet or Arrow IPC file.
+
+    Column types are inferred from all rows together, so e.g. Decimal columns get a scale
+    that fits every value. Meant for report-sized data that is already in memory.
+
+    Args:
+        path (str | os.PathLike): Output file.
+        columns (Sequence[str]): Column names, one per row value.
+        rows (Iterable[Sequence[Any]]): Rows with one value per column.
+        file_format (str | None): 'parquet', 'arrow', or None to use the extension.
+        batch_size (int): Maximum rows per written record batch.
+
+    Raises:
+        ValueError: If a row does not have one value per column.
+
+    Returns:
+        int: Number of rows written.
+    """
+    rows = list(rows)
+    for row in rows:
+        if len(row) != len(columns):
+            raise ValueError(f"Row {row!r} has {len(row)} values for {len(columns)} columns")
+    pa = _pyarrow()
+    values = list(zip(*rows)) if rows else [[] for _ in columns]
+    table = pa.Table.from_arrays([pa.array(list(column)) for column in values], names=list(columns))
+    return write_batches(path, table.schema, table.to_batches(max_chunksize=batch_size), file_format)
@@ -4,6 +4,7 @@ from typing import Self, Any
 from dataclasses import field
 import os
 import logging
+import threading
 
 class MySQLConnectionPoolBuilder:
     """
@@ -118,6 +119,16 @@ class MySQLConnectionPoolBuilder:
         self._pool_config['port'] = data
         return self
 
+    @property
+    def config(self) -> dict[str, Any]:
+        """
+        Returns a copy of the configuration the pool is built with.
+
+        Returns:
+            dict[str, Any]: Parameters of `MySQLConnectionPool`.
+        """
+        return dict(self._pool_config)
+
     def build(self) -> MySQLConnectionPool:
         """
         Constructs and returns a `MySQLConnectionPool` instance with the configured parameters.
@@ -137,4 +148,83 @@ class MySQLConnectionPoolBuilder:
         """
         return cls()
 
-connection_pool = MySQLConnectionPoolBuilder.builder().port(3307).build()
+
+class LazyConnectionPool:
+    """
+    Connection pool that builds its `MySQLConnectionPool` on the first `get_connection` call.
+
+    Importing modules that create DAOs on the shared pool therefore does not connect to MySQL,
+    so code paths that never query the database (e.g. benchmarks over synthetic trips) run
+    without a server. Other attributes are forwarded to the built pool.
+
+    Attributes:
+        _builder (MySQLConnectionPoolBuilder): Builder of the pool.
+        _pool (MySQLConnectionPool | None): The pool, once built.
+    """
+
+    def __init__(self, builder: MySQLConnectionPoolBuilder):
+        """
+        Initializes the lazy pool without connecting.
+
+        Args:
+            builder (MySQLConnectionPoolBuilder): Builder of the pool.
+        """
+        self._builder = builder
+        self._pool: MySQLConnectionPool | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def pool(self) -> MySQLConnectionPool:
+        """
+        Returns the pool, building it on first use.
+
+        Returns:
+            MySQLConnectionPool: The built connection pool.
+        """
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._builder.build()
+            return self._pool
+
+    @property
+    def config(self) -> dict[str, Any]:
+        """
+        Returns the configuration of the pool without building it.
+
+        Returns:
+            dict[str, Any]: Parameters of `MySQLConnectionPool`.
+        """
+        return self._builder.config
+
+    def get_connection(self) -> Any:
+        """
+        Returns a connection from the pool, building the pool first if needed.
+
+        Returns:
+            PooledMySQLConnection: A pooled connection.
+        """
+        return self.pool.get_connection()
+
+    def __getattr__(self, name: str) -> Any:
+        if name.startswith('_'):
+            raise AttributeError(name)
+        return getattr(self.pool, name)
+
+
+def pool_config(connection_pool: MySQLConnectionPool | LazyConnectionPool) -> dict[str, Any]:
+    """
+    Returns the configuration a connection pool was created with, to open equivalent pools elsewhere.
+
+    Args:
+        connection_pool (MySQLConnectionPool | LazyConnectionPool): The pool.
+
+    Returns:
+        dict[str, Any]: Parameters of `MySQLConnectionPool`, including host, port, database and credentials.
+    """
+    if isinstance(connection_pool, LazyConnectionPool):
+        return connection_pool.config
+    # MySQLConnectionPool keeps the connection arguments it was created with in `_cnx_config`.
+    return {'pool_name': connection_pool.pool_name, 'pool_size': connection_pool.pool_size} | connection_pool._cnx_config
+
+
+connection_pool = LazyConnectionPool(MySQLConnectionPoolBuilder.builder().port(3307))
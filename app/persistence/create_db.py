@@ -1,7 +1,13 @@
-import csv
 import logging
+from dataclasses import dataclass
 from mysql.connector.pooling import MySQLConnectionPool
 from mysql.connector import Error
+from app.file_manager.file_manager import FileManager
+from app.model.agency import AGENCIES_FILE_PATH, AgencyConverter
+from app.persistence.dao import CHANGE_VERSIONS_TABLE, SUMMARY_TABLES, AgencyDbRepo, SummaryDao, TripDbDao
+from app.persistence.csv_rows import iter_valid_csv_rows, trips_from_csv
+from app.persistence.sql_logging import SampledWarnings
+from app.persistence.unit_of_work import UnitOfWork
 
 # Default CSV path
 CSV_FILE_PATH = 'app/data/trips_to_database.csv'
@@ -10,68 +16,172 @@ CSV_FILE_PATH = 'app/data/trips_to_database.csv'
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def _create_trips_table(cursor):
+STAGING_TABLE = 'trips_staging'
+CHANGE_TRACKING_COLUMNS = (
+    "row_version BIGINT UNSIGNED NOT NULL DEFAULT 0",
+    "created_version BIGINT UNSIGNED NOT NULL DEFAULT 0",
+    "updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6)",
+)
+RETIRED_TABLE = 'trips_old'
+
+
+@dataclass
+class SyncResult:
+    """
+    Row counts of a delta sync.
+    """
+    inserted: int = 0
+    updated: int = 0
+    deleted: int = 0
+    unchanged: int = 0
+
+
+@dataclass(frozen=True)
+class Partitioning:
+    """
+    Partitioning of the trips table by agency_id, so that queries filtered by agency
+    only read the partitions holding those agencies.
+
+    method 'hash' spreads agencies over `partitions` partitions; 'range' puts agencies below
+    each of the increasing `boundaries` into its own partition, plus one for the rest.
+    MySQL requires the partitioning column in the primary key, so a partitioned table uses
+    PRIMARY KEY (id, agency_id) and agency_id becomes NOT NULL.
     """
-    Creates the 'trips' table if it does not exist.
+    method: str = 'hash'
+    partitions: int = 16
+    boundaries: tuple[int, ...] = ()
+
+    def __post_init__(self):
+        if self.method not in ('hash', 'range'):
+            raise ValueError(f"Unknown partitioning method: {self.method}")
+        if self.method == 'hash' and self.partitions < 1:
+            raise ValueError(f"Number of partitions must be positive: {self.partitions}")
+        if self.method == 'range' and (not self.boundaries or list(self.boundaries) != sorted(set(self.boundaries))):
+            raise ValueError(f"Range boundaries must be strictly increasing and non-empty: {self.boundaries}")
+
+    def clause(self):
+        """
+        Returns the PARTITION BY clause of the CREATE TABLE statement.
+        """
+        if self.method == 'hash':
+            return f"PARTITION BY HASH(agency_id) PARTITIONS {self.partitions}"
+        ranges = [f"PARTITION p{number} VALUES LESS THAN ({boundary})"
+                  for number, boundary in enumerate(self.boundaries)]
+        return f"PARTITION BY RANGE (agency_id) ({', '.join(ranges + ['PARTITION pmax VALUES LESS THAN MAXVALUE'])})"
+
+
+def _create_trips_table(cursor, table_name='trips', partitioning=None):
     """
-    create_table_sql = """
-        CREATE TABLE IF NOT EXISTS trips (
-            id INTEGER PRIMARY KEY AUTO_INCREMENT,
+    Creates the trips table (or a table with the same layout) if it does not exist,
+    optionally partitioned by agency_id. An existing table keeps its partitioning.
+    """
+    create_table_sql = f"""
+        CREATE TABLE IF NOT EXISTS {table_name} (
+            id INTEGER AUTO_INCREMENT,
             destination VARCHAR(50) NOT NULL,
             price DECIMAL(10,2) NOT NULL,
             num_of_people INTEGER,
-            agency_id INTEGER
-        )
+            agency_id INTEGER{' NOT NULL' if partitioning else ''},
+            {', '.join(CHANGE_TRACKING_COLUMNS)},
+            PRIMARY KEY ({'id, agency_id' if partitioning else 'id'}),
+            INDEX idx_trips_destination (destination),
+            INDEX idx_{table_name}_row_version (row_version)
+        ) {partitioning.clause() if partitioning else ''}
     """
     cursor.execute(create_table_sql)
-    logger.info("Table 'trips' checked/created.")
+    cursor.execute(f"SHOW COLUMNS FROM {table_name} LIKE 'row_version'")
+    if not cursor.fetchall():
+        added_columns = ', '.join(f"ADD COLUMN {column}" for column in CHANGE_TRACKING_COLUMNS)
+        cursor.execute(f"ALTER TABLE {table_name} {added_columns}, ADD INDEX idx_{table_name}_row_version (row_version)")
+        logger.info(f"Change tracking columns added to '{table_name}'.")
+    logger.info(f"Table '{table_name}' checked/created.")
 
-def _validate_row(row, row_number):
+def _create_change_tracking_tables(cursor):
     """
-    Validates a single CSV row.
-    Returns a tuple of validated values or None if validation fails.
+    Creates the change version counter and the trips tombstone table if they do not exist.
     """
-    if len(row) != 5:
-        logger.warning(f"Row {row_number}: Invalid number of columns.")
-        return None
-    try:
-        id_ = int(row[0]) if row[0] else None
-        destination = str(row[1])
-        price = float(row[2])
-        num_of_people = int(row[3])
-        agency_id = int(row[4])
-        return id_, destination, price, num_of_people, agency_id
-    except ValueError as e:
-        logger.warning(f"Row {row_number}: Data type error - {e}")
-        return None
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CHANGE_VERSIONS_TABLE} (
+            table_name VARCHAR(64) PRIMARY KEY,
+            version BIGINT UNSIGNED NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS trips_tombstones (
+            id INTEGER PRIMARY KEY,
+            destination VARCHAR(50),
+            agency_id INTEGER,
+            row_version BIGINT UNSIGNED NOT NULL,
+            deleted_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+            INDEX idx_trips_tombstones_row_version (row_version)
+        )
+    """)
+    logger.info("Change tracking tables checked/created.")
+
+def _create_summary_tables(cursor):
+    """
+    Creates the per-agency and per-destination trip summary tables if they do not exist.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS agency_stats (
+            id INTEGER PRIMARY KEY,
+            trip_count INTEGER NOT NULL,
+            price_sum DECIMAL(20,2) NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS destination_stats (
+            destination VARCHAR(50) PRIMARY KEY,
+            trip_count INTEGER NOT NULL
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS destination_agency_stats (
+            destination VARCHAR(50),
+            agency_id INTEGER,
+            trip_count INTEGER NOT NULL,
+            PRIMARY KEY (destination, agency_id)
+        )
+    """)
+    logger.info("Summary tables checked/created.")
+
+def _create_agencies_table(cursor):
+    """
+    Creates the agencies table if it does not exist.
+    """
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS agencies (
+            id INTEGER PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            localization VARCHAR(100) NOT NULL
+        )
+    """)
+    logger.info("Table 'agencies' checked/created.")
 
-def _insert_data_from_csv(connection, csv_file_path):
+def _insert_data_from_csv(connection, csv_file_path, table_name='trips'):
     """
-    Inserts valid data from a CSV file into the 'trips' table.
+    Inserts valid data from a CSV file into the trips table (or a table with the same layout).
+    Invalid rows are reported as one sampled warning instead of one warning per row.
     """
     inserted_rows = 0
-    with open(csv_file_path, 'r', encoding='utf-8') as file:
-        csv_reader = csv.reader(file)
-        next(csv_reader, None)  # Skip header
-
-        for row_number, row in enumerate(csv_reader, start=2):  # 2 = header + 1
-            validated = _validate_row(row, row_number)
-            if validated is None:
-                continue
-
-            with connection.cursor() as cursor:
-                insert_sql = '''
-                    INSERT INTO trips (id, destination, price, num_of_people, agency_id)
-                    VALUES (%s, %s, %s, %s, %s)
-                '''
-                cursor.execute(insert_sql, validated)
-                inserted_rows += 1
+    invalid_rows = SampledWarnings("Invalid CSV rows skipped")
+    insert_sql = f'''
+        INSERT INTO {table_name} (id, destination, price, num_of_people, agency_id)
+        VALUES (%s, %s, %s, %s, %s)
+    '''
+    for _, validated in iter_valid_csv_rows(csv_file_path, invalid_rows):
+        with connection.cursor() as cursor:
+            cursor.execute(insert_sql, validated)
+            inserted_rows += 1
 
+    invalid_rows.log(logger)
     logger.info(f"{inserted_rows} rows inserted from CSV.")
 
-def create_tables(connection_pool: MySQLConnectionPool, csv_file_path: str = CSV_FILE_PATH):
+def create_tables(connection_pool: MySQLConnectionPool, csv_file_path: str = CSV_FILE_PATH,
+                  partitioning: Partitioning | None = None):
     """
-    Creates the 'trips' table and inserts data from a CSV file (if provided).
+    Creates the 'trips' table (partitioned if `partitioning` is given) and inserts data from a CSV file,
+    stamps the loaded rows with a change version, then computes the summary tables.
     """
     csv_file_path = csv_file_path or CSV_FILE_PATH
 
@@ -80,24 +190,135 @@ def create_tables(connection_pool: MySQLConnectionPool, csv_file_path: str = CSV
             if conn.is_connected():
                 logger.info("Connected to the database.")
                 with conn.cursor() as cursor:
-                    _create_trips_table(cursor)
+                    _create_trips_table(cursor, partitioning=partitioning)
+                    _create_change_tracking_tables(cursor)
+                    _create_summary_tables(cursor)
                     cursor.execute('SHOW TABLES')
                     logger.debug(f"Current tables: {cursor.fetchall()}")
 
                 _insert_data_from_csv(conn, csv_file_path)
                 conn.commit()
                 logger.info("All changes committed.")
+        TripDbDao(connection_pool).record_bulk_load()
+        SummaryDao(connection_pool).refresh()
     except Error as e:
         logger.error(f"Database error during table creation or data insertion: {e}")
 
+def sync_trips_from_csv(connection_pool: MySQLConnectionPool, csv_file_path: str = CSV_FILE_PATH,
+                        batch_size: int = 1000, partitioning: Partitioning | None = None):
+    """
+    Applies only the differences between a CSV file and the 'trips' table.
+
+    Row hashes of the table are compared with hashes of the CSV rows by ID: new IDs are
+    inserted, changed rows updated and IDs missing from the CSV deleted, all in one
+    transaction. Readers keep seeing the previous data until it commits.
+    `partitioning` only applies if the table does not exist yet.
+    The summary tables are updated with the changed rows in the same transaction, or
+    computed from scratch if they did not exist yet.
+    Returns a SyncResult, or None if a database error occurred.
+    """
+    csv_file_path = csv_file_path or CSV_FILE_PATH
+    invalid_rows = SampledWarnings("Invalid CSV rows skipped")
+    trips = trips_from_csv(csv_file_path, invalid_rows)
+    invalid_rows.log(logger)
+    summaries = SummaryDao(connection_pool)
+
+    try:
+        summaries_missing = not summaries.is_available()
+        with connection_pool.get_connection() as conn:
+            with conn.cursor() as cursor:
+                _create_trips_table(cursor, partitioning=partitioning)
+                _create_change_tracking_tables(cursor)
+                _create_summary_tables(cursor)
+
+        dao = TripDbDao(connection_pool, summary_dao=None if summaries_missing else summaries)
+        with UnitOfWork(connection_pool):
+            stored_hashes = dao.row_hashes()
+            changed = [trip for id_, trip in trips.items() if stored_hashes.get(id_) != TripDbDao.row_hash(trip)]
+            deleted = [id_ for id_ in stored_hashes if id_ not in trips]
+            dao.upsert_many(changed, batch_size)
+            dao.delete_many(deleted, batch_size)
+            if summaries_missing:
+                summaries.refresh()
+    except Error as e:
+        logger.error(f"Database error during CSV sync: {e}")
+        return None
+
+    inserted = sum(trip.id not in stored_hashes for trip in changed)
+    result = SyncResult(inserted, len(changed) - inserted, len(deleted), len(trips) - len(changed))
+    logger.info(f"CSV sync: {result.inserted} inserted, {result.updated} updated, "
+                f"{result.deleted} deleted, {result.unchanged} unchanged.")
+    return result
+
+def reload_tables_atomically(connection_pool: MySQLConnectionPool, csv_file_path: str = CSV_FILE_PATH,
+                             partitioning: Partitioning | None = None):
+    """
+    Fully reloads the 'trips' table without readers ever seeing it empty or half-loaded.
+
+    The CSV is loaded into a staging table which then replaces 'trips' in a single atomic
+    `RENAME TABLE`; the previous table is dropped afterwards. Before the swap, the staging rows
+    are stamped with a change version and trips missing from the CSV get tombstones, so change
+    cursors see the reload. The summary tables are refreshed right after the swap, in their own
+    transaction. The staging table is created with `partitioning`, so this also converts an
+    existing table to (or from) a partitioned one.
+    """
+    csv_file_path = csv_file_path or CSV_FILE_PATH
+
+    try:
+        with connection_pool.get_connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {STAGING_TABLE}, {RETIRED_TABLE}")
+                _create_trips_table(cursor, STAGING_TABLE, partitioning)
+                _create_trips_table(cursor, partitioning=partitioning)
+                _create_change_tracking_tables(cursor)
+                _create_summary_tables(cursor)
+
+            _insert_data_from_csv(conn, csv_file_path, STAGING_TABLE)
+            conn.commit()
+            TripDbDao(connection_pool).record_bulk_load(STAGING_TABLE)
+
+            with conn.cursor() as cursor:
+                cursor.execute(f"RENAME TABLE trips TO {RETIRED_TABLE}, {STAGING_TABLE} TO trips")
+                cursor.execute(f"DROP TABLE {RETIRED_TABLE}")
+            logger.info("Table 'trips' swapped with the freshly loaded staging table.")
+        SummaryDao(connection_pool).refresh()
+    except Error as e:
+        logger.error(f"Database error during atomic reload: {e}")
+
+def load_agencies(connection_pool: MySQLConnectionPool, agencies_file_path: str = AGENCIES_FILE_PATH):
+    """
+    Creates the 'agencies' table and replaces its rows with the agencies of a text file
+    in the `travel_agency.txt` format, in one transaction.
+    Invalid lines are reported as one sampled warning and skipped.
+    Returns the number of loaded agencies, or None if a database error occurred.
+    """
+    invalid_lines = SampledWarnings("Invalid agency lines skipped")
+    errors = []
+    agencies = AgencyConverter.parse_agencies(FileManager(['iter_chunks']).iter_chunks(agencies_file_path), errors)
+    for error in errors:
+        invalid_lines.add(error)
+    invalid_lines.log(logger)
+
+    try:
+        with connection_pool.get_connection() as conn:
+            with conn.cursor() as cursor:
+                _create_agencies_table(cursor)
+        loaded = AgencyDbRepo(connection_pool).replace_all(agencies.values())
+    except Error as e:
+        logger.error(f"Database error during agency loading: {e}")
+        return None
+    logger.info(f"{loaded} agencies loaded from {agencies_file_path}.")
+    return loaded
+
 def drop_tables(connection_pool: MySQLConnectionPool):
     """
-    Drops the 'trips' table from the database if it exists.
+    Drops the 'trips' table, its tombstones and the summary tables from the database if they exist.
+    The change version counter is kept, so versions never go backwards.
     """
     try:
         with connection_pool.get_connection() as conn:
             with conn.cursor() as cursor:
-                drop_sql = "DROP TABLE IF EXISTS trips;"
+                drop_sql = f"DROP TABLE IF EXISTS trips, trips_tombstones, {', '.join(SUMMARY_TABLES)};"
                 cursor.execute(drop_sql)
                 logger.info("Table 'trips' dropped successfully.")
     except Error as e:
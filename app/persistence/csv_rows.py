@@ -0,0 +1,56 @@
+import csv
+import logging
+from decimal import Decimal, ROUND_HALF_UP
+from app.persistence.model import Trip
+
+logger = logging.getLogger(__name__)
+
+
+def validate_row(row, row_number, invalid_rows=None):
+    """
+    Validates a single CSV row.
+    Returns a tuple of validated values or None if validation fails.
+    Problems are logged as warnings, or added to `invalid_rows` (a SampledWarnings) if given.
+    """
+    report = invalid_rows.add if invalid_rows is not None else logger.warning
+    if len(row) != 5:
+        report(f"Row {row_number}: Invalid number of columns.")
+        return None
+    try:
+        id_ = int(row[0]) if row[0] else None
+        destination = str(row[1])
+        price = float(row[2])
+        num_of_people = int(row[3])
+        agency_id = int(row[4])
+        return id_, destination, price, num_of_people, agency_id
+    except ValueError as e:
+        report(f"Row {row_number}: Data type error - {e}")
+        return None
+
+def iter_valid_csv_rows(csv_file_path, invalid_rows):
+    """
+    Yields (row_number, validated values) for every valid row of a CSV file.
+    Invalid rows are added to `invalid_rows`.
+    """
+    with open(csv_file_path, 'r', encoding='utf-8') as file:
+        csv_reader = csv.reader(file)
+        next(csv_reader, None)  # Skip header
+
+        for row_number, row in enumerate(csv_reader, start=2):  # 2 = header + 1
+            validated = validate_row(row, row_number, invalid_rows)
+            if validated is not None:
+                yield row_number, validated
+
+def trips_from_csv(csv_file_path, invalid_rows):
+    """
+    Reads valid CSV rows as Trips keyed by ID, with prices rounded as `DECIMAL(10,2)` stores them.
+    Rows without an ID cannot be matched against the table and are reported as invalid.
+    """
+    trips = {}
+    for row_number, (id_, destination, price, num_of_people, agency_id) in iter_valid_csv_rows(csv_file_path, invalid_rows):
+        if id_ is None:
+            invalid_rows.add(f"Row {row_number}: Missing id, cannot be synced.")
+            continue
+        price = Decimal(str(price)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        trips[id_] = Trip(id_, destination, price, num_of_people, agency_id)
+    return trips
@@ -1,33 +1,71 @@
 import logging
-from typing import Any
+from contextlib import contextmanager
+from itertools import chain, islice
+from typing import Any, Callable, Iterable, Iterator, Sequence
 from mysql.connector.pooling import MySQLConnectionPool
 from datetime import date, datetime
 from abc import ABC
 from decimal import Decimal
+import functools
+import hashlib
+from collections import Counter
 import re
 import inflection
 
-from app.persistence.model import Trip
+from app.model.agency import Agency
+from app.persistence import arrow_io
+from app.persistence.model import AgencyRecord, AgencyStats, Trip, TripChanges, TripTombstone
 from app.persistence.connection import connection_pool
+from app.persistence.instrumentation import QueryInstrumentation, StatementTimer, query_instrumentation
+from app.persistence.sql_logging import SampledWarnings, log_sql
+from app.persistence.unit_of_work import UnitOfWork, current_unit_of_work
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+CHANGE_VERSIONS_TABLE = 'change_versions'
+SUMMARY_TABLES = ('agency_stats', 'destination_stats', 'destination_agency_stats')
+
 
 class CrudDao(ABC):
-    """Base class for CRUD operations on a database table."""
+    """Base class for CRUD operations on a database table.
+
+    Subclasses that set `_tracks_changes` get change tracking: every write stamps the written
+    rows with a new `row_version` (and `created_version` on insert) taken from the
+    `change_versions` counter, and deletes copy the ID and `_tombstone_columns` of each deleted
+    row into the `<table>_tombstones` table, in the same transaction as the write.
+
+    `_partition_columns` lists columns that join `id` in the primary key when the table is
+    partitioned by them; if the table is partitioned, `upsert_many` then keeps IDs unique when
+    those columns change.
+    `_table` overrides the table name derived from the entity class.
+    """
 
-    def __init__(self, connection_pool: MySQLConnectionPool, entity: Any):
+    _table: str | None = None
+    _tracks_changes: bool = False
+    _tombstone_columns: tuple[str, ...] = ()
+    _partition_columns: tuple[str, ...] = ()
+
+    def __init__(self, connection_pool: MySQLConnectionPool, entity: Any,
+                 instrumentation: QueryInstrumentation | None = None):
         """Initializes the DAO with a connection pool and entity type.
 
         Args:
             connection_pool (MySQLConnectionPool): MySQL connection pool.
             entity (Any): A class representing the database entity.
+            instrumentation (QueryInstrumentation | None): Collector of statement timings.
+                Defaults to the shared `query_instrumentation`.
         """
         self._connection_pool = connection_pool
         self._entity = entity
         self._entity_type = type(entity())
+        self._instrumentation = instrumentation or query_instrumentation
+
+    @property
+    def connection_pool(self) -> MySQLConnectionPool:
+        """Returns the connection pool the DAO runs its statements on."""
+        return self._connection_pool
 
     def insert(self, item: Any) -> int:
         """Inserts a single item into the database.
@@ -38,14 +76,12 @@ class CrudDao(ABC):
         Returns:
             int: ID of the inserted row.
         """
-        with self._connection_pool.get_connection() as conn:
-            cursor = conn.cursor()
-            sql = (f'INSERT INTO {self._table_name()} ({self._column_names_for_insert()}) '
-                   f'VALUES ({self._column_values_for_insert(item)})')
-            logger.info(f"[SQL] {sql}")
-            cursor.execute(sql)
-            conn.commit()
-            return cursor.lastrowid
+        with self._tracked_write() as version:
+            sql = (f'INSERT INTO {self._table_name()} ({self._column_names_for_insert()}{self._version_columns(version)}) '
+                   f'VALUES ({self._column_values_for_insert(item)}{self._version_values(version)})')
+            id_ = self._run(sql, commit=True).lastrowid
+            self._report_changes([], [item])
+            return id_
 
     def insert_many(self, items: list[Any]) -> int:
         """Inserts multiple items into the database.
@@ -56,15 +92,14 @@ class CrudDao(ABC):
         Returns:
             int: ID of the last inserted row.
         """
-        with self._connection_pool.get_connection() as conn:
-            cursor = conn.cursor()
-            values = ", ".join([f'({CrudDao._column_values_for_insert(item)})' for item in items])
-            sql = (f'INSERT INTO {self._table_name()} ({self._column_names_for_insert()}) '
+        with self._tracked_write() as version:
+            values = ", ".join([f'({CrudDao._column_values_for_insert(item)}{self._version_values(version)})'
+                                for item in items])
+            sql = (f'INSERT INTO {self._table_name()} ({self._column_names_for_insert()}{self._version_columns(version)}) '
                    f'VALUES {values}')
-            logger.info(f"[SQL] {sql}")
-            cursor.execute(sql)
-            conn.commit()
-            return cursor.lastrowid
+            id_ = self._run(sql, commit=True).lastrowid
+            self._report_changes([], items)
+            return id_
 
     def update(self, id_: int, item: Any) -> int:
         """Updates a record in the database by ID.
@@ -76,15 +111,118 @@ class CrudDao(ABC):
         Returns:
             int: The same ID passed in.
         """
-        with self._connection_pool.get_connection() as conn:
-            cursor = conn.cursor()
+        with self._tracked_write() as version:
+            before = self._observed_rows([id_], lock=True)
+            version_assignment = f', row_version={version}' if version is not None else ''
             sql = (f'UPDATE {self._table_name()} '
-                   f'SET {CrudDao._column_names_and_values_for_update(item)} '
+                   f'SET {CrudDao._column_names_and_values_for_update(item)}{version_assignment} '
                    f'WHERE id={id_}')
-            logger.info(f"[SQL] {sql}")
-            cursor.execute(sql)
-            conn.commit()
-            return id_
+            self._run(sql, commit=True)
+            self._report_changes(before, self._observed_rows([id_]))
+        return id_
+
+    def upsert_many(self, items: Iterable[Any], batch_size: int = 1000) -> int:
+        """Inserts items or updates the existing rows with the same ID, in one transaction.
+
+        Uses `INSERT ... ON DUPLICATE KEY UPDATE` with `batch_size` rows per statement.
+        Items without an ID are inserted as new rows. With change tracking, rows that are
+        already up to date keep their `row_version`. If the table is partitioned by
+        `_partition_columns`, rows whose ID matches an item but whose partition columns differ
+        are deleted first (with tombstones), so that a row moving to another partition replaces
+        the old one instead of duplicating its ID. These deletes are not counted as affected rows.
+
+        Args:
+            items (Iterable[Any]): Entity objects, consumed lazily.
+            batch_size (int): Number of rows per statement.
+
+        Returns:
+            int: Affected rows as reported by MySQL: 1 per inserted row, 2 per updated row,
+            0 per row that was already up to date.
+        """
+        items = CrudDao._non_empty(items)
+        if items is None:
+            return 0
+        fields = list(self._field_names())
+        columns = [field.lstrip('_') for field in fields]
+        data_columns = [column for column in columns if column != 'id']
+        updates = [f'{column}=new.{column}' for column in data_columns]
+
+        with self._tracked_write() as version:
+            if version is not None:
+                # Assignments are evaluated left to right, so the comparison sees the old values.
+                unchanged = ' AND '.join(f'{column} <=> new.{column}' for column in data_columns)
+                updates.insert(0, f'row_version=IF({unchanged}, row_version, new.row_version)')
+            version_params = [version, version] if version is not None else []
+            row_placeholders = f'({", ".join(["%s"] * (len(columns) + len(version_params)))})'
+            partitioned = self._is_partitioned()
+
+            def statements(batch):
+                if partitioned:
+                    self._delete_moved_rows(batch, version)
+                sql = (f'INSERT INTO {self._table_name()} ({", ".join(columns)}{self._version_columns(version)}) '
+                       f'VALUES {", ".join([row_placeholders] * len(batch))} AS new '
+                       f'ON DUPLICATE KEY UPDATE {", ".join(updates)}')
+                yield sql, [param for item in batch for param in [item.__dict__[field] for field in fields] + version_params]
+
+            if not self._observes_writes():
+                return self._run_in_transaction(
+                    statement for batch in CrudDao._batches(items, batch_size) for statement in statements(batch))
+            affected = 0
+            for batch in CrudDao._batches(items, batch_size):
+                ids = [item.__dict__['_id'] for item in batch]
+                before = self._observed_rows(ids, lock=True)
+                affected += self._run_in_transaction(statements(batch))
+                self._report_changes(before, self._observed_rows(ids) + [item for item in batch if item.__dict__['_id'] is None])
+            return affected
+
+    def update_many(self, id_item_pairs: Iterable[tuple[int, Any]], batch_size: int = 500) -> int:
+        """Updates many records by ID in one transaction using batched `CASE` statements.
+
+        As in `update`, fields set to None are left unchanged.
+
+        Args:
+            id_item_pairs (Iterable[tuple[int, Any]]): (id, updated entity) pairs, consumed lazily.
+            batch_size (int): Number of records per statement.
+
+        Returns:
+            int: Number of rows reported as affected by the database.
+        """
+        id_item_pairs = CrudDao._non_empty(id_item_pairs)
+        if id_item_pairs is None:
+            return 0
+        fields = [field for field in self._field_names() if field.lower() != '_id']
+
+        def statements(batch):
+            assignments, params = [], []
+            for field in fields:
+                column = field.lstrip('_')
+                whens = [(id_, item.__dict__[field]) for id_, item in batch if item.__dict__[field] is not None]
+                if not whens:
+                    continue
+                assignments.append(f'{column}=CASE id {" ".join(["WHEN %s THEN %s"] * len(whens))} '
+                                   f'ELSE {column} END')
+                params.extend(value for when in whens for value in when)
+            if not assignments:
+                return
+            if version is not None:
+                assignments.append('row_version=%s')
+                params.append(version)
+            ids = [id_ for id_, _ in batch]
+            sql = (f'UPDATE {self._table_name()} SET {", ".join(assignments)} '
+                   f'WHERE id IN ({", ".join(["%s"] * len(ids))})')
+            yield sql, params + ids
+
+        with self._tracked_write() as version:
+            if not self._observes_writes():
+                return self._run_in_transaction(
+                    statement for batch in CrudDao._batches(id_item_pairs, batch_size) for statement in statements(batch))
+            affected = 0
+            for batch in CrudDao._batches(id_item_pairs, batch_size):
+                ids = [id_ for id_, _ in batch]
+                before = self._observed_rows(ids, lock=True)
+                affected += self._run_in_transaction(statements(batch))
+                self._report_changes(before, self._observed_rows(ids))
+            return affected
 
     def find_all(self) -> list[Any]:
         """Fetches all records from the table.
@@ -92,12 +230,8 @@ class CrudDao(ABC):
         Returns:
             list[Any]: List of entity objects.
         """
-        with self._connection_pool.get_connection() as conn:
-            cursor = conn.cursor()
-            sql = f'SELECT * FROM {self._table_name()}'
-            logger.info(f"[SQL] {sql}")
-            cursor.execute(sql)
-            return [self._entity(*row) for row in cursor.fetchall()]
+        sql = f'SELECT {self._column_names()} FROM {self._table_name()}'
+        return self._run(sql, fetch='all', mapper=lambda rows: [self._entity(*row) for row in rows])
 
     def find_all_as_dict(self) -> dict[int, Any]:
         """Fetches all records and returns them as a dictionary keyed by ID.
@@ -105,13 +239,8 @@ class CrudDao(ABC):
         Returns:
             dict[int, Any]: Dictionary of entity objects.
         """
-        with self._connection_pool.get_connection() as conn:
-            cursor = conn.cursor()
-            sql = f'SELECT * FROM {self._table_name()}'
-            logger.info(f"[SQL] {sql}")
-            cursor.execute(sql)
-            result = {row[0]: self._entity(*row) for row in cursor.fetchall()}
-            return result
+        sql = f'SELECT {self._column_names()} FROM {self._table_name()}'
+        return self._run(sql, fetch='all', mapper=lambda rows: {row[0]: self._entity(*row) for row in rows})
 
     def find_by_id(self, id_: int) -> Any:
         """Fetches a record by its ID.
@@ -122,12 +251,23 @@ class CrudDao(ABC):
         Returns:
             Any: Entity object or None.
         """
-        with self._connection_pool.get_connection() as conn:
-            cursor = conn.cursor()
-            sql = f'SELECT * FROM {self._table_name()} WHERE id={id_}'
-            logger.info(f"[SQL] {sql}")
-            cursor.execute(sql)
-            return cursor.fetchone()
+        sql = f'SELECT {self._column_names()} FROM {self._table_name()} WHERE id={id_}'
+        return self._run(sql, fetch='one')
+
+    def data_version(self) -> int | None:
+        """Returns a checksum of the table contents computed by the database (`CHECKSUM TABLE`).
+
+        The checksum changes whenever a row is inserted, updated or deleted, including bulk
+        loads that bypass change tracking. It is not free: MySQL reads every row of the table
+        (a full scan, though nothing is transferred), so its cost grows with the table. Callers
+        should read it once per batch of reports, e.g. per `ReportSnapshots` instance or per
+        `ReportApi` version check, rather than per request.
+
+        Returns:
+            int | None: The checksum, or None if the table does not exist.
+        """
+        return self._run(f'CHECKSUM TABLE {self._table_name()}', fetch='one',
+                         mapper=lambda row: row[1] if row else None)
 
     def delete(self, id_: int) -> int:
         """Deletes a record by ID.
@@ -138,35 +278,351 @@ class CrudDao(ABC):
         Returns:
             int: Deleted record ID.
         """
-        with self._connection_pool.get_connection() as conn:
-            cursor = conn.cursor()
+        with self._tracked_write() as version:
+            before = self._observed_rows([id_], lock=True)
+            if version is not None:
+                self._run(*self._tombstone_statement(f'id={id_}', [], version))
             sql = f'DELETE FROM {self._table_name()} WHERE id={id_}'
-            logger.info(f"[SQL] {sql}")
-            cursor.execute(sql)
-            conn.commit()
-            return id_
+            self._run(sql, commit=True)
+            self._report_changes(before, [])
+        return id_
+
+    def delete_many(self, ids: Iterable[int], batch_size: int = 1000) -> int:
+        """Deletes many records by ID in one transaction.
+
+        Args:
+            ids (Iterable[int]): Record IDs, consumed lazily.
+            batch_size (int): Number of IDs per `DELETE ... WHERE id IN (...)` statement.
+
+        Returns:
+            int: Number of deleted rows.
+        """
+        ids = CrudDao._non_empty(ids)
+        if ids is None:
+            return 0
+
+        def conditions():
+            for batch in CrudDao._batches(ids, batch_size):
+                yield f'id IN ({", ".join(["%s"] * len(batch))})', batch
+
+        with self._tracked_write() as version:
+            if version is None and not self._observes_writes():
+                return self._run_in_transaction((f'DELETE FROM {self._table_name()} WHERE {condition}', batch)
+                                                for condition, batch in conditions())
+            deleted = 0
+            for condition, batch in conditions():
+                before = self._observed_rows(batch, lock=True)
+                if version is not None:
+                    self._run(*self._tombstone_statement(condition, batch, version))
+                deleted += max(self._run(f'DELETE FROM {self._table_name()} WHERE {condition}', batch).rowcount, 0)
+                self._report_changes(before, [])
+            return deleted
 
     def delete_all(self) -> None:
         """Deletes all records from the table."""
-        with self._connection_pool.get_connection() as conn:
-            cursor = conn.cursor()
+        with self._tracked_write() as version:
+            if version is not None:
+                self._run(*self._tombstone_statement('id>0', [], version))
             sql = f'DELETE FROM {self._table_name()} WHERE id>0'
-            logger.info(f"[SQL] {sql}")
-            cursor.execute(sql)
-            conn.commit()
+            self._run(sql, commit=True)
+            if self._observes_writes():
+                self._table_cleared()
+
+    # --------------------------------------------------------------------
+    # Write observation
+    # --------------------------------------------------------------------
+
+    def _observes_writes(self) -> bool:
+        """Returns whether writes report the rows they change to `_rows_changed`."""
+        return False
+
+    def _rows_changed(self, removed: list[Any], added: list[Any]) -> None:
+        """Receives the rows a write removed and added, inside the write's transaction.
+
+        An updated row is reported as removed with its old values and added with its new ones.
+
+        Args:
+            removed (list[Any]): Entities as they were before the write.
+            added (list[Any]): Entities as they are after the write.
+        """
+
+    def _table_cleared(self) -> None:
+        """Called inside the transaction of `delete_all` instead of `_rows_changed`."""
+
+    def _observed_rows(self, ids: Iterable[int | None], lock: bool = False) -> list[Any]:
+        """Fetches the current rows with the given IDs if writes are observed.
+
+        Args:
+            ids (Iterable[int | None]): Record IDs; None is ignored.
+            lock (bool): Lock the rows (`FOR UPDATE`) until the write commits.
+
+        Returns:
+            list[Any]: Entity objects, or an empty list when writes are not observed.
+        """
+        ids = [id_ for id_ in ids if id_ is not None]
+        if not ids or not self._observes_writes():
+            return []
+        sql = (f'SELECT {self._column_names()} FROM {self._table_name()} '
+               f'WHERE id IN ({", ".join(["%s"] * len(ids))}){" FOR UPDATE" if lock else ""}')
+        return self._run(sql, ids, fetch='all', mapper=lambda rows: [self._entity(*row) for row in rows])
+
+    def _report_changes(self, removed: list[Any], added: list[Any]) -> None:
+        """Passes the rows changed by a write to `_rows_changed` if writes are observed."""
+        if self._observes_writes() and (removed or added):
+            self._rows_changed(removed, added)
+
+    # --------------------------------------------------------------------
+    # Statement execution
+    # --------------------------------------------------------------------
+
+    @contextmanager
+    def _connection(self, timer: StatementTimer) -> Iterator[Any]:
+        """Checks out a pooled connection, measuring the wait as the `pool_wait` phase.
+
+        Inside an active `UnitOfWork` on the same pool, its bound connection is used instead.
+
+        Args:
+            timer (StatementTimer): Timer of the statement the connection is used for.
+
+        Yields:
+            Any: An open database connection, returned to the pool on exit.
+        """
+        unit_of_work = current_unit_of_work(self._connection_pool)
+        if unit_of_work is not None:
+            yield unit_of_work.connection
+            return
+        with timer.phase('pool_wait'):
+            pooled_connection = self._connection_pool.get_connection()
+        with pooled_connection as conn:
+            yield conn
+
+    def _run(self, sql: str, params: Sequence[Any] | None = None, *, fetch: str | None = None,
+             mapper: Callable[[Any], Any] | None = None, commit: bool = False) -> Any:
+        """Executes a single statement on a pooled connection and measures every phase.
+
+        Args:
+            sql (str): SQL statement.
+            params (Sequence[Any] | None): Values for `%s` placeholders.
+            fetch (str | None): 'all' to fetch all rows, 'one' to fetch a single row, None to fetch nothing.
+            mapper (Callable[[Any], Any] | None): Function applied to the fetched rows, measured as `mapping`.
+            commit (bool): Whether to commit after executing the statement.
+
+        Returns:
+            Any: The fetched (and mapped) rows, or the cursor when nothing is fetched.
+        """
+        timer = self._instrumentation.timer(sql)
+        commit = commit and current_unit_of_work(self._connection_pool) is None
+        try:
+            with self._connection(timer) as conn:
+                return self._execute(conn, timer, sql, params, fetch=fetch, mapper=mapper, commit=commit)
+        finally:
+            timer.finish()
+
+    def _run_in_transaction(self, statements: Iterable[tuple[str, Sequence[Any]]]) -> int:
+        """Executes statements on one pooled connection as a single transaction.
+
+        The transaction is committed once after the last statement and rolled back if any
+        statement fails. Inside an active `UnitOfWork` both are left to the unit of work.
+
+        Args:
+            statements (Iterable[tuple[str, Sequence[Any]]]): (sql, params) pairs, consumed lazily.
+
+        Returns:
+            int: Total number of rows reported as affected by the database.
+        """
+        statements = iter(statements)
+        first = next(statements, None)
+        if first is None:
+            return 0
+        timer = self._instrumentation.timer(first[0])
+        owns_transaction = current_unit_of_work(self._connection_pool) is None
+        affected = 0
+        try:
+            with self._connection(timer) as conn:
+                try:
+                    for sql, params in chain([first], statements):
+                        timer = timer or self._instrumentation.timer(sql)
+                        affected += max(self._execute(conn, timer, sql, params).rowcount, 0)
+                        timer.finish()
+                        timer = None
+                    if owns_transaction:
+                        conn.commit()
+                except Exception:
+                    if owns_transaction:
+                        conn.rollback()
+                    raise
+        finally:
+            if timer is not None:
+                timer.finish()
+        return affected
+
+    def _iter_batches(self, sql: str, batch_size: int, mapper: Callable[[list[Any]], Any]) -> Iterator[Any]:
+        """Executes a query and yields its rows `batch_size` at a time, mapped by `mapper`.
+
+        The pooled connection stays checked out until the iterator is exhausted or closed.
+
+        Args:
+            sql (str): SQL query.
+            batch_size (int): Number of rows fetched per round trip.
+            mapper (Callable[[list[Any]], Any]): Function applied to each batch, measured as `mapping`.
+
+        Yields:
+            Any: Mapped batches in result order.
+        """
+        timer = self._instrumentation.timer(sql)
+        try:
+            with self._connection(timer) as conn:
+                cursor = conn.cursor()
+                log_sql(logger, sql)
+                with timer.phase('execute'):
+                    cursor.execute(sql)
+                while True:
+                    with timer.phase('fetch'):
+                        rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    timer.rows += len(rows)
+                    with timer.phase('mapping'):
+                        batch = mapper(rows)
+                    yield batch
+        finally:
+            timer.finish()
+
+    @staticmethod
+    def _execute(conn: Any, timer: StatementTimer, sql: str, params: Sequence[Any] | None = None, *,
+                 fetch: str | None = None, mapper: Callable[[Any], Any] | None = None, commit: bool = False) -> Any:
+        """Executes a statement on an open connection, measuring the execute, fetch and mapping phases.
+
+        Args:
+            conn (Any): Open database connection.
+            timer (StatementTimer): Timer of the statement.
+            sql (str): SQL statement.
+            params (Sequence[Any] | None): Values for `%s` placeholders.
+            fetch (str | None): 'all', 'one' or None, as in `_run`.
+            mapper (Callable[[Any], Any] | None): Function applied to the fetched rows.
+            commit (bool): Whether to commit after executing the statement.
+
+        Returns:
+            Any: The fetched (and mapped) rows, or the cursor when nothing is fetched.
+        """
+        cursor = conn.cursor()
+        log_sql(logger, sql)
+        with timer.phase('execute'):
+            cursor.execute(sql) if params is None else cursor.execute(sql, params)
+            if commit:
+                conn.commit()
+        if fetch == 'all':
+            with timer.phase('fetch'):
+                result = cursor.fetchall()
+            timer.rows = len(result)
+        elif fetch == 'one':
+            with timer.phase('fetch'):
+                result = cursor.fetchone()
+            timer.rows = int(result is not None)
+        else:
+            result = cursor
+            timer.rows = max(cursor.rowcount, 0)
+        if mapper:
+            with timer.phase('mapping'):
+                result = mapper(result)
+        return result
+
+    # --------------------------------------------------------------------
+    # Change tracking
+    # --------------------------------------------------------------------
+
+    @contextmanager
+    def _tracked_write(self) -> Iterator[int | None]:
+        """Yields the row version for the wrapped write, or None without change tracking.
+
+        Tracked and observed writes, and writes to tables with `_partition_columns`, run in a
+        unit of work. The version counter row stays locked until the write commits, so versions
+        become visible in increasing order.
+        """
+        if not self._tracks_changes and not self._observes_writes() and not self._partition_columns:
+            yield None
+            return
+        with UnitOfWork(self._connection_pool):
+            yield self._next_version() if self._tracks_changes else None
+
+    def _next_version(self) -> int:
+        """Increments and returns the change version counter of this table."""
+        sql = (f'INSERT INTO {CHANGE_VERSIONS_TABLE} (table_name, version) VALUES (%s, LAST_INSERT_ID(1)) '
+               f'ON DUPLICATE KEY UPDATE version=LAST_INSERT_ID(version + 1)')
+        return self._run(sql, [self._table_name()]).lastrowid
+
+    def _tombstone_statement(self, condition: str, params: list[Any], version: int) -> tuple[str, list[Any]]:
+        """Returns a statement recording tombstones for the rows matching the condition."""
+        columns = ''.join(f', {column}' for column in self._tombstone_columns)
+        sql = (f'REPLACE INTO {self._table_name()}_tombstones (id, row_version{columns}) '
+               f'SELECT id, %s{columns} FROM {self._table_name()} WHERE {condition}')
+        return sql, [version, *params]
+
+    def _is_partitioned(self) -> bool:
+        """Returns whether the table is partitioned; only checked if it has `_partition_columns`."""
+        if not self._partition_columns:
+            return False
+        sql = ('SELECT COUNT(*) FROM information_schema.PARTITIONS '
+               'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND PARTITION_NAME IS NOT NULL')
+        return self._run(sql, [self._table_name()], fetch='one', mapper=lambda row: bool(row and row[0]))
+
+    def _delete_moved_rows(self, items: list[Any], version: int | None) -> None:
+        """Deletes rows with an item's ID but different partition columns, recording tombstones.
+
+        Runs on the connection of the active unit of work, i.e. inside the caller's transaction.
+        """
+        keys = [(item.__dict__['_id'], *[item.__dict__[f'_{column}'] for column in self._partition_columns])
+                for item in items if item.__dict__['_id'] is not None]
+        if not keys:
+            return
+        key_placeholder = f'({", ".join(["%s"] * len(keys[0]))})'
+        condition = (f'id IN ({", ".join(["%s"] * len(keys))}) '
+                     f'AND (id, {", ".join(self._partition_columns)}) NOT IN ({", ".join([key_placeholder] * len(keys))})')
+        params = [key[0] for key in keys] + [value for key in keys for value in key]
+        if version is not None:
+            self._run(*self._tombstone_statement(condition, params, version))
+        self._run(f'DELETE FROM {self._table_name()} WHERE {condition}', params)
+
+    @staticmethod
+    def _version_columns(version: int | None) -> str:
+        """Returns the version column names appended to an INSERT column list."""
+        return ', row_version, created_version' if version is not None else ''
+
+    @staticmethod
+    def _version_values(version: int | None) -> str:
+        """Returns the version values appended to an INSERT row."""
+        return f', {version}, {version}' if version is not None else ''
 
     # --------------------------------------------------------------------
     # SQL helper methods
     # --------------------------------------------------------------------
 
+    @staticmethod
+    def _non_empty(items: Iterable[Any]) -> Iterator[Any] | None:
+        """Returns an iterator over the items, or None if there are none."""
+        items = iter(items)
+        first = next(items, None)
+        return None if first is None else chain([first], items)
+
+    @staticmethod
+    def _batches(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+        """Splits an iterable into lists of at most `size` elements."""
+        items = iter(items)
+        while batch := list(islice(items, size)):
+            yield batch
+
     def _table_name(self) -> str:
-        """Returns the table name based on the entity class name."""
-        return inflection.tableize(self._entity_type.__name__)
+        """Returns `_table`, or the table name based on the entity class name."""
+        return self._table or inflection.tableize(self._entity_type.__name__)
 
     def _field_names(self) -> list[str]:
         """Returns a list of field names from the entity class."""
         return self._entity().__dict__.keys()
 
+    def _column_names(self) -> str:
+        """Returns the entity column names for SQL SELECT, in field order."""
+        return ', '.join(field.lstrip('_') for field in self._field_names())
+
     def _column_names_for_insert(self) -> str:
         """Returns column names for SQL INSERT, excluding '_id'."""
         fields = [field.lstrip('_') for field in self._field_names() if field.lower() != '_id']
@@ -196,12 +652,161 @@ class CrudDao(ABC):
         ])
 
 
+class SummaryDao(CrudDao):
+    """Data access object for the trip summary tables.
+
+    `agency_stats` holds the number and price sum of the valid trips of each agency,
+    `destination_stats` the number of trips per destination and `destination_agency_stats`
+    the number of trips per destination and agency. Trips without an agency are not counted
+    per agency. `refresh` recomputes the tables from `trips`; between refreshes a `TripDbDao`
+    created with this DAO keeps them current with `apply_changes` in each write's transaction.
+    Counts that drop to zero stay in the tables and are skipped by the reads.
+    """
+
+    _VALID_TRIP_CONDITION = ("REGEXP_LIKE(destination, '^[A-Za-z[:space:]]+$', 'c') "
+                             "AND price >= 0 AND num_of_people >= 0")
+
+    def __init__(self, connection_pool: MySQLConnectionPool, instrumentation: QueryInstrumentation | None = None):
+        """Initializes the DAO with AgencyStats as the entity."""
+        super().__init__(connection_pool, AgencyStats, instrumentation)
+
+    def is_available(self) -> bool:
+        """Checks whether all summary tables exist in the current database.
+
+        Returns:
+            bool: True if the summary tables can be read.
+        """
+        sql = (f'SELECT COUNT(*) FROM information_schema.tables '
+               f'WHERE table_schema = DATABASE() AND table_name IN ({", ".join(["%s"] * len(SUMMARY_TABLES))})')
+        return self._run(sql, SUMMARY_TABLES, fetch='one')[0] == len(SUMMARY_TABLES)
+
+    def refresh(self) -> None:
+        """Recomputes all summary tables from the trips table in one transaction."""
+        with UnitOfWork(self._connection_pool):
+            self.clear()
+            self._run(f'INSERT INTO agency_stats (id, trip_count, price_sum) '
+                      f'SELECT agency_id, COUNT(*), SUM(price) FROM trips '
+                      f'WHERE agency_id IS NOT NULL AND {SummaryDao._VALID_TRIP_CONDITION} GROUP BY agency_id')
+            self._run('INSERT INTO destination_stats (destination, trip_count) '
+                      'SELECT destination, COUNT(*) FROM trips GROUP BY destination')
+            self._run('INSERT INTO destination_agency_stats (destination, agency_id, trip_count) '
+                      'SELECT destination, agency_id, COUNT(*) FROM trips '
+                      'WHERE agency_id IS NOT NULL GROUP BY destination, agency_id')
+
+    def clear(self) -> None:
+        """Resets all summary tables, as for an empty trips table."""
+        with UnitOfWork(self._connection_pool):
+            for table in SUMMARY_TABLES:
+                self._run(f'DELETE FROM {table}')
+
+    def apply_changes(self, removed: Iterable[Trip], added: Iterable[Trip]) -> None:
+        """Adjusts the summary tables by the trips a write removed and added.
+
+        Args:
+            removed (Iterable[Trip]): Trips as they were before the write.
+            added (Iterable[Trip]): Trips as they are after the write.
+        """
+        agency_counts, agency_prices = Counter(), Counter()
+        destination_counts, destination_agency_counts = Counter(), Counter()
+        for sign, trips in ((-1, removed), (1, added)):
+            for trip in trips:
+                destination_counts[trip.destination] += sign
+                if trip.agency_id is None:
+                    continue
+                destination_agency_counts[(trip.destination, trip.agency_id)] += sign
+                if TripDbDao.is_valid(trip):
+                    agency_counts[trip.agency_id] += sign
+                    agency_prices[trip.agency_id] += sign * trip.price
+
+        with UnitOfWork(self._connection_pool):
+            self._add('agency_stats', ('id',), ('trip_count', 'price_sum'),
+                      [(agency_id, count, agency_prices[agency_id]) for agency_id, count in agency_counts.items()
+                       if count or agency_prices[agency_id]])
+            self._add('destination_stats', ('destination',), ('trip_count',),
+                      [(destination, count) for destination, count in destination_counts.items() if count])
+            self._add('destination_agency_stats', ('destination', 'agency_id'), ('trip_count',),
+                      [(*key, count) for key, count in destination_agency_counts.items() if count])
+
+    def _add(self, table: str, key_columns: tuple[str, ...], value_columns: tuple[str, ...],
+             rows: list[tuple]) -> None:
+        """Adds the values of each row to the stored row with the same key, creating missing rows."""
+        if not rows:
+            return
+        columns = key_columns + value_columns
+        placeholders = f'({", ".join(["%s"] * len(columns))})'
+        sql = (f'INSERT INTO {table} ({", ".join(columns)}) VALUES {", ".join([placeholders] * len(rows))} AS new '
+               f'ON DUPLICATE KEY UPDATE {", ".join(f"{column}={column}+new.{column}" for column in value_columns)}')
+        self._run(sql, [value for row in sorted(rows) for value in row])
+
+    def count_trips_per_countries(self) -> list[tuple[str, int]]:
+        """Reads the number of trips per destination, as `TripDbDao.count_trips_per_countries`.
+
+        Returns:
+            list[tuple[str, int]]: Destination and number of trips.
+        """
+        sql = 'SELECT destination, trip_count FROM destination_stats WHERE trip_count > 0 ORDER BY trip_count DESC'
+        return self._run(sql, fetch='all')
+
+    def countries_with_max_trips_for_agency(self) -> list[tuple[str, int, int]]:
+        """Reads the agency with the most trips per destination, as `TripDbDao.countries_with_max_trips_for_agency`.
+
+        Returns:
+            list[tuple[str, int, int]]: destination, agency_id, number of trips
+        """
+        sql = '''
+            SELECT s.destination, s.agency_id, s.trip_count
+            FROM destination_agency_stats s
+            JOIN (
+                SELECT destination, MAX(trip_count) AS max_trip_count
+                FROM destination_agency_stats
+                GROUP BY destination
+            ) m ON s.destination = m.destination AND s.trip_count = m.max_trip_count
+            WHERE s.trip_count > 0
+            ORDER BY s.destination, s.agency_id
+        '''
+        return self._run(sql.strip(), fetch='all')
+
+
 class TripDbDao(CrudDao):
-    """Data access object for Trip entities."""
+    """Data access object for Trip entities, with change tracking."""
+
+    _tracks_changes = True
+    _tombstone_columns = ('destination', 'agency_id')
+    _partition_columns = ('agency_id',)
+
+    def __init__(self, connection_pool: MySQLConnectionPool, instrumentation: QueryInstrumentation | None = None,
+                 summary_dao: SummaryDao | None = None):
+        """Initializes the DAO with Trip as the entity.
+
+        Args:
+            connection_pool (MySQLConnectionPool): MySQL connection pool.
+            instrumentation (QueryInstrumentation | None): Collector of statement timings.
+            summary_dao (SummaryDao | None): Summary tables kept current by every write while they exist.
+        """
+        super().__init__(connection_pool, Trip, instrumentation)
+        self._summary_dao = summary_dao
+        self._summaries_available = False
+
+    def _observes_writes(self) -> bool:
+        """Observes writes when summary tables are maintained and exist.
+
+        Databases created before the summary tables keep accepting writes without them. Their
+        absence is checked again on later writes; `create_db` computes the tables from scratch
+        when it creates them.
+        """
+        if self._summary_dao is None:
+            return False
+        if not self._summaries_available:
+            self._summaries_available = self._summary_dao.is_available()
+        return self._summaries_available
+
+    def _rows_changed(self, removed: list[Trip], added: list[Trip]) -> None:
+        """Applies the changed trips to the summary tables."""
+        self._summary_dao.apply_changes(removed, added)
 
-    def __init__(self, connection_pool: MySQLConnectionPool):
-        """Initializes the DAO with Trip as the entity."""
-        super().__init__(connection_pool, Trip)
+    def _table_cleared(self) -> None:
+        """Resets the summary tables."""
+        self._summary_dao.clear()
 
     def find_all_valid(self) -> list[Trip]:
         """Fetches all trips that pass validation rules.
@@ -209,28 +814,265 @@ class TripDbDao(CrudDao):
         Returns:
             list[Trip]: List of valid Trip entities.
         """
-        with self._connection_pool.get_connection() as conn:
-            cursor = conn.cursor()
-            sql = f'SELECT * FROM {self._table_name()}'
-            logger.info(f"[SQL] {sql}")
-            cursor.execute(sql)
-            rows = cursor.fetchall()
+        sql = f'SELECT {self._column_names()} FROM {self._table_name()}'
+        return self._run(sql, fetch='all', mapper=self._valid_entities)
+
+    def iter_valid(self, batch_size: int = 1000) -> Iterator[Trip]:
+        """Streams valid trips from the database in batches.
 
+        Rows are fetched `batch_size` at a time, so memory use does not grow with the table.
+        The pooled connection stays checked out until the iterator is exhausted or closed.
+
+        Args:
+            batch_size (int): Number of rows fetched per round trip.
+
+        Yields:
+            Trip: Valid Trip entities in table order.
+        """
+        sql = f'SELECT {self._column_names()} FROM {self._table_name()}'
+        invalid_records = SampledWarnings("Invalid records skipped")
+        try:
+            for trips in self._iter_batches(sql, batch_size, lambda rows: self._valid_entities(rows, invalid_records)):
+                yield from trips
+        finally:
+            invalid_records.log(logger)
+
+    def export_trips(self, path: str, file_format: str | None = None,
+                     batch_size: int = arrow_io.DEFAULT_BATCH_SIZE) -> int:
+        """Writes all trips to a Parquet or Arrow IPC file in streamed record batches.
+
+        Rows are fetched and written `batch_size` at a time, so memory use does not grow with
+        the table. Invalid rows are exported as stored. Requires pyarrow.
+
+        Args:
+            path (str): Output file.
+            file_format (str | None): 'parquet', 'arrow', or None to use the file extension.
+            batch_size (int): Number of rows fetched and written per batch.
+
+        Returns:
+            int: Number of exported trips.
+        """
+        schema = arrow_io.trip_schema()
+        sql = f'SELECT {self._column_names()} FROM {self._table_name()} ORDER BY id'
+        batches = self._iter_batches(sql, batch_size, lambda rows: arrow_io.rows_to_batch(rows, schema))
+        return arrow_io.write_batches(path, schema, batches, file_format)
+
+    def import_trips(self, path: str, file_format: str | None = None,
+                     batch_size: int = arrow_io.DEFAULT_BATCH_SIZE) -> int:
+        """Upserts trips from a Parquet or Arrow IPC file written by `export_trips`.
+
+        The file is read one record batch at a time and each batch is upserted by ID, with
+        the same change tracking and summary maintenance as `upsert_many`. Trips without an
+        ID are inserted as new rows. Requires pyarrow.
+
+        Args:
+            path (str): Input file.
+            file_format (str | None): 'parquet', 'arrow', or None to use the file extension.
+            batch_size (int): Number of rows read and upserted per batch.
+
+        Returns:
+            int: Number of imported trips.
+        """
+        imported = 0
+        for batch in arrow_io.read_batches(path, file_format, batch_size):
+            trips = arrow_io.batch_to_trips(batch)
+            self.upsert_many(trips, batch_size)
+            imported += len(trips)
+        return imported
+
+    def find_all_valid_by_destinations(self, destinations: Iterable[str], chunk_size: int = 1000) -> list[Trip]:
+        """Fetches valid trips whose destination is one of the given countries.
+
+        The filter is pushed down to the database as `WHERE destination IN (...)`. Large
+        destination lists are split into chunks of `chunk_size` placeholders per query.
+
+        Args:
+            destinations (Iterable[str]): Destination countries to include.
+            chunk_size (int): Maximum number of destinations per query.
+
+        Returns:
+            list[Trip]: List of valid Trip entities ordered by ID.
+        """
+        destinations = sorted(set(destinations))
+        invalid_records = SampledWarnings("Invalid records skipped")
+        trips = []
+        for start in range(0, len(destinations), chunk_size):
+            chunk = destinations[start:start + chunk_size]
+            sql = (f'SELECT {self._column_names()} FROM {self._table_name()} '
+                   f'WHERE destination IN ({", ".join(["%s"] * len(chunk))})')
+            trips.extend(self._run(sql, chunk, fetch='all',
+                                   mapper=lambda rows: self._valid_entities(rows, invalid_records)))
+
+        invalid_records.log(logger)
+        return sorted(trips, key=lambda trip: trip.id)
+
+    def agency_ids(self) -> list[int | None]:
+        """Returns the distinct agency IDs of all trips.
+
+        Returns:
+            list[int | None]: Sorted agency IDs, preceded by None if some trips have no agency.
+        """
+        sql = f'SELECT DISTINCT agency_id FROM {self._table_name()} ORDER BY agency_id'
+        return self._run(sql, fetch='all', mapper=lambda rows: [row[0] for row in rows])
+
+    def find_all_valid_by_agency_range(self, first_agency_id: int | None, last_agency_id: int | None) -> list[Trip]:
+        """Fetches valid trips of the agencies with IDs in an inclusive range.
+
+        On a table partitioned by agency_id only the partitions of the range are scanned.
+
+        Args:
+            first_agency_id (int | None): Lowest agency ID, or None together with `last_agency_id`
+                for the trips without an agency.
+            last_agency_id (int | None): Highest agency ID.
+
+        Returns:
+            list[Trip]: List of valid Trip entities ordered by ID.
+        """
+        if first_agency_id is None:
+            where, params = 'WHERE agency_id IS NULL', None
+        else:
+            where, params = 'WHERE agency_id BETWEEN %s AND %s', [first_agency_id, last_agency_id]
+        sql = f'SELECT {self._column_names()} FROM {self._table_name()} {where} ORDER BY id'
+        return self._run(sql, params, fetch='all', mapper=self._valid_entities)
+
+    def _valid_entities(self, rows: list[tuple], invalid_records: SampledWarnings | None = None) -> list[Trip]:
+        """Maps rows to entities and keeps only those that pass validation rules.
+
+        Invalid records are not logged one by one: they are counted and reported as a single
+        sampled warning, either at the end of this call or by the caller owning `invalid_records`.
+
+        Args:
+            rows (list[tuple]): Rows fetched from the trips table.
+            invalid_records (SampledWarnings | None): Summary collecting invalid records across calls.
+
+        Returns:
+            list[Trip]: List of valid Trip entities.
+        """
+        summary = invalid_records if invalid_records is not None else SampledWarnings("Invalid records skipped")
         valid_results = []
         for row in rows:
             entity = self._entity(*row)
-
-            is_valid_destination = entity._destination and re.fullmatch(r'^[A-Za-z\s]+$', entity._destination)
-            is_valid_price = entity._price is not None and isinstance(entity._price, Decimal) and entity._price >= Decimal('0')
-            is_valid_num_of_people = entity._num_of_people is not None and isinstance(entity._num_of_people, int) and entity._num_of_people >= 0
-
-            if is_valid_destination and is_valid_price and is_valid_num_of_people:
+            if TripDbDao.is_valid(entity):
                 valid_results.append(entity)
             else:
-                logger.warning(f"Invalid record: {entity}")
+                summary.add(entity)
 
+        if invalid_records is None:
+            summary.log(logger)
         return valid_results
 
+    @staticmethod
+    def is_valid(trip: Trip) -> bool:
+        """Checks a trip against the validation rules applied by the `*_valid` queries.
+
+        Args:
+            trip (Trip): Trip to check.
+
+        Returns:
+            bool: True if the destination, price and number of people are valid.
+        """
+        is_valid_destination = trip._destination and re.fullmatch(r'^[A-Za-z\s]+$', trip._destination)
+        is_valid_price = trip._price is not None and isinstance(trip._price, Decimal) and trip._price >= Decimal('0')
+        is_valid_num_of_people = trip._num_of_people is not None and isinstance(trip._num_of_people, int) and trip._num_of_people >= 0
+        return bool(is_valid_destination and is_valid_price and is_valid_num_of_people)
+
+    def changes_since(self, cursor: int = 0) -> TripChanges:
+        """Fetches the trips inserted, updated and deleted after a change cursor.
+
+        Both tables are read in one transaction, so the result is a consistent snapshot.
+        Trips are returned whether or not they pass validation; use `is_valid` to drop
+        trips that became invalid. Bulk loads by `create_db` are stamped with a version of
+        their own by `record_bulk_load` and set `reloaded` for cursors before them.
+
+        Args:
+            cursor (int): Cursor returned by the previous call; 0 returns every trip.
+
+        Returns:
+            TripChanges: Changed trips and the cursor to pass to the next call.
+        """
+        rows_sql = (f'SELECT {self._column_names()}, row_version, created_version FROM {self._table_name()} '
+                    f'WHERE row_version > %s ORDER BY row_version, id')
+        tombstones_sql = (f'SELECT id, destination, agency_id, row_version, deleted_at FROM {self._table_name()}_tombstones '
+                          f'WHERE row_version > %s ORDER BY row_version, id')
+        reload_sql = f'SELECT version FROM {CHANGE_VERSIONS_TABLE} WHERE table_name=%s'
+        with UnitOfWork(self._connection_pool):
+            rows = self._run(rows_sql, [cursor], fetch='all')
+            tombstones = self._run(tombstones_sql, [cursor], fetch='all', mapper=lambda found: [TripTombstone(*row) for row in found])
+            reload_version = self._run(reload_sql, [self._reload_marker()], fetch='one', mapper=lambda row: row[0] if row else 0)
+
+        changes = TripChanges(cursor=cursor)
+        live_versions = {}
+        for *values, row_version, created_version in rows:
+            trip = self._entity(*values)
+            (changes.inserted if created_version > cursor else changes.updated).append(trip)
+            live_versions[trip.id] = row_version
+        # A tombstone superseded by a re-inserted row with the same ID is reported as that row.
+        changes.deleted.extend(tombstone for tombstone in tombstones
+                               if live_versions.get(tombstone.id, 0) < tombstone.row_version)
+        versions = [version for *_, version, _ in rows] + [tombstone.row_version for tombstone in tombstones]
+        return TripChanges(changes.inserted, changes.updated, changes.deleted, max(versions, default=cursor),
+                           reloaded=reload_version > cursor)
+
+    def record_bulk_load(self, loaded_table: str | None = None) -> int:
+        """Stamps rows loaded without change tracking with a new change version.
+
+        Without a `loaded_table`, the rows of the table still at version 0 get the new version
+        as theirs and as their creation version. With a staging table that is about to replace
+        the table, its rows get the new version, keeping the creation version of the trip with
+        the same ID, and the trips missing from it get tombstones, so `changes_since` reports
+        the swap as the inserts, updates and deletes it amounts to. The version is also recorded
+        as the table's last reload, reported by `changes_since` as `reloaded`.
+
+        Args:
+            loaded_table (str | None): Staging table with the layout of this table, or None.
+
+        Returns:
+            int: The change version of the load.
+        """
+        with UnitOfWork(self._connection_pool):
+            version = self._next_version()
+            self._run(f'REPLACE INTO {CHANGE_VERSIONS_TABLE} (table_name, version) VALUES (%s, %s)',
+                      [self._reload_marker(), version])
+            if loaded_table is None:
+                self._run(f'UPDATE {self._table_name()} SET row_version=%s, created_version=%s WHERE row_version=0',
+                          [version, version])
+                return version
+            self._run(f'UPDATE {loaded_table} AS loaded LEFT JOIN {self._table_name()} AS current ON current.id = loaded.id '
+                      f'SET loaded.row_version=%s, loaded.created_version=COALESCE(current.created_version, %s)',
+                      [version, version])
+            self._run(*self._tombstone_statement(f'id NOT IN (SELECT id FROM {loaded_table})', [], version))
+        return version
+
+    def _reload_marker(self) -> str:
+        """Returns the change version counter name holding the version of the last bulk load."""
+        return f'{self._table_name()}:reload'
+
+    def row_hashes(self) -> dict[int, str]:
+        """Fetches a content hash of every trip, computed by the database.
+
+        Only IDs and 32-character digests are transferred; the hashes match `row_hash`.
+
+        Returns:
+            dict[int, str]: Trip ID mapped to the MD5 hex digest of its columns.
+        """
+        sql = (f"SELECT id, MD5(CONCAT_WS('|', destination, price, COALESCE(num_of_people, ''), "
+               f"COALESCE(agency_id, ''))) FROM {self._table_name()}")
+        return self._run(sql, fetch='all', mapper=dict)
+
+    @staticmethod
+    def row_hash(trip: Trip) -> str:
+        """Computes the hash `row_hashes` reports for a stored trip.
+
+        Args:
+            trip (Trip): Trip whose price has two decimal places, as stored in `DECIMAL(10,2)`.
+
+        Returns:
+            str: MD5 hex digest of the trip columns.
+        """
+        values = [trip.destination, trip.price, trip.num_of_people, trip.agency_id]
+        joined = '|'.join('' if value is None else str(value) for value in values)
+        return hashlib.md5(joined.encode('utf-8')).hexdigest()
+
     def find_by_agency_id(self, agency_id: int) -> list[Trip]:
         """Finds trips for a specific agency ID.
 
@@ -240,59 +1082,217 @@ class TripDbDao(CrudDao):
         Returns:
             list[Trip]: List of matching Trip records.
         """
-        with self._connection_pool.get_connection() as conn:
-            cursor = conn.cursor()
-            sql = f'SELECT * FROM {self._table_name()} WHERE agency_id={agency_id}'
-            logger.info(f"[SQL] {sql}")
-            cursor.execute(sql)
-            return cursor.fetchall()
+        sql = f'SELECT {self._column_names()} FROM {self._table_name()} WHERE agency_id={agency_id}'
+        return self._run(sql, fetch='all')
 
-    def count_trips_per_countries(self) -> list[tuple[str, int]]:
+    def count_trips_per_countries(self, agency_ids: Iterable[int] | None = None) -> list[tuple[str, int]]:
         """Counts number of trips per destination.
 
+        Args:
+            agency_ids (Iterable[int] | None): Count only trips of these agencies. On a table
+                partitioned by agency_id only their partitions are scanned. All trips when None.
+
         Returns:
             list[tuple[str, int]]: Destination and number of trips.
         """
-        with self._connection_pool.get_connection() as conn:
-            cursor = conn.cursor()
-            sql = '''
-                SELECT destination, COUNT(*) AS number_of_trips 
-                FROM trips 
-                GROUP BY destination 
-                ORDER BY number_of_trips DESC
-            '''
-            logger.info(f"[SQL] {sql.strip()}")
-            cursor.execute(sql)
-            return cursor.fetchall()
+        where, params = TripDbDao._agency_filter(agency_ids)
+        sql = f'''
+            SELECT destination, COUNT(*) AS number_of_trips 
+            FROM trips {where}
+            GROUP BY destination 
+            ORDER BY number_of_trips DESC
+        '''
+        return self._run(sql.strip(), params, fetch='all')
 
-    def countries_with_max_trips_for_agency(self) -> list[tuple[str, int, int]]:
+    def countries_with_max_trips_for_agency(self, agency_ids: Iterable[int] | None = None) -> list[tuple[str, int, int]]:
         """Finds the agency with the most trips per destination.
 
+        Trips without an agency are not counted, the same as in `SummaryDao`.
+
+        Args:
+            agency_ids (Iterable[int] | None): Compare only these agencies. On a table
+                partitioned by agency_id only their partitions are scanned. All agencies when None.
+
         Returns:
             list[tuple[str, int, int]]: destination, agency_id, number of trips
         """
-        with self._connection_pool.get_connection() as conn:
-            cursor = conn.cursor()
-            sql = '''
-                WITH TripCounts AS (
-                    SELECT destination, agency_id, COUNT(*) AS trip_count
-                    FROM trips
-                    GROUP BY destination, agency_id
-                ),
-                MaxTrips AS (
-                    SELECT destination, MAX(trip_count) AS max_trip_count
-                    FROM TripCounts
-                    GROUP BY destination
-                )
-                SELECT t.destination, t.agency_id, t.trip_count 
-                FROM TripCounts t
-                JOIN MaxTrips m ON t.destination = m.destination AND t.trip_count = m.max_trip_count
-                ORDER BY t.destination, t.agency_id
-            '''
-            logger.info(f"[SQL] {sql.strip()}")
-            cursor.execute(sql)
-            return cursor.fetchall()
-
-
-# Instantiate the DAO
-trip_db_dao = TripDbDao(connection_pool)
+        where, params = TripDbDao._agency_filter(agency_ids, with_agency=True)
+        sql = f'''
+            WITH TripCounts AS (
+                SELECT destination, agency_id, COUNT(*) AS trip_count
+                FROM trips {where}
+                GROUP BY destination, agency_id
+            ),
+            MaxTrips AS (
+                SELECT destination, MAX(trip_count) AS max_trip_count
+                FROM TripCounts
+                GROUP BY destination
+            )
+            SELECT t.destination, t.agency_id, t.trip_count 
+            FROM TripCounts t
+            JOIN MaxTrips m ON t.destination = m.destination AND t.trip_count = m.max_trip_count
+            ORDER BY t.destination, t.agency_id
+        '''
+        return self._run(sql.strip(), params, fetch='all')
+
+    def countries_with_max_trips_for_agency_names(self, agency_ids: Iterable[int] | None = None) -> list[tuple[str, str, int]]:
+        """Finds the agency with the most trips per destination, with agency names joined from `agencies`.
+
+        Same as `countries_with_max_trips_for_agency`, but the names are resolved by the database,
+        so no per-row lookup is needed. Requires the `agencies` table (see `AgencyDbRepo`).
+
+        Args:
+            agency_ids (Iterable[int] | None): Compare only these agencies. All agencies when None.
+
+        Returns:
+            list[tuple[str, str, int]]: destination, agency name ('Unknown agency' if missing), number of trips
+        """
+        where, params = TripDbDao._agency_filter(agency_ids, with_agency=True)
+        sql = f'''
+            WITH TripCounts AS (
+                SELECT destination, agency_id, COUNT(*) AS trip_count
+                FROM trips {where}
+                GROUP BY destination, agency_id
+            ),
+            MaxTrips AS (
+                SELECT destination, MAX(trip_count) AS max_trip_count
+                FROM TripCounts
+                GROUP BY destination
+            )
+            SELECT t.destination, COALESCE(a.name, 'Unknown agency'), t.trip_count
+            FROM TripCounts t
+            JOIN MaxTrips m ON t.destination = m.destination AND t.trip_count = m.max_trip_count
+            LEFT JOIN agencies a ON a.id = t.agency_id
+            ORDER BY t.destination, t.agency_id
+        '''
+        return self._run(sql.strip(), params, fetch='all')
+
+    @staticmethod
+    def _agency_filter(agency_ids: Iterable[int] | None, with_agency: bool = False) -> tuple[str, list[int] | None]:
+        """Returns a `WHERE agency_id IN (...)` clause and its parameters, or no filter for None.
+
+        A literal IN list on the partitioning column lets MySQL prune partitions. With
+        `with_agency`, trips without an agency are excluded when no IDs are given, as they are
+        from the summary tables.
+        """
+        if agency_ids is None:
+            return ('WHERE agency_id IS NOT NULL', None) if with_agency else ('', None)
+        agency_ids = sorted(set(agency_ids))
+        if not agency_ids:
+            return 'WHERE FALSE', None
+        return f'WHERE agency_id IN ({", ".join(["%s"] * len(agency_ids))})', agency_ids
+
+
+class AgencyDbRepo(CrudDao):
+    """Agency repository backed by the `agencies` table, with the interface of `AgencyRepo`.
+
+    Lookups by ID go through an in-process LRU cache, so repeated lookups of the same agency
+    (e.g. one per trip) query the database once. Every write through this repository clears the
+    cache, again when its transaction commits or rolls back; call `clear_cache` after the table
+    is changed by other means. Lookups inside a `UnitOfWork` may see uncommitted rows, so they
+    bypass the cache.
+    With agencies in the database, reports can also resolve names with a JOIN (see
+    `TripDbDao.countries_with_max_trips_for_agency_names`).
+    """
+
+    _table = 'agencies'
+
+    def __init__(self, connection_pool: MySQLConnectionPool, instrumentation: QueryInstrumentation | None = None,
+                 cache_size: int = 4096):
+        """Initializes the repository with AgencyRecord as the entity.
+
+        Args:
+            connection_pool (MySQLConnectionPool): MySQL connection pool.
+            instrumentation (QueryInstrumentation | None): Collector of statement timings.
+            cache_size (int): Maximum number of cached lookups by ID.
+        """
+        super().__init__(connection_pool, AgencyRecord, instrumentation)
+        self._cached_by_id = functools.lru_cache(maxsize=cache_size)(self._fetch_by_id)
+        self._cache_generation = 0
+
+    def get_agencies(self) -> list[Agency]:
+        """Returns all agencies ordered by ID.
+
+        Returns:
+            list[Agency]: A list of Agency objects.
+        """
+        sql = f'SELECT {self._column_names()} FROM {self._table_name()} ORDER BY id'
+        return self._run(sql, fetch='all', mapper=lambda rows: [Agency(*row) for row in rows])
+
+    def get_by_id(self, agency_id: int) -> Agency | None:
+        """Returns an agency based on its identifier, from the cache if it was looked up before.
+
+        Args:
+            agency_id (int): Agency identifier.
+
+        Returns:
+            Agency | None: The Agency object with the specified ID, or None if not found.
+        """
+        if current_unit_of_work(self._connection_pool) is not None:
+            return self._fetch_by_id(agency_id)
+        generation = self._cache_generation
+        agency = self._cached_by_id(agency_id)
+        if generation != self._cache_generation:
+            # A write completed during the lookup, which may have cached the row it replaced.
+            self._cached_by_id.cache_clear()
+        return agency
+
+    def agency_name_for_id(self, agency_id: int) -> str:
+        """Returns the agency name based on its identifier.
+
+        Args:
+            agency_id (int): Agency identifier.
+
+        Returns:
+            str: The agency name or 'Unknown agency' if the agency does not exist.
+        """
+        agency = self.get_by_id(agency_id)
+        return agency.name if agency else 'Unknown agency'
+
+    def replace_all(self, agencies: Iterable[Agency], batch_size: int = 1000) -> int:
+        """Replaces the contents of the table with the given agencies, in one transaction.
+
+        Args:
+            agencies (Iterable[Agency]): Agencies to store.
+            batch_size (int): Number of rows per INSERT statement.
+
+        Returns:
+            int: Number of stored agencies.
+        """
+        records = [AgencyRecord(agency.id, agency.name, agency._localization) for agency in agencies]
+        with UnitOfWork(self._connection_pool) as unit_of_work:
+            unit_of_work.after_completion(self.clear_cache)
+            self._run(f'DELETE FROM {self._table_name()}')
+            self.upsert_many(records, batch_size)
+        return len(records)
+
+    def clear_cache(self) -> None:
+        """Forgets all cached lookups."""
+        self._cache_generation += 1
+        self._cached_by_id.cache_clear()
+
+    @contextmanager
+    def _tracked_write(self) -> Iterator[int | None]:
+        """Wraps every inherited write, clearing the cached lookups once it is done.
+
+        Inside a unit of work the cache is cleared again when the outermost transaction ends,
+        dropping rows other threads cached before the write was committed or rolled back.
+        """
+        unit_of_work = current_unit_of_work(self._connection_pool)
+        if unit_of_work is not None:
+            unit_of_work.after_completion(self.clear_cache)
+        try:
+            with super()._tracked_write() as version:
+                yield version
+        finally:
+            self.clear_cache()
+
+    def _fetch_by_id(self, agency_id: int) -> Agency | None:
+        """Reads one agency from the table."""
+        sql = f'SELECT {self._column_names()} FROM {self._table_name()} WHERE id=%s'
+        return self._run(sql, [agency_id], fetch='one', mapper=lambda row: Agency(*row) if row else None)
+
+
+# Instantiate the DAOs
+summary_dao = SummaryDao(connection_pool)
+trip_db_dao = TripDbDao(connection_pool, summary_dao=summary_dao)
@@ -0,0 +1,205 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator
+import logging
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+PHASES = ('pool_wait', 'execute', 'fetch', 'mapping')
+
+
+def statement_fingerprint(sql: str, max_length: int = 500) -> str:
+    """Normalizes a SQL statement so that statements differing only in literals share one key.
+
+    Only the first `max_length` characters are inspected, so fingerprinting a multi-megabyte
+    `INSERT ... VALUES` costs the same as a short query.
+
+    Args:
+        sql (str): SQL statement.
+        max_length (int): Number of leading characters to normalize.
+
+    Returns:
+        str: The statement with literals replaced by `?` and value lists collapsed.
+    """
+    fingerprint = sql[:max_length]
+    if len(sql) > max_length:
+        fingerprint = fingerprint[:fingerprint.rfind(')') + 1] or fingerprint
+    fingerprint = re.sub(r"'(?:[^'\\]|\\.)*'", '?', fingerprint)
+    fingerprint = re.sub(r'\b\d+(?:\.\d+)?\b', '?', fingerprint)
+    fingerprint = re.sub(r'%s', '?', fingerprint)
+    fingerprint = re.sub(r'\(\s*\?(?:\s*,\s*\?)*\s*\)', '(?)', fingerprint)
+    fingerprint = re.sub(r'(\(\?\))(?:\s*,\s*\(\?\))+', r'\1, ...', fingerprint)
+    fingerprint = re.sub(r'\?(?:\s*,\s*\?)+', '?, ...', fingerprint)
+    fingerprint = re.sub(r'\s+', ' ', fingerprint).strip()
+    return f'{fingerprint} ...' if len(sql) > max_length and not fingerprint.endswith('...') else fingerprint
+
+
+@dataclass
+class StatementStats:
+    """Aggregated measurements of one statement fingerprint.
+
+    Attributes:
+        statement (str): Statement fingerprint.
+        calls (int): Number of executions.
+        rows (int): Total number of fetched or affected rows.
+        slow_calls (int): Number of executions slower than the slow-query threshold.
+        max_seconds (float): Longest single execution, all phases included.
+        phase_seconds (dict[str, float]): Total seconds spent in each phase.
+    """
+    statement: str
+    calls: int = 0
+    rows: int = 0
+    slow_calls: int = 0
+    max_seconds: float = 0.0
+    phase_seconds: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+
+    @property
+    def total_seconds(self) -> float:
+        """Returns the total time spent in all phases."""
+        return sum(self.phase_seconds.values())
+
+
+class StatementTimer:
+    """Collects phase durations and the row count of a single statement execution.
+
+    Attributes:
+        sql (str): Executed SQL statement.
+        rows (int): Number of fetched or affected rows.
+        phases (dict[str, float]): Seconds spent in each phase.
+    """
+
+    def __init__(self, instrumentation: 'QueryInstrumentation', sql: str):
+        """Starts timing a statement.
+
+        Args:
+            instrumentation (QueryInstrumentation): Collector receiving the measurements.
+            sql (str): Executed SQL statement.
+        """
+        self._instrumentation = instrumentation
+        self.sql = sql
+        self.rows = 0
+        self.phases: dict[str, float] = defaultdict(float)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Measures the wrapped block as the given phase.
+
+        Args:
+            name (str): Phase name, one of `PHASES`.
+        """
+        if not self._instrumentation.enabled:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - started
+
+    def finish(self) -> None:
+        """Reports the collected measurements to the instrumentation."""
+        if self._instrumentation.enabled:
+            self._instrumentation.record(self.sql, self.phases, self.rows)
+
+
+class QueryInstrumentation:
+    """Thread-safe collector of per-statement timings with a slow-query log and Prometheus export.
+
+    Attributes:
+        enabled (bool): Whether measurements are collected.
+        slow_query_seconds (float | None): Executions slower than this are logged as warnings.
+            None disables the slow-query log.
+    """
+
+    def __init__(self, enabled: bool = True, slow_query_seconds: float | None = 1.0):
+        """Initializes an empty collector.
+
+        Args:
+            enabled (bool): Whether measurements are collected.
+            slow_query_seconds (float | None): Slow-query threshold in seconds.
+        """
+        self.enabled = enabled
+        self.slow_query_seconds = slow_query_seconds
+        self._stats: dict[str, StatementStats] = {}
+        self._lock = threading.Lock()
+
+    def timer(self, sql: str) -> StatementTimer:
+        """Creates a timer for one execution of the statement.
+
+        Args:
+            sql (str): SQL statement about to be executed.
+
+        Returns:
+            StatementTimer: Timer to measure phases with.
+        """
+        return StatementTimer(self, sql)
+
+    def record(self, sql: str, phases: dict[str, float], rows: int) -> None:
+        """Adds the measurements of one execution.
+
+        Args:
+            sql (str): Executed SQL statement.
+            phases (dict[str, float]): Seconds spent in each phase.
+            rows (int): Number of fetched or affected rows.
+        """
+        fingerprint = statement_fingerprint(sql)
+        elapsed = sum(phases.values())
+        is_slow = self.slow_query_seconds is not None and elapsed > self.slow_query_seconds
+        with self._lock:
+            stats = self._stats.setdefault(fingerprint, StatementStats(fingerprint))
+            stats.calls += 1
+            stats.rows += rows
+            stats.slow_calls += is_slow
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            for phase, seconds in phases.items():
+                stats.phase_seconds[phase] += seconds
+        if is_slow:
+            logger.warning(f"[SLOW SQL] {elapsed:.3f}s, {rows} rows: {fingerprint}")
+
+    def snapshot(self) -> list[StatementStats]:
+        """Returns the collected statistics, slowest statements first.
+
+        Returns:
+            list[StatementStats]: Copies of the per-statement statistics.
+        """
+        with self._lock:
+            stats = [StatementStats(s.statement, s.calls, s.rows, s.slow_calls, s.max_seconds, dict(s.phase_seconds))
+                     for s in self._stats.values()]
+        return sorted(stats, key=lambda s: s.total_seconds, reverse=True)
+
+    def reset(self) -> None:
+        """Discards all collected statistics."""
+        with self._lock:
+            self._stats.clear()
+
+    def to_prometheus(self, prefix: str = 'travel_agency_sql') -> str:
+        """Exports the statistics in the Prometheus text exposition format.
+
+        Args:
+            prefix (str): Metric name prefix.
+
+        Returns:
+            str: Metrics text ending with a newline.
+        """
+        def label(value: str) -> str:
+            return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+        stats = self.snapshot()
+        lines = [f'# HELP {prefix}_phase_seconds_total Time spent per statement and phase.',
+                 f'# TYPE {prefix}_phase_seconds_total counter']
+        for s in stats:
+            for phase, seconds in s.phase_seconds.items():
+                lines.append(f'{prefix}_phase_seconds_total{{statement="{label(s.statement)}",phase="{phase}"}} {seconds}')
+        for metric, help_text, attribute in (('calls_total', 'Number of executions.', 'calls'),
+                                             ('rows_total', 'Fetched or affected rows.', 'rows'),
+                                             ('slow_calls_total', 'Executions above the slow-query threshold.', 'slow_calls')):
+            lines += [f'# HELP {prefix}_{metric} {help_text}', f'# TYPE {prefix}_{metric} counter']
+            lines += [f'{prefix}_{metric}{{statement="{label(s.statement)}"}} {getattr(s, attribute)}' for s in stats]
+        return '\n'.join(lines) + '\n'
+
+
+query_instrumentation = QueryInstrumentation()
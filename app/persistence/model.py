@@ -1,4 +1,5 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from datetime import datetime
 from decimal import Decimal
 
 # --------------------------------------------------
@@ -63,3 +64,114 @@ class Trip:
         if self.price is None:
             raise TypeError("Price must be set to calculate income.")
         return self.price * vat_rate * margin
+
+
+@dataclass(frozen=True)
+class AgencyRecord:
+    """Represents a row of the `agencies` table.
+
+    Attributes:
+        _id (int | None): Agency identifier.
+        _name (str | None): Agency name.
+        _localization (str | None): Agency location.
+    """
+    _id: int | None = None
+    _name: str | None = None
+    _localization: str | None = None
+
+    @property
+    def id(self) -> int | None: # pragma: no cover
+        """Returns the agency ID."""
+        return self._id
+
+    @property
+    def name(self) -> str | None: # pragma: no cover
+        """Returns the agency name."""
+        return self._name
+
+    @property
+    def localization(self) -> str | None: # pragma: no cover
+        """Returns the agency location."""
+        return self._localization
+
+
+@dataclass(frozen=True)
+class AgencyStats:
+    """Summary of the valid trips of one agency, a row of the `agency_stats` table.
+
+    Attributes:
+        _id (int | None): ID of the agency.
+        _trip_count (int): Number of valid trips.
+        _price_sum (Decimal): Sum of the prices of the valid trips.
+    """
+    _id: int | None = None
+    _trip_count: int = 0
+    _price_sum: Decimal = Decimal('0')
+
+    @property
+    def id(self) -> int | None: # pragma: no cover
+        """Returns the agency ID."""
+        return self._id
+
+    @property
+    def trip_count(self) -> int: # pragma: no cover
+        """Returns the number of valid trips."""
+        return self._trip_count
+
+    @property
+    def price_sum(self) -> Decimal: # pragma: no cover
+        """Returns the sum of the prices of the valid trips."""
+        return self._price_sum
+
+    def get_income(self, vat_rate: Decimal = Decimal('0.19'), margin: Decimal = Decimal('0.1')) -> Decimal:
+        """Calculates the agency's income from its trips, as the sum of `Trip.get_income`.
+
+        Args:
+            vat_rate (Decimal): Value-added tax rate applied to the price. Default is 0.19 (19%).
+            margin (Decimal): Agency's margin rate. Default is 0.1 (10%).
+
+        Returns:
+            Decimal: The calculated income from all valid trips.
+        """
+        return self.price_sum * vat_rate * margin
+
+
+# --------------------------------------------------
+# CHANGE TRACKING
+# --------------------------------------------------
+
+@dataclass(frozen=True)
+class TripTombstone:
+    """Records the deletion of a trip for incremental consumers.
+
+    Attributes:
+        id (int): ID of the deleted trip.
+        destination (str | None): Destination the trip had when it was deleted.
+        agency_id (int | None): Agency the trip belonged to when it was deleted.
+        row_version (int): Change version of the deletion.
+        deleted_at (datetime | None): Time of the deletion.
+    """
+    id: int
+    destination: str | None
+    agency_id: int | None
+    row_version: int
+    deleted_at: datetime | None = None
+
+
+@dataclass(frozen=True)
+class TripChanges:
+    """Trips changed after a change cursor, as returned by `TripDbDao.changes_since`.
+
+    Attributes:
+        inserted (list[Trip]): Trips created after the cursor.
+        updated (list[Trip]): Trips created before the cursor and modified after it.
+        deleted (list[TripTombstone]): Trips deleted after the cursor.
+        cursor (int): Cursor to pass to the next `changes_since` call.
+        reloaded (bool): Whether the table was bulk-loaded after the cursor. Trips dropped by a
+            reset have no tombstones, so state derived from earlier changes should be rebuilt.
+    """
+    inserted: list[Trip] = field(default_factory=list)
+    updated: list[Trip] = field(default_factory=list)
+    deleted: list[TripTombstone] = field(default_factory=list)
+    cursor: int = 0
+    reloaded: bool = False
@@ -0,0 +1,87 @@
+from typing import Any
+import hashlib
+import logging
+import os
+
+# Statements longer than this are truncated in logs and tagged with their length and hash.
+SQL_LOG_MAX_LENGTH = int(os.environ.get('TRAVEL_AGENCY_SQL_LOG_MAX_LENGTH', 1000))
+
+
+class LazySql:
+    """Wraps a SQL statement so that it is only formatted when a log record is actually emitted.
+
+    Attributes:
+        sql (str): SQL statement.
+        max_length (int): Number of characters kept before truncation.
+    """
+    __slots__ = ('sql', 'max_length')
+
+    def __init__(self, sql: str, max_length: int | None = None):
+        """Stores the statement without formatting it.
+
+        Args:
+            sql (str): SQL statement.
+            max_length (int | None): Truncation length. Defaults to `SQL_LOG_MAX_LENGTH`.
+        """
+        self.sql = sql
+        self.max_length = SQL_LOG_MAX_LENGTH if max_length is None else max_length
+
+    def __str__(self) -> str:
+        """Returns the statement, truncated and tagged with its length and hash if too long."""
+        if len(self.sql) <= self.max_length:
+            return self.sql
+        digest = hashlib.sha1(self.sql.encode('utf-8')).hexdigest()[:12]
+        return f"{self.sql[:self.max_length]}... [{len(self.sql)} chars, sha1 {digest}]"
+
+
+def log_sql(logger: logging.Logger, sql: str) -> None:
+    """Logs a statement at INFO level without formatting it when INFO is disabled.
+
+    Args:
+        logger (logging.Logger): Logger to use.
+        sql (str): SQL statement.
+    """
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("[SQL] %s", LazySql(sql))
+
+
+class SampledWarnings:
+    """Counts repeated warnings and keeps only the first few items for one summary message.
+
+    Attributes:
+        message (str): Summary message prefix, e.g. "Invalid records skipped".
+        sample_size (int): Number of items kept as samples.
+        count (int): Number of items added.
+    """
+
+    def __init__(self, message: str, sample_size: int = 5):
+        """Initializes an empty summary.
+
+        Args:
+            message (str): Summary message prefix.
+            sample_size (int): Number of items kept as samples.
+        """
+        self.message = message
+        self.sample_size = sample_size
+        self.count = 0
+        self._samples: list[Any] = []
+
+    def add(self, item: Any) -> None:
+        """Counts an item, keeping it only while there is room for samples. Items are formatted lazily.
+
+        Args:
+            item (Any): Offending item or message.
+        """
+        self.count += 1
+        if len(self._samples) < self.sample_size:
+            self._samples.append(item)
+
+    def log(self, logger: logging.Logger) -> None:
+        """Emits one warning with the total count and the samples, if anything was added.
+
+        Args:
+            logger (logging.Logger): Logger to use.
+        """
+        if self.count and logger.isEnabledFor(logging.WARNING):
+            samples = '; '.join(str(sample) for sample in self._samples)
+            logger.warning(f"{self.message}: {self.count} (first {len(self._samples)}: {samples})")
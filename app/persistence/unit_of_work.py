@@ -0,0 +1,138 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator, Self
+import logging
+
+from mysql.connector.pooling import MySQLConnectionPool
+
+logger = logging.getLogger(__name__)
+
+_active_unit_of_work: ContextVar['UnitOfWork | None'] = ContextVar('active_unit_of_work', default=None)
+
+
+def current_unit_of_work(connection_pool: MySQLConnectionPool) -> 'UnitOfWork | None':
+    """Returns the unit of work active in the current context for the given pool, if any.
+
+    Args:
+        connection_pool (MySQLConnectionPool): Pool the caller would take a connection from.
+
+    Returns:
+        UnitOfWork | None: The active unit of work bound to that pool, or None.
+    """
+    unit_of_work = _active_unit_of_work.get()
+    if unit_of_work is not None and unit_of_work.connection_pool is connection_pool:
+        return unit_of_work
+    return None
+
+
+class UnitOfWork:
+    """Runs every DAO call made inside a `with` block on one connection and in one transaction.
+
+    DAOs created with the same connection pool reuse the bound connection instead of checking
+    out their own, and their per-call commits are deferred. The transaction is committed when
+    the block exits normally and rolled back when it raises. A unit of work opened inside
+    another one on the same pool becomes a savepoint of the outer transaction.
+
+    Streaming reads (`TripDbDao.iter_valid`) must be fully consumed before the next statement
+    is executed on the bound connection. Callbacks registered with `after_completion` run once
+    the outermost transaction has committed or rolled back.
+
+    Attributes:
+        connection_pool (MySQLConnectionPool): Pool the connection is taken from.
+        connection (Any): The bound connection while the unit of work is active.
+    """
+
+    def __init__(self, connection_pool: MySQLConnectionPool):
+        """Initializes an inactive unit of work.
+
+        Args:
+            connection_pool (MySQLConnectionPool): Pool the connection is taken from.
+        """
+        self.connection_pool = connection_pool
+        self.connection: Any = None
+        self._outer: UnitOfWork | None = None
+        self._savepoint_name: str | None = None
+        self._savepoint_counter = 0
+        self._token = None
+        self._completion_callbacks: list[Callable[[], None]] = []
+
+    def __enter__(self) -> Self:
+        """Binds a connection (or opens a savepoint in the outer unit of work) to the current context."""
+        self._outer = current_unit_of_work(self.connection_pool)
+        if self._outer is not None:
+            self.connection = self._outer.connection
+            self._savepoint_name = self._outer._next_savepoint_name()
+            self._execute(f'SAVEPOINT {self._savepoint_name}')
+        else:
+            self.connection = self.connection_pool.get_connection()
+        self._token = _active_unit_of_work.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> bool:
+        """Commits on success and rolls back on error, then releases the connection."""
+        _active_unit_of_work.reset(self._token)
+        try:
+            if self._outer is not None:
+                action = 'RELEASE SAVEPOINT' if exc_type is None else 'ROLLBACK TO SAVEPOINT'
+                self._execute(f'{action} {self._savepoint_name}')
+            elif exc_type is None:
+                try:
+                    self.connection.commit()
+                except Exception:
+                    self.connection.rollback()
+                    raise
+            else:
+                logger.warning(f"Unit of work rolled back: {exc_value!r}")
+                self.connection.rollback()
+        finally:
+            if self._outer is None:
+                self.connection.close()
+            self.connection = None
+            if self._outer is None:
+                callbacks, self._completion_callbacks = self._completion_callbacks, []
+                for callback in callbacks:
+                    callback()
+        return False
+
+    def after_completion(self, callback: Callable[[], None]) -> None:
+        """Registers a callback to run when the outermost transaction has committed or rolled back.
+
+        Callbacks run once, in registration order; registering an equal callback again has no effect.
+
+        Args:
+            callback (Callable[[], None]): Called without arguments after the transaction ends.
+        """
+        callbacks = self._root()._completion_callbacks
+        if callback not in callbacks:
+            callbacks.append(callback)
+
+    def _root(self) -> 'UnitOfWork':
+        """Returns the outermost unit of work of this transaction."""
+        root = self
+        while root._outer is not None:
+            root = root._outer
+        return root
+
+    def _next_savepoint_name(self) -> str:
+        """Returns a savepoint name unique within this transaction."""
+        root = self._root()
+        root._savepoint_counter += 1
+        return f'uow_savepoint_{root._savepoint_counter}'
+
+    def _execute(self, sql: str) -> None:
+        """Executes a transaction-control statement on the bound connection."""
+        cursor = self.connection.cursor()
+        cursor.execute(sql)
+        cursor.close()
+
+    @contextmanager
+    def savepoint(self) -> Iterator[None]:
+        """Runs the wrapped block in a savepoint: its changes are undone if it raises.
+
+        The exception is re-raised after rolling back to the savepoint; the rest of the
+        unit of work stays intact if the caller handles it.
+        """
+        if current_unit_of_work(self.connection_pool) is not self:
+            raise RuntimeError('Savepoints can only be opened in the innermost active unit of work.')
+        with UnitOfWork(self.connection_pool):
+            yield
@@ -1,11 +1,39 @@
-from app.model.agency import AgencyRepo, Agency
-from app.persistence.dao import TripDbDao
-from app.persistence.model import Trip
+from app.file_manager.file_watcher import FileWatcher
+from app.model.agency import AgencyChanges, AgencyRepo, Agency
+from app.persistence import arrow_io
+from app.persistence.dao import AgencyDbRepo, SummaryDao, TripDbDao
+from app.persistence.model import AgencyStats, Trip
 from collections import defaultdict
 from decimal import Decimal
-from typing import Any
+from typing import Any, Callable, Iterable
+from bisect import bisect_left
+import heapq
+import math
+import random
 from dataclasses import dataclass, field
 from app.model.countries import CountryRepo
+from app.service.profiling import profiled
+from app.service.sharding import ShardedExecution
+
+# Column names of the reports `AgencyService.write_report` can write. An agency becomes its
+# ID and name, a trip its `TRIP_COLUMNS`.
+_AGENCY_COLUMNS = ('agency_id', 'agency')
+REPORT_COLUMNS = {
+    'top_k_agencies_by_trips': (*_AGENCY_COLUMNS, 'trip_count'),
+    'find_agency_with_max_trips': (*_AGENCY_COLUMNS, 'trip_count'),
+    'top_k_agencies_by_income': (*_AGENCY_COLUMNS, 'income'),
+    'find_agency_with_max_income': (*_AGENCY_COLUMNS, 'income'),
+    'top_k_countries': ('country', 'trip_count'),
+    'find_country_with_max_trips': ('country', 'trip_count'),
+    'mean_report_for_agencies': ('agency', 'mean_price', 'trip_id', *arrow_io.TRIP_COLUMNS[1:]),
+    'percentile_report_for_agencies': ('agency', 'percentile', 'price'),
+    'percentile_report_for_destinations': ('destination', 'percentile', 'price'),
+    'median_report_for_agencies': ('agency', 'median_price'),
+    'report_agencies_with_max_trips_for_each_country': ('country', 'agency'),
+    'report_only_selected_countries_trips': arrow_io.TRIP_COLUMNS,
+    'report_trips_for_people_quantity': ('group_num_of_people', *arrow_io.TRIP_COLUMNS),
+    'report_max_price_for_quantity_report': ('group_num_of_people', *arrow_io.TRIP_COLUMNS),
+}
 
 
 @dataclass
@@ -13,35 +41,165 @@ class AgencyService:
     """Service class for analyzing and reporting on travel agencies and their trips.
 
     Attributes:
-        agency_repo (AgencyRepo): Repository for retrieving agency data.
+        agency_repo (AgencyRepo | AgencyDbRepo): Repository for retrieving agency data. With `AgencyDbRepo`,
+            agency names in per-country reports are joined by the database.
         trip_db_dao (TripDbDao): DAO for accessing trip data.
         offer (dict[Agency, list[Trip]]): Mapping of agencies to their valid trips.
+        summary_dao (SummaryDao | None): Summary tables answering the per-agency and per-country
+            counts when they exist, instead of aggregating trips. The per-agency summaries are
+            read once, right after the offer, so that all agency reports of a service describe
+            the same data.
+        sharding (ShardedExecution | None): Loads the offer and computes the per-agency income and
+            mean price in parallel, one shard per range of agency IDs, connecting like `trip_db_dao`
+            unless it has its own DAO factory. The reports are the same as without sharding. Every
+            trip is pickled back to this process and merged, which costs more than the per-agency
+            aggregation the shards save, so sharding only pays off when reading the trips from the
+            database dominates.
     """
 
-    agency_repo: AgencyRepo
+    agency_repo: AgencyRepo | AgencyDbRepo
     trip_db_dao: TripDbDao
     offer: dict[Agency, list[Trip]] = field(default_factory=dict)
+    summary_dao: SummaryDao | None = None
+    sharding: ShardedExecution | None = None
+    _summaries: SummaryDao | None = field(default=None, init=False, repr=False)
+    _agency_stats: list[AgencyStats] = field(default_factory=list, init=False, repr=False)
+    _aggregates: dict[Agency, '_AgencyAggregate | None'] = field(default_factory=dict, init=False, repr=False)
+    _price_index: dict[Agency, tuple[list[Trip], tuple[list[int], list[Decimal]]]] = field(
+        default_factory=dict, init=False, repr=False)
 
+    @profiled
     def __post_init__(self):
         """Initializes the offer dictionary by grouping valid trips by agency."""
-        agencies = self.agency_repo
-        trips = self.trip_db_dao.find_all_valid()
-        grouped_by_agency_id = defaultdict(list)
-        for trip in trips:
-            grouped_by_agency_id[agencies.get_by_id(trip.agency_id)].append(trip)
-        self.offer = grouped_by_agency_id
+        if self.summary_dao is not None and self.summary_dao.is_available():
+            self._summaries = self.summary_dao
+        if self.sharding is not None:
+            self._load_sharded_offer()
+        else:
+            agencies = self.agency_repo
+            trips = self.trip_db_dao.find_all_valid()
+            grouped_by_agency_id = defaultdict(list)
+            for trip in trips:
+                grouped_by_agency_id[agencies.get_by_id(trip.agency_id)].append(trip)
+            self.offer = grouped_by_agency_id
+        if self._summaries is not None:
+            self._agency_stats = list(self._summaries.find_all())
+
+    def _load_sharded_offer(self) -> None:
+        """Builds the offer from per-shard aggregates, keeping the agencies in the order of their first trip.
+
+        Agencies are ordered the way `find_all_valid` returns their trips, so that ties in the
+        reports are broken the same way as without sharding. Agency IDs that the repository maps
+        to the same agency are merged, and their aggregates recomputed from the merged trips.
+        """
+        aggregates = [aggregate for shard in self.sharding.map(_shard_aggregates, self.trip_db_dao.agency_ids(),
+                                                               self.trip_db_dao)
+                      for aggregate in shard]
+        grouped_by_agency = defaultdict(list)
+        for aggregate in sorted(aggregates, key=lambda aggregate: aggregate.trips[0].id):
+            agency = self.agency_repo.get_by_id(aggregate.agency_id)
+            if agency in self._aggregates:
+                grouped_by_agency[agency] = sorted(grouped_by_agency[agency] + aggregate.trips, key=lambda trip: trip.id)
+                self._aggregates[agency] = None
+            else:
+                grouped_by_agency[agency] = aggregate.trips
+                self._aggregates[agency] = aggregate
+        self.offer = grouped_by_agency
+
+    def on_agencies_changed(self, changes: AgencyChanges | None = None) -> None:
+        """Re-keys the offer by the agencies the repository returns now, without reloading trips.
+
+        Meant as the `on_change` callback of `AgencyRepo.watch`: trips are regrouped under the
+        current Agency objects of their agency IDs, so reports name renamed agencies by their new
+        names and trips of removed agencies fall under None. The new offer replaces the old one
+        in a single assignment.
+
+        Args:
+            changes (AgencyChanges | None): Changes reported by the repository; not needed to re-key.
+        """
+        offer = defaultdict(list)
+        for trips in self.offer.values():
+            for trip in trips:
+                offer[self.agency_repo.get_by_id(trip.agency_id)].append(trip)
+        aggregates = {}
+        for aggregate in self._aggregates.values():
+            agency = self.agency_repo.get_by_id(aggregate.agency_id) if aggregate else None
+            if aggregate and len(offer.get(agency, ())) == len(aggregate.trips):
+                aggregates[agency] = aggregate
+        self.offer, self._aggregates, self._price_index = offer, aggregates, {}
+
+    def watch_agencies(self, interval: float = 1.0) -> FileWatcher:
+        """Starts reloading the agencies of an `AgencyRepo` whenever its file changes, re-keying the offer.
+
+        Args:
+            interval (float): Seconds between checks of the agency file.
+
+        Returns:
+            FileWatcher: The running watcher; call `stop()` to end watching.
+        """
+        return self.agency_repo.watch(interval, self.on_agencies_changed)
+
+    def _agency_totals(self, value: Callable[[AgencyStats], Any]) -> Iterable[tuple[Agency, Any]]:
+        """Sums a value of the agency summaries read with the offer per agency.
 
+        Args:
+            value (Callable[[AgencyStats], Any]): Extracts the value from a summary row.
+
+        Returns:
+            Iterable[tuple[Agency, Any]]: (agency, total) pairs of agencies with trips, in the order
+            of the offer, so that ties are broken the same way as when aggregating trips.
+        """
+        totals = {}
+        for stats in self._agency_stats:
+            if stats.trip_count > 0:
+                agency = self.agency_repo.get_by_id(stats.id)
+                totals[agency] = totals[agency] + value(stats) if agency in totals else value(stats)
+        positions = {agency: position for position, agency in enumerate(self.offer)}
+        return sorted(totals.items(), key=lambda item: positions.get(item[0], len(positions)))
+
+    @staticmethod
+    def _top_k(items: Iterable[tuple[Any, Any]], k: int) -> list[tuple[Any, Any]]:
+        """Selects the entries with the k highest values using a bounded heap.
+
+        Entries tied with the k-th highest value are all kept, the same way the max reports
+        keep every entry tied with the maximum.
+
+        Args:
+            items (Iterable[tuple[Any, Any]]): (key, value) pairs.
+            k (int): Number of top values to select.
+
+        Returns:
+            list[tuple[Any, Any]]: Selected entries sorted by value in descending order;
+            tied entries keep their input order.
+        """
+        items = list(items)
+        if k <= 0 or not items:
+            return []
+        threshold = heapq.nlargest(k, (value for _, value in items))[-1]
+        return sorted((item for item in items if item[1] >= threshold), key=lambda item: item[1], reverse=True)
+
+    @profiled
+    def top_k_agencies_by_trips(self, k: int) -> list[tuple[Agency, int]]:
+        """Finds the agencies with the k highest numbers of trips.
+
+        Args:
+            k (int): Number of top results.
+
+        Returns:
+            list[tuple[Agency, int]]: A list of (agency, number_of_trips) tuples.
+        """
+        if self._summaries is not None:
+            return AgencyService._top_k(self._agency_totals(lambda stats: stats.trip_count), k)
+        return AgencyService._top_k(((agency, len(trips)) for agency, trips in self.offer.items()), k)
+
+    @profiled
     def find_agency_with_max_trips(self) -> list[tuple[Agency, int]]:
         """Finds the agency or agencies with the highest number of trips.
 
         Returns:
             list[tuple[Agency, int]]: A list of (agency, number_of_trips) tuples.
         """
-        if not self.offer:
-            return []
-
-        max_trips = max(len(v) for v in self.offer.values())
-        return [(k, len(v)) for k, v in self.offer.items() if len(v) == max_trips]
+        return self.top_k_agencies_by_trips(1)
 
     @staticmethod
     def _count_income_for_trips(trips: list[Trip]) -> Decimal:
@@ -55,27 +213,54 @@ class AgencyService:
         """
         return sum((trip.get_income() for trip in trips), Decimal('0'))
 
+    def _income(self, agency: Agency, trips: list[Trip]) -> Decimal:
+        """Returns the income of an agency's trips, precomputed by its shard if available."""
+        aggregate = self._aggregates.get(agency)
+        return aggregate.income if aggregate else AgencyService._count_income_for_trips(trips)
+
+    @profiled
+    def top_k_agencies_by_income(self, k: int) -> list[tuple[Agency, Decimal]]:
+        """Finds the agencies with the k highest incomes.
+
+        Args:
+            k (int): Number of top results.
+
+        Returns:
+            list[tuple[Agency, Decimal]]: A list of (agency, income) tuples.
+        """
+        if self._summaries is not None:
+            return AgencyService._top_k(self._agency_totals(lambda stats: stats.get_income()), k)
+        return AgencyService._top_k(((agency, self._income(agency, trips)) for agency, trips in self.offer.items()), k)
+
+    @profiled
     def find_agency_with_max_income(self) -> list[tuple[Agency, Decimal]]:
         """Finds the agency or agencies with the highest income.
 
         Returns:
             list[tuple[Agency, Decimal]]: A list of (agency, income) tuples.
         """
-        incomes = defaultdict(Decimal)
-        for agency, trips in self.offer.items():
-            incomes[agency] = AgencyService._count_income_for_trips(trips)
-        max_income = max(incomes.values(), default=Decimal(0))
-        return [(agency, income) for agency, income in incomes.items() if income == max_income]
+        return self.top_k_agencies_by_income(1)
 
+    @profiled
+    def top_k_countries(self, k: int) -> list[tuple[str, int]]:
+        """Finds the countries with the k highest numbers of trips.
+
+        Args:
+            k (int): Number of top results.
+
+        Returns:
+            list[tuple[str, int]]: A list of (country_name, number_of_trips) tuples.
+        """
+        return AgencyService._top_k((self._summaries or self.trip_db_dao).count_trips_per_countries(), k)
+
+    @profiled
     def find_country_with_max_trips(self) -> list[tuple[str, int]]:
         """Finds the country or countries with the highest number of trips.
 
         Returns:
             list[tuple[str, int]]: A list of (country_name, number_of_trips) tuples.
         """
-        trips_per_countries = self.trip_db_dao.count_trips_per_countries()
-        max_trips = max(trips_per_countries, key=lambda x: x[1])[1]
-        return [trip for trip in trips_per_countries if trip[1] == max_trips]
+        return self.top_k_countries(1)
 
     @staticmethod
     def _mean_price_for_trips(trips: list[Trip]) -> Decimal:
@@ -92,6 +277,52 @@ class AgencyService:
         total_price = sum(trip.price for trip in trips)
         return Decimal(total_price / len(trips))
 
+    @staticmethod
+    def _sorted_prices(trips: list[Trip]) -> tuple[list[int], list[Decimal]]:
+        """Sorts trip prices once for repeated closest-price lookups.
+
+        Args:
+            trips (list[Trip]): List of trips.
+
+        Returns:
+            tuple[list[int], list[Decimal]]: Trip positions in price order and the sorted prices.
+        """
+        order = sorted(range(len(trips)), key=lambda i: trips[i].price)
+        return order, [trips[i].price for i in order]
+
+    @staticmethod
+    def _closest_to_price(trips: list[Trip], price: Decimal,
+                          sorted_prices: tuple[list[int], list[Decimal]] | None = None) -> Trip:
+        """Finds the trip whose price is closest to the given price by bisecting the sorted prices.
+
+        Ties are resolved in favour of the trip that comes first in the input list.
+
+        Args:
+            trips (list[Trip]): Non-empty list of trips.
+            price (Decimal): Reference price.
+            sorted_prices (tuple[list[int], list[Decimal]] | None): Result of `_sorted_prices` for
+                the trips, reused across calls. Computed if None.
+
+        Returns:
+            Trip: The trip with the smallest absolute price difference.
+        """
+        order, prices = sorted_prices or AgencyService._sorted_prices(trips)
+        index = bisect_left(prices, price)
+        candidates = []
+        if index < len(prices):
+            candidates.append(order[index])
+        if index > 0:
+            candidates.append(order[bisect_left(prices, prices[index - 1])])
+        return trips[min(candidates, key=lambda i: (abs(trips[i].price - price), i))]
+
+    def _sorted_prices_for(self, agency: Agency, trips: list[Trip]) -> tuple[list[int], list[Decimal]]:
+        """Returns the sorted prices of an agency's trips, sorting them only once per trips list."""
+        cached = self._price_index.get(agency)
+        if cached is None or cached[0] is not trips:
+            cached = self._price_index[agency] = (trips, AgencyService._sorted_prices(trips))
+        return cached[1]
+
+    @profiled
     def mean_report_for_agencies(self) -> defaultdict[Any, tuple[Decimal, Trip]]:
         """Generates a report of the average trip price per agency and the trip closest to this average.
 
@@ -100,11 +331,98 @@ class AgencyService:
         """
         report = defaultdict(tuple)
         for agency, trips in self.offer.items():
+            aggregate = self._aggregates.get(agency)
+            if aggregate:
+                report[agency.name] = (aggregate.mean_price, aggregate.closest_trip)
+                continue
             mean_price = AgencyService._mean_price_for_trips(trips)
-            min_dif = min(trips, key=lambda trip: abs(trip.price - mean_price))
-            report[agency.name] = (mean_price, min_dif)
+            report[agency.name] = (mean_price, AgencyService._closest_to_price(
+                trips, mean_price, self._sorted_prices_for(agency, trips)))
         return report
 
+    @staticmethod
+    def _select(values: list[Any], k: int) -> Any:
+        """Returns the k-th smallest value (0-based) using quickselect in expected O(n) time.
+
+        Args:
+            values (list[Any]): Non-empty list of comparable values. The list is not modified.
+            k (int): Rank of the value to select.
+
+        Returns:
+            Any: The k-th smallest value.
+        """
+        values = list(values)
+        while True:
+            pivot = values[random.randrange(len(values))]
+            lower = [value for value in values if value < pivot]
+            if k < len(lower):
+                values = lower
+                continue
+            equal_count = sum(1 for value in values if value == pivot)
+            if k < len(lower) + equal_count:
+                return pivot
+            k -= len(lower) + equal_count
+            values = [value for value in values if value > pivot]
+
+    @staticmethod
+    def _percentiles_for_trips(trips: list[Trip], percentiles: Iterable[float]) -> dict[float, Decimal]:
+        """Calculates price percentiles of a list of trips using the nearest-rank method.
+
+        Args:
+            trips (list[Trip]): Non-empty list of trips.
+            percentiles (Iterable[float]): Percentiles between 0 and 100.
+
+        Returns:
+            dict[float, Decimal]: A mapping of percentile to price.
+        """
+        prices = [trip.price for trip in trips]
+        return {
+            percentile: AgencyService._select(prices, max(math.ceil(percentile / 100 * len(prices)), 1) - 1)
+            for percentile in percentiles
+        }
+
+    @profiled
+    def percentile_report_for_agencies(self, percentiles: Iterable[float] = (50,)) -> dict[str, dict[float, Decimal]]:
+        """Generates a report of trip price percentiles per agency.
+
+        Args:
+            percentiles (Iterable[float]): Percentiles between 0 and 100. Defaults to the median.
+
+        Returns:
+            dict[str, dict[float, Decimal]]: A mapping of agency name to {percentile: price}.
+        """
+        percentiles = list(percentiles)
+        return {agency.name: AgencyService._percentiles_for_trips(trips, percentiles)
+                for agency, trips in self.offer.items()}
+
+    @profiled
+    def percentile_report_for_destinations(self, percentiles: Iterable[float] = (50,)) -> dict[str, dict[float, Decimal]]:
+        """Generates a report of trip price percentiles per destination.
+
+        Args:
+            percentiles (Iterable[float]): Percentiles between 0 and 100. Defaults to the median.
+
+        Returns:
+            dict[str, dict[float, Decimal]]: A mapping of destination to {percentile: price}.
+        """
+        percentiles = list(percentiles)
+        grouped_by_destination = defaultdict(list)
+        for trips in self.offer.values():
+            for trip in trips:
+                grouped_by_destination[trip.destination].append(trip)
+        return {destination: AgencyService._percentiles_for_trips(trips, percentiles)
+                for destination, trips in grouped_by_destination.items()}
+
+    @profiled
+    def median_report_for_agencies(self) -> dict[str, Decimal]:
+        """Generates a report of the median trip price per agency.
+
+        Returns:
+            dict[str, Decimal]: A mapping of agency name to median price.
+        """
+        return {name: prices[50] for name, prices in self.percentile_report_for_agencies((50,)).items()}
+
+    @profiled
     def report_agencies_with_max_trips_for_each_country(self) -> dict[str, list[str]]:
         """Generates a report of the top-performing agency or agencies per country.
 
@@ -112,11 +430,16 @@ class AgencyService:
             dict[str, list[str]]: A mapping of country name to list of top agency names.
         """
         grouped_by_country = defaultdict(list)
-        countries = self.trip_db_dao.countries_with_max_trips_for_agency()
+        if self._summaries is None and isinstance(self.agency_repo, AgencyDbRepo):
+            for country, agency_name, _ in self.trip_db_dao.countries_with_max_trips_for_agency_names():
+                grouped_by_country[country].append(agency_name)
+            return grouped_by_country
+        countries = (self._summaries or self.trip_db_dao).countries_with_max_trips_for_agency()
         for country in countries:
             grouped_by_country[country[0]].append(self.agency_repo.agency_name_for_id(int(country[1])))
         return grouped_by_country
 
+    @profiled
     def report_only_selected_countries_trips(self, countries: CountryRepo) -> list[Trip]:
         """Filters trips to only include those with destinations in selected countries.
 
@@ -126,10 +449,9 @@ class AgencyService:
         Returns:
             list[Trip]: Filtered list of trips.
         """
-        european_countries = countries.get_countries()
-        trips = self.trip_db_dao.find_all_valid()
-        return [trip for trip in trips if trip.destination in european_countries]
+        return self.trip_db_dao.find_all_valid_by_destinations(countries.get_countries())
 
+    @profiled
     def report_trips_for_people_quantity(self) -> dict[int, set[Trip]]:
         """Groups trips by the number of people.
 
@@ -142,9 +464,13 @@ class AgencyService:
             grouped_trips[trip.num_of_people].add(trip)
         return grouped_trips
 
-    def report_max_price_for_quantity_report(self, report: dict[int, set[Trip]]) -> dict[int, list[Trip]]:
+    @staticmethod
+    @profiled
+    def report_max_price_for_quantity_report(report: dict[int, set[Trip]]) -> dict[int, list[Trip]]:
         """From a quantity-based report, finds trips with the maximum price for each group.
 
+        Needs no service, so it can be applied to a snapshot of `report_trips_for_people_quantity`.
+
         Args:
             report (dict[int, set[Trip]]): A mapping of number_of_people to set of trips.
 
@@ -162,3 +488,109 @@ class AgencyService:
             key=lambda item: item[1][0].price / item[0],
             reverse=True
         ))
+
+    def write_report(self, report: str, path: str, file_format: str | None = None, **arguments: Any) -> int:
+        """Runs a report and writes it to a Parquet or Arrow IPC file as a flat table.
+
+        Nested reports are flattened to one row per innermost value, e.g. one row per
+        (agency, percentile) pair. Requires pyarrow.
+
+        Args:
+            report (str): Name of a report method listed in `REPORT_COLUMNS`.
+            path (str): Output file.
+            file_format (str | None): 'parquet', 'arrow', or None to use the file extension.
+            **arguments (Any): Arguments of the report method, e.g. `k=10`.
+
+        Raises:
+            ValueError: If the report is not listed in `REPORT_COLUMNS`.
+
+        Returns:
+            int: Number of rows written.
+        """
+        if report not in REPORT_COLUMNS:
+            raise ValueError(f"Unknown report: {report}")
+        rows = AgencyService._report_rows(getattr(self, report)(**arguments),
+                                          agency_rows=REPORT_COLUMNS[report][:2] == _AGENCY_COLUMNS)
+        return arrow_io.write_rows(path, REPORT_COLUMNS[report], rows, file_format)
+
+    @staticmethod
+    def _report_rows(report: dict | list, agency_rows: bool = False) -> Iterable[tuple]:
+        """Flattens a report into rows of plain values.
+
+        Mappings become one row per entry, prefixed by their key; nested mappings and
+        collections one row per inner entry. Sets of trips are ordered by trip ID.
+
+        Args:
+            report (dict | list): Result of a report method.
+            agency_rows (bool): Whether the report is a list of (agency, value) entries. Trips of
+                agency IDs missing from the repository are grouped under None, which then
+                fills both agency columns.
+
+        Yields:
+            tuple: Rows of the report.
+        """
+        if isinstance(report, dict):
+            for key, value in report.items():
+                if isinstance(value, dict):
+                    for inner_key, inner_value in value.items():
+                        yield key, inner_key, *AgencyService._row_values(inner_value)
+                elif isinstance(value, (list, set)):
+                    items = sorted(value, key=lambda trip: trip.id) if isinstance(value, set) else value
+                    for item in items:
+                        yield key, *AgencyService._row_values(item)
+                else:
+                    yield key, *AgencyService._row_values(value)
+        else:
+            for item in report:
+                if agency_rows and item[0] is None:
+                    yield None, None, *AgencyService._row_values(item[1:])
+                else:
+                    yield AgencyService._row_values(item)
+
+    @staticmethod
+    def _row_values(value: Any) -> tuple:
+        """Converts a report value into row values: agencies to ID and name, trips to their fields."""
+        if isinstance(value, tuple):
+            return tuple(part for item in value for part in AgencyService._row_values(item))
+        if isinstance(value, Agency):
+            return value.id, value.name
+        if isinstance(value, Trip):
+            return value.id, value.destination, value.price, value.num_of_people, value.agency_id
+        return value,
+
+
+@dataclass(frozen=True)
+class _AgencyAggregate:
+    """Valid trips of one agency ID and their income and mean price, computed by a shard."""
+    agency_id: int | None
+    trips: list[Trip]
+    income: Decimal
+    mean_price: Decimal
+    closest_trip: Trip
+
+
+def _shard_aggregates(trip_dao_factory: Callable[[], TripDbDao], first_agency_id: int | None,
+                      last_agency_id: int | None) -> list[_AgencyAggregate]:
+    """Loads the valid trips of a range of agency IDs and aggregates them per agency ID.
+
+    Runs in a worker process of `ShardedExecution`. The trips are returned with the aggregates,
+    since the offer needs them; pickling them back to the parent is the main cost of a shard
+    after the database read.
+
+    Args:
+        trip_dao_factory (Callable[[], TripDbDao]): Builds the DAO used to load the trips.
+        first_agency_id (int | None): Lowest agency ID of the shard, None for trips without an agency.
+        last_agency_id (int | None): Highest agency ID of the shard.
+
+    Returns:
+        list[_AgencyAggregate]: Aggregates of the agency IDs that have valid trips.
+    """
+    grouped_by_agency_id = defaultdict(list)
+    for trip in trip_dao_factory().find_all_valid_by_agency_range(first_agency_id, last_agency_id):
+        grouped_by_agency_id[trip.agency_id].append(trip)
+    aggregates = []
+    for agency_id, trips in grouped_by_agency_id.items():
+        mean_price = AgencyService._mean_price_for_trips(trips)
+        aggregates.append(_AgencyAggregate(agency_id, trips, AgencyService._count_income_for_trips(trips),
+                                           mean_price, AgencyService._closest_to_price(trips, mean_price)))
+    return aggregates
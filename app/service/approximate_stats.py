@@ -0,0 +1,349 @@
+from collections import defaultdict
+from decimal import Decimal
+from typing import Any, Hashable, Iterable, Self
+import hashlib
+import heapq
+import math
+import random
+
+from app.model.agency import AgencyRepo
+from app.persistence.dao import TripDbDao
+from app.persistence.model import Trip
+
+
+class HyperLogLog:
+    """Distinct-count estimator with constant memory.
+
+    Uses 2**precision one-byte registers. The relative standard error of `count` is
+    1.04 / sqrt(2**precision), i.e. about 0.8% for the default precision of 14 (16 KiB).
+
+    Attributes:
+        precision (int): Number of hash bits used to select a register.
+    """
+
+    def __init__(self, precision: int = 14):
+        """Initializes empty registers.
+
+        Args:
+            precision (int): Number of register index bits, between 4 and 18.
+
+        Raises:
+            ValueError: If the precision is out of range.
+        """
+        if not 4 <= precision <= 18:
+            raise ValueError(f'Precision must be between 4 and 18: {precision}')
+        self.precision = precision
+        self._registers = bytearray(1 << precision)
+
+    @staticmethod
+    def _hash(value: Hashable) -> int:
+        """Returns a stable 64-bit hash of the value."""
+        return int.from_bytes(hashlib.blake2b(str(value).encode('utf-8'), digest_size=8).digest(), 'big')
+
+    def add(self, value: Hashable) -> None:
+        """Adds a value to the estimator.
+
+        Args:
+            value (Hashable): Value to count.
+        """
+        hashed = HyperLogLog._hash(value)
+        remaining_bits = 64 - self.precision
+        index = hashed >> remaining_bits
+        rank = remaining_bits - (hashed & ((1 << remaining_bits) - 1)).bit_length() + 1
+        if rank > self._registers[index]:
+            self._registers[index] = rank
+
+    def count(self) -> int:
+        """Returns the estimated number of distinct values added so far."""
+        m = len(self._registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -register for register in self._registers)
+        zeros = self._registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+
+class KllSketch:
+    """Quantile sketch (KLL) with memory bounded by O(k).
+
+    With the default k=200 the rank error of `quantile` is about 1.65% of the number of
+    added values with 99% confidence; it shrinks roughly as 1/k.
+
+    Attributes:
+        k (int): Accuracy parameter, the capacity of the top compactor.
+        count (int): Number of values added so far.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        """Initializes an empty sketch.
+
+        Args:
+            k (int): Accuracy parameter.
+            seed (int): Seed of the random compaction offsets, for reproducible results.
+        """
+        self.k = k
+        self.count = 0
+        self._compactors: list[list[Any]] = []
+        self._size = 0
+        self._max_size = 0
+        self._random = random.Random(seed)
+        self._grow()
+
+    def _capacity(self, level: int) -> int:
+        """Returns the capacity of the compactor at the given level."""
+        depth = len(self._compactors) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _grow(self) -> None:
+        """Adds a new top compactor and recomputes the size limit."""
+        self._compactors.append([])
+        self._max_size = sum(self._capacity(level) for level in range(len(self._compactors)))
+
+    def _compress(self) -> None:
+        """Compacts full levels, halving them into the next level, until the sketch fits."""
+        for level in range(len(self._compactors)):
+            items = self._compactors[level]
+            if len(items) < self._capacity(level):
+                continue
+            if level + 1 == len(self._compactors):
+                self._grow()
+            items.sort()
+            leftover = [items.pop()] if len(items) % 2 else []
+            self._compactors[level + 1].extend(items[self._random.randint(0, 1)::2])
+            self._compactors[level] = leftover
+            self._size = sum(len(compactor) for compactor in self._compactors)
+            if self._size < self._max_size:
+                break
+
+    def add(self, value: Any) -> None:
+        """Adds a comparable value to the sketch.
+
+        Args:
+            value (Any): Value to add.
+        """
+        self._compactors[0].append(value)
+        self.count += 1
+        self._size += 1
+        if self._size >= self._max_size:
+            self._compress()
+
+    def quantile(self, q: float) -> Any:
+        """Returns an approximate q-quantile of the added values.
+
+        Args:
+            q (float): Quantile between 0 and 1.
+
+        Returns:
+            Any: The estimated quantile, or None for an empty sketch.
+
+        Raises:
+            ValueError: If q is outside [0, 1].
+        """
+        if not 0 <= q <= 1:
+            raise ValueError(f'Quantile must be between 0 and 1: {q}')
+        weighted = sorted(
+            (item, 1 << level) for level, items in enumerate(self._compactors) for item in items)
+        if not weighted:
+            return None
+        total = sum(weight for _, weight in weighted)
+        cumulative = 0
+        for item, weight in weighted:
+            cumulative += weight
+            if cumulative >= q * total:
+                return item
+        return weighted[-1][0]  # pragma: no cover
+
+
+class SpaceSaving:
+    """Heavy-hitter counter (Space-Saving) with a fixed number of counters.
+
+    Every reported count overestimates the true count by at most N / capacity, where N is
+    the number of added values, and every value more frequent than N / capacity is reported.
+
+    Attributes:
+        capacity (int): Maximum number of tracked values.
+    """
+
+    def __init__(self, capacity: int = 100):
+        """Initializes an empty counter.
+
+        Args:
+            capacity (int): Maximum number of tracked values.
+        """
+        self.capacity = capacity
+        self._counts: dict[Hashable, int] = {}
+        # (count, sequence, value) entries; an entry is stale once its value's count moved on.
+        self._heap: list[tuple[int, int, Hashable]] = []
+        self._sequence = 0
+
+    def add(self, value: Hashable) -> None:
+        """Counts one occurrence of the value.
+
+        Finding the value to evict pops stale heap entries lazily, so each call takes
+        amortized O(log capacity) time.
+
+        Args:
+            value (Hashable): Value to count.
+        """
+        if value in self._counts:
+            self._counts[value] += 1
+        elif len(self._counts) < self.capacity:
+            self._counts[value] = 1
+        else:
+            while True:
+                count, _, evicted = heapq.heappop(self._heap)
+                if self._counts.get(evicted) == count:
+                    break
+            self._counts[value] = self._counts.pop(evicted) + 1
+        self._push(value)
+
+    def _push(self, value: Hashable) -> None:
+        """Records the current count of a value, rebuilding the heap when stale entries dominate."""
+        self._sequence += 1
+        heapq.heappush(self._heap, (self._counts[value], self._sequence, value))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(count, sequence, value) for sequence, (value, count) in enumerate(self._counts.items())]
+            heapq.heapify(self._heap)
+
+    def most_common(self, n: int | None = None) -> list[tuple[Hashable, int]]:
+        """Returns tracked values with their estimated counts in descending order.
+
+        Args:
+            n (int | None): Number of values to return. All tracked values when None.
+
+        Returns:
+            list[tuple[Hashable, int]]: (value, estimated_count) pairs.
+        """
+        return sorted(self._counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+
+class ApproximateTripStats:
+    """Constant-memory approximate trip statistics fed from a stream of trips.
+
+    Memory does not depend on the number of trips: one HyperLogLog for destinations,
+    one Space-Saving counter for heavy-hitter destinations and one KLL sketch plus
+    exact count and sum per agency. Reports mirror the shapes of `AgencyService` reports.
+
+    Attributes:
+        agency_repo (AgencyRepo): Repository used to resolve agency names.
+        trips_count (int): Number of trips fed so far.
+    """
+
+    def __init__(self, agency_repo: AgencyRepo, precision: int = 14, quantile_k: int = 200,
+                 heavy_hitters: int = 100):
+        """Initializes empty sketches.
+
+        Args:
+            agency_repo (AgencyRepo): Repository used to resolve agency names.
+            precision (int): HyperLogLog precision for distinct destinations.
+            quantile_k (int): KLL accuracy parameter for per-agency price quantiles.
+            heavy_hitters (int): Number of destination counters kept by Space-Saving.
+        """
+        self.agency_repo = agency_repo
+        self.trips_count = 0
+        self._destinations = HyperLogLog(precision)
+        self._top_destinations = SpaceSaving(heavy_hitters)
+        self._price_sums: dict[int, Decimal] = defaultdict(Decimal)
+        self._price_counts: dict[int, int] = defaultdict(int)
+        self._price_sketches: dict[int, KllSketch] = defaultdict(lambda: KllSketch(quantile_k))
+
+    @classmethod
+    def from_dao(cls, agency_repo: AgencyRepo, trip_db_dao: TripDbDao, batch_size: int = 1000, **kwargs) -> Self:
+        """Builds the statistics by streaming valid trips from the database.
+
+        Args:
+            agency_repo (AgencyRepo): Repository used to resolve agency names.
+            trip_db_dao (TripDbDao): DAO used to stream the trips.
+            batch_size (int): Number of rows fetched per round trip.
+            **kwargs: Sketch parameters passed to the constructor.
+
+        Returns:
+            ApproximateTripStats: Statistics over all valid trips.
+        """
+        return cls(agency_repo, **kwargs).update(trip_db_dao.iter_valid(batch_size))
+
+    def add(self, trip: Trip) -> None:
+        """Feeds a single trip into all sketches.
+
+        Args:
+            trip (Trip): A valid trip.
+        """
+        self.trips_count += 1
+        self._destinations.add(trip.destination)
+        self._top_destinations.add(trip.destination)
+        self._price_sums[trip.agency_id] += trip.price
+        self._price_counts[trip.agency_id] += 1
+        self._price_sketches[trip.agency_id].add(trip.price)
+
+    def update(self, trips: Iterable[Trip]) -> Self:
+        """Feeds a stream of trips into all sketches.
+
+        Args:
+            trips (Iterable[Trip]): Valid trips.
+
+        Returns:
+            ApproximateTripStats: This instance, for chaining.
+        """
+        for trip in trips:
+            self.add(trip)
+        return self
+
+    def count_distinct_destinations(self) -> int:
+        """Returns the estimated number of distinct destinations (about 0.8% error by default)."""
+        return self._destinations.count()
+
+    def count_trips_per_countries(self, n: int | None = None) -> list[tuple[str, int]]:
+        """Estimates trip counts of the most frequent destinations.
+
+        Same shape as `TripDbDao.count_trips_per_countries`, limited to tracked heavy hitters.
+
+        Args:
+            n (int | None): Number of destinations to return. All tracked when None.
+
+        Returns:
+            list[tuple[str, int]]: Destination and estimated number of trips, descending.
+        """
+        return self._top_destinations.most_common(n)
+
+    def find_country_with_max_trips(self) -> list[tuple[str, int]]:
+        """Estimates the country or countries with the highest number of trips.
+
+        Returns:
+            list[tuple[str, int]]: A list of (country_name, estimated_number_of_trips) tuples.
+        """
+        counts = self.count_trips_per_countries()
+        if not counts:
+            return []
+        return [count for count in counts if count[1] == counts[0][1]]
+
+    def mean_report_for_agencies(self) -> dict[str, tuple[Decimal, Decimal]]:
+        """Reports the mean price per agency and an approximate median price.
+
+        The mean is exact. Unlike `AgencyService.mean_report_for_agencies`, the second element
+        is the estimated median price instead of the trip closest to the mean, because finding
+        that trip requires keeping every trip in memory.
+
+        Returns:
+            dict[str, tuple[Decimal, Decimal]]: A mapping of agency name to (mean price, median price).
+        """
+        return {
+            self.agency_repo.agency_name_for_id(agency_id):
+                (Decimal(total / self._price_counts[agency_id]), self._price_sketches[agency_id].quantile(0.5))
+            for agency_id, total in self._price_sums.items()
+        }
+
+    def price_quantiles_for_agencies(self, quantiles: Iterable[float] = (0.5, 0.9, 0.99)) -> dict[str, dict[float, Decimal]]:
+        """Estimates price quantiles per agency.
+
+        Args:
+            quantiles (Iterable[float]): Quantiles between 0 and 1.
+
+        Returns:
+            dict[str, dict[float, Decimal]]: A mapping of agency name to {quantile: price}.
+        """
+        quantiles = list(quantiles)
+        return {
+            self.agency_repo.agency_name_for_id(agency_id): {q: sketch.quantile(q) for q in quantiles}
+            for agency_id, sketch in self._price_sketches.items()
+        }
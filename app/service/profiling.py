@@ -0,0 +1,52 @@
+from typing import Any, Callable
+import cProfile
+import functools
+import os
+import threading
+import time
+
+# When set, every report decorated with `profiled` dumps a cProfile file into this directory.
+PROFILE_DIR_ENV = 'TRAVEL_AGENCY_PROFILE_DIR'
+
+# cProfile allows one active profiler per process, so only one call is profiled at a time.
+_profiling = threading.Lock()
+
+
+def profiled(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Profiles the decorated function with cProfile when `TRAVEL_AGENCY_PROFILE_DIR` is set.
+
+    Each call writes `<qualified name>-<timestamp>.prof`, readable with `pstats` or snakeviz.
+    Only one call in the process is profiled at a time: calls nested inside a profiled call,
+    calls from other threads while one is profiled, and calls while another profiler is active
+    run unprofiled. Without the environment variable the function is called directly. For
+    sampling of all threads without code changes, run the process under
+    `py-spy record -o profile.svg -- python main.py` instead.
+
+    Args:
+        func (Callable[..., Any]): Function to profile.
+
+    Returns:
+        Callable[..., Any]: The wrapped function.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        directory = os.environ.get(PROFILE_DIR_ENV)
+        if not directory or not _profiling.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler, e.g. `python -m cProfile`, is already active.
+                return func(*args, **kwargs)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.disable()
+                os.makedirs(directory, exist_ok=True)
+                profiler.dump_stats(os.path.join(directory, f'{func.__qualname__}-{time.time_ns()}.prof'))
+        finally:
+            _profiling.release()
+
+    return wrapper
@@ -0,0 +1,114 @@
+from typing import Any, Callable, Hashable
+import threading
+
+from app.file_manager.snapshot_cache import SnapshotCache, snapshot_cache
+from app.model.agency import AgencyRepo
+from app.persistence.dao import AgencyDbRepo, TripDbDao
+from app.service.agency_service import AgencyService
+
+# Reports computed from trips alone; every other report also depends on the agencies.
+TRIP_ONLY_REPORTS = frozenset({
+    'top_k_countries',
+    'find_country_with_max_trips',
+    'percentile_report_for_destinations',
+    'report_only_selected_countries_trips',
+    'report_trips_for_people_quantity',
+})
+# Report arguments that identify a report unambiguously in a snapshot key.
+_PLAIN_TYPES = (int, float, str, bool, type(None))
+
+
+class ReportSnapshots:
+    """Serves `AgencyService` reports from snapshots while their input data is unchanged.
+
+    A report snapshot is stored under the report name and arguments, together with the
+    versions of its inputs: the checksum of the trips table and, for reports that name
+    agencies, the version of the agency data. A report is returned from its snapshot while
+    both match and recomputed otherwise, so a changed agency file leaves the per-country
+    trip counts cached. The service, and with it the offer, is only created when a report
+    has to be recomputed.
+
+    Input versions are read once, on the first report; create a new instance to pick up
+    later changes. Arguments backed by data with a `data_version()`, such as a `CountryRepo`,
+    are keyed by that version. Reports with other arguments than plain values are always
+    recomputed. Reports may be requested from several threads; the service is created once.
+    """
+
+    def __init__(self, service_factory: Callable[[], AgencyService], trip_db_dao: TripDbDao,
+                 agency_repo: AgencyRepo | AgencyDbRepo, cache: SnapshotCache | None = snapshot_cache):
+        """Initializes the snapshots without reading any data.
+
+        Args:
+            service_factory (Callable[[], AgencyService]): Creates the service computing the reports.
+            trip_db_dao (TripDbDao): DAO of the trips the reports are computed from.
+            agency_repo (AgencyRepo | AgencyDbRepo): Repository of the agencies the reports are computed from.
+            cache (SnapshotCache | None): Store of the snapshots. None recomputes every report.
+        """
+        self._service_factory = service_factory
+        self._trip_db_dao = trip_db_dao
+        self._agency_repo = agency_repo
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._service: AgencyService | None = None
+        self._versions: tuple[Hashable | None, Hashable | None] | None = None
+
+    @property
+    def service(self) -> AgencyService:
+        """Returns the service, creating it on first use."""
+        with self._lock:
+            if self._service is None:
+                self._service = self._service_factory()
+            return self._service
+
+    def report(self, name: str, **arguments: Any) -> Any:
+        """Returns a report of the service, from its snapshot if the input data is unchanged.
+
+        Args:
+            name (str): Name of a report method of `AgencyService`, or `offer`.
+            **arguments (Any): Arguments of the report method, e.g. `k=10`.
+
+        Returns:
+            Any: The report, as returned by the service.
+        """
+        def compute():
+            report = getattr(self.service, name)
+            return report(**arguments) if callable(report) else report
+
+        version = self.version(name)
+        keys = {argument: ReportSnapshots._key(value) for argument, value in arguments.items()}
+        if self._cache is None or version is None or None in keys.values():
+            return compute()
+        key = f"report:{name}({', '.join(f'{argument}={keys[argument]}' for argument in sorted(keys))})"
+        return self._cache.get_or_build_versioned(key, version, compute)
+
+    def version(self, name: str) -> tuple[Hashable, ...] | None:
+        """Returns the versions of the inputs of a report, reading them on first use.
+
+        Args:
+            name (str): Name of the report.
+
+        Returns:
+            tuple[Hashable, ...] | None: The trips version, followed by the agencies version unless
+            the report is in `TRIP_ONLY_REPORTS`, or None if one of them is unknown.
+        """
+        with self._lock:
+            if self._versions is None:
+                self._versions = self._trip_db_dao.data_version(), self._agency_repo.data_version()
+            trips_version, agencies_version = self._versions
+        version = (trips_version,) if name in TRIP_ONLY_REPORTS else (trips_version, agencies_version)
+        return None if None in version else version
+
+    @staticmethod
+    def _key(value: Any) -> str | None:
+        """Returns the snapshot key of a report argument, or None if it cannot identify the report.
+
+        Plain values, and tuples or lists of them, are keyed by their repr; objects with a
+        `data_version()` by their type and that version, if it is known.
+        """
+        if isinstance(value, (tuple, list)):
+            return repr(value) if all(isinstance(item, _PLAIN_TYPES) for item in value) else None
+        if isinstance(value, _PLAIN_TYPES):
+            return repr(value)
+        data_version = getattr(value, 'data_version', None)
+        version = data_version() if callable(data_version) else None
+        return None if version is None else f'{type(value).__name__}@{version!r}'
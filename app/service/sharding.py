@@ -0,0 +1,112 @@
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import repeat
+from typing import Any, Callable, Iterable
+import os
+
+from app.persistence.connection import MySQLConnectionPoolBuilder, pool_config
+from app.persistence.dao import TripDbDao
+
+
+@dataclass(frozen=True)
+class TripDaoFactory:
+    """Builds a `TripDbDao` on a new single-connection pool.
+
+    Instances are picklable, so each worker process opens its own connection instead of
+    sharing the sockets of the parent's pool.
+
+    Attributes:
+        pool_params (dict[str, Any]): Overrides of the `MySQLConnectionPoolBuilder` defaults.
+            The pool size is always 1.
+    """
+    pool_params: dict[str, Any] = field(default_factory=dict)
+
+    @classmethod
+    def for_dao(cls, trip_dao: TripDbDao) -> 'TripDaoFactory':
+        """Returns a factory connecting to the same server and database as a DAO.
+
+        Args:
+            trip_dao (TripDbDao): DAO whose pool configuration is copied.
+
+        Returns:
+            TripDaoFactory: Factory with the configuration of the DAO's pool.
+        """
+        return cls(pool_config(trip_dao.connection_pool))
+
+    def __call__(self) -> TripDbDao:
+        """Returns a DAO on a new connection pool."""
+        return TripDbDao(MySQLConnectionPoolBuilder(self.pool_params | {'pool_size': 1}).build())
+
+
+def agency_id_ranges(agency_ids: Iterable[int | None], shards: int) -> list[tuple[int | None, int | None]]:
+    """Splits agency IDs into contiguous inclusive ranges with about the same number of agencies.
+
+    Args:
+        agency_ids (Iterable[int | None]): Agency IDs; None stands for trips without an agency.
+        shards (int): Maximum number of ranges of agency IDs.
+
+    Returns:
+        list[tuple[int | None, int | None]]: (first, last) ID pairs in ascending order, followed by
+        (None, None) if None was among the IDs.
+    """
+    agency_ids = set(agency_ids)
+    ids = sorted(id_ for id_ in agency_ids if id_ is not None)
+    shards = max(1, min(shards, len(ids)))
+    ranges = []
+    for shard in range(shards if ids else 0):
+        chunk = ids[shard * len(ids) // shards:(shard + 1) * len(ids) // shards]
+        ranges.append((chunk[0], chunk[-1]))
+    if None in agency_ids:
+        ranges.append((None, None))
+    return ranges
+
+
+@dataclass
+class ShardedExecution:
+    """Runs a function once per range of agency IDs, in parallel.
+
+    The function is called as `function(trip_dao_factory, first_agency_id, last_agency_id)`
+    and must be a module-level function returning a picklable result, so that it can run in
+    worker processes. Results are pickled back to the calling process, so functions should
+    return aggregates rather than rows where they can.
+
+    Attributes:
+        trip_dao_factory (Callable[[], TripDbDao] | None): Picklable factory of the DAO used by each
+            shard. If None, the shards connect like the DAO passed to `map`.
+        shards (int): Number of agency ID ranges. Defaults to the number of CPUs.
+        executor (Executor | None): Executor running the shards, left open after use. If None, a
+            process pool with one worker per shard is created for each run.
+    """
+    trip_dao_factory: Callable[[], TripDbDao] | None = None
+    shards: int = field(default_factory=lambda: os.cpu_count() or 1)
+    executor: Executor | None = None
+
+    def map(self, function: Callable[[Callable[[], TripDbDao], int | None, int | None], Any],
+            agency_ids: Iterable[int | None], trip_dao: TripDbDao | None = None) -> list[Any]:
+        """Runs the function for every shard of the agency IDs.
+
+        Args:
+            function (Callable): Module-level function computing the result of one shard.
+            agency_ids (Iterable[int | None]): Agency IDs to split into shards.
+            trip_dao (TripDbDao | None): DAO the agency IDs come from; without a `trip_dao_factory`,
+                the shards connect to its server and database.
+
+        Raises:
+            ValueError: If neither a `trip_dao_factory` nor a DAO is given.
+
+        Returns:
+            list[Any]: Results in the order of `agency_id_ranges`.
+        """
+        trip_dao_factory = self.trip_dao_factory
+        if trip_dao_factory is None:
+            if trip_dao is None:
+                raise ValueError("Sharded execution needs a trip_dao_factory or the DAO to connect like")
+            trip_dao_factory = TripDaoFactory.for_dao(trip_dao)
+        ranges = agency_id_ranges(agency_ids, self.shards)
+        if not ranges:
+            return []
+        firsts, lasts = zip(*ranges)
+        if self.executor is not None:
+            return list(self.executor.map(function, repeat(trip_dao_factory), firsts, lasts))
+        with ProcessPoolExecutor(max_workers=len(ranges)) as executor:
+            return list(executor.map(function, repeat(trip_dao_factory), firsts, lasts))
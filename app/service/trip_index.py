@@ -0,0 +1,118 @@
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from decimal import Decimal
+from typing import Iterable, Self
+
+from app.persistence.dao import TripDbDao
+from app.persistence.model import Trip
+
+
+class TripIndex:
+    """In-memory index over a fixed set of trips for repeated ad-hoc queries.
+
+    The index is built once and keeps secondary indexes by destination, agency ID and
+    number of people, plus a price-sorted index. Every query starts from the most selective
+    index and checks the remaining filters only on its candidates, so it never scans
+    the whole dataset unless no filter is given.
+
+    Attributes:
+        trips (list[Trip]): Indexed trips in their original order.
+    """
+
+    def __init__(self, trips: Iterable[Trip]):
+        """Builds all indexes for the given trips.
+
+        Args:
+            trips (Iterable[Trip]): Trips to index. Prices must be set (as for valid trips).
+        """
+        self.trips: list[Trip] = list(trips)
+        self._by_destination: dict[str, list[int]] = defaultdict(list)
+        self._by_agency_id: dict[int, list[int]] = defaultdict(list)
+        self._by_num_of_people: dict[int, list[int]] = defaultdict(list)
+
+        for position, trip in enumerate(self.trips):
+            self._by_destination[trip.destination].append(position)
+            self._by_agency_id[trip.agency_id].append(position)
+            self._by_num_of_people[trip.num_of_people].append(position)
+
+        self._price_order: list[int] = sorted(range(len(self.trips)), key=lambda i: self.trips[i].price)
+        self._prices: list[Decimal] = [self.trips[i].price for i in self._price_order]
+
+    @classmethod
+    def from_dao(cls, trip_db_dao: TripDbDao) -> Self:
+        """Creates an index from all valid trips stored in the database.
+
+        Args:
+            trip_db_dao (TripDbDao): DAO used to fetch the trips.
+
+        Returns:
+            TripIndex: A new index over the valid trips.
+        """
+        return cls(trip_db_dao.find_all_valid())
+
+    def __len__(self) -> int:
+        """Returns the number of indexed trips."""
+        return len(self.trips)
+
+    def _price_range(self, min_price: Decimal | None, max_price: Decimal | None) -> list[int]:
+        """Returns positions of trips with a price within the inclusive range."""
+        lo = 0 if min_price is None else bisect_left(self._prices, min_price)
+        hi = len(self._prices) if max_price is None else bisect_right(self._prices, max_price)
+        return self._price_order[lo:hi]
+
+    def query(
+            self,
+            destination: str | None = None,
+            agency_id: int | None = None,
+            num_of_people: int | None = None,
+            min_price: Decimal | None = None,
+            max_price: Decimal | None = None
+    ) -> list[Trip]:
+        """Finds trips matching all given filters.
+
+        Filters set to None are ignored. Price bounds are inclusive.
+
+        Args:
+            destination (str | None): Destination country.
+            agency_id (int | None): Agency identifier.
+            num_of_people (int | None): Number of people.
+            min_price (Decimal | None): Lowest accepted price per person.
+            max_price (Decimal | None): Highest accepted price per person.
+
+        Returns:
+            list[Trip]: Matching trips in their original order.
+        """
+        candidates: list[list[int]] = []
+        if destination is not None:
+            candidates.append(self._by_destination.get(destination, []))
+        if agency_id is not None:
+            candidates.append(self._by_agency_id.get(agency_id, []))
+        if num_of_people is not None:
+            candidates.append(self._by_num_of_people.get(num_of_people, []))
+        if min_price is not None or max_price is not None:
+            candidates.append(self._price_range(min_price, max_price))
+
+        if not candidates:
+            return list(self.trips)
+
+        def matches(trip: Trip) -> bool:
+            return ((destination is None or trip.destination == destination)
+                    and (agency_id is None or trip.agency_id == agency_id)
+                    and (num_of_people is None or trip.num_of_people == num_of_people)
+                    and (min_price is None or trip.price >= min_price)
+                    and (max_price is None or trip.price <= max_price))
+
+        smallest = min(candidates, key=len)
+        positions = sorted(position for position in smallest if matches(self.trips[position]))
+        return [self.trips[position] for position in positions]
+
+    def count(self, **filters) -> int:
+        """Counts trips matching the given filters.
+
+        Args:
+            **filters: The same keyword filters as accepted by `query`.
+
+        Returns:
+            int: Number of matching trips.
+        """
+        return len(self.query(**filters))
@@ -0,0 +1,45 @@
+"""Compares line-by-line agency parsing (`to_agencies`) with the chunked batch parser (`parse_agencies`).
+
+Usage:
+    python -m benchmarks.bench_agency_parsing --agencies 5000000
+"""
+import argparse
+import os
+import tempfile
+
+from app.data.generator import write_agencies_file
+from app.file_manager.file_manager import DEFAULT_CHUNK_SIZE, FileManager
+from app.model.agency import AgencyConverter
+from benchmarks.harness import run_benchmark
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--agencies', type=int, default=1_000_000)
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    file_manager = FileManager(['read', 'iter_lines', 'iter_chunks'])
+    with tempfile.NamedTemporaryFile(suffix='.txt', delete=False) as f:
+        path = f.name
+    write_agencies_file(path, args.agencies)
+
+    operations = {
+        'to_agencies(read_file)': lambda: AgencyConverter.to_agencies(file_manager.read_file(path)),
+        'to_agencies(iter_lines)': lambda: AgencyConverter.to_agencies(file_manager.iter_lines(path)),
+        'parse_agencies': lambda: AgencyConverter.parse_agencies(file_manager.iter_chunks(path, args.chunk_size)),
+    }
+    try:
+        expected = operations['parse_agencies']()
+        for label, operation in operations.items():
+            assert operation() == expected, f"{label} parsed different agencies"
+            result = run_benchmark(label, operation, args.agencies, args.repeat)
+            print(f"{label:<24} p50 {result.percentile(50):8.3f} s   {result.rows_per_sec:>12,.0f} rows/s"
+                  f"   peak traced {result.peak_traced_kib / 1024:8.1f} MiB")
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,56 @@
+"""Compares exact AgencyService reports with ApproximateTripStats on synthetic trips.
+
+Usage:
+    python -m benchmarks.bench_approximate_stats --trips 1000000
+"""
+import argparse
+import time
+import tracemalloc
+
+from app.model.agency import Agency, AgencyRepo
+from app.service.agency_service import AgencyService
+from app.service.approximate_stats import ApproximateTripStats
+from benchmarks.harness import SyntheticTripDao
+
+
+def measure(label: str, func):
+    tracemalloc.start()
+    started = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<12} {elapsed:8.3f} s   peak {peak / 2 ** 20:8.1f} MiB")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trips', type=int, default=200_000)
+    parser.add_argument('--agencies', type=int, default=50)
+    parser.add_argument('--destinations', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    repo = AgencyRepo()
+    repo.agencies = {i: Agency(i, f"Agency {i}", "Warszawa") for i in range(1, args.agencies + 1)}
+    dao = SyntheticTripDao(args.trips, args.agencies, args.destinations, args.seed)
+
+    def exact():
+        service = AgencyService(repo, dao)
+        destinations = {trip.destination for trips in service.offer.values() for trip in trips}
+        return service.mean_report_for_agencies(), destinations
+
+    (exact_means, exact_destinations) = measure("exact", exact)
+    approximate = measure("approximate", lambda: ApproximateTripStats.from_dao(repo, dao))
+
+    distinct_error = abs(approximate.count_distinct_destinations() - len(exact_destinations)) / len(exact_destinations)
+    print(f"distinct destinations: exact {len(exact_destinations)}, "
+          f"approximate {approximate.count_distinct_destinations()} ({distinct_error:.2%} error)")
+    approximate_means = approximate.mean_report_for_agencies()
+    worst = max(abs(approximate_means[name][0] - mean) for name, (mean, _) in exact_means.items())
+    print(f"largest mean price difference: {worst}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Compares agency-filtered GROUP BY reports on an unpartitioned and a partitioned trips table.
+
+Rows read are taken from the session `Handler_read_%` counters around each query, and the
+partitions MySQL actually reads come from EXPLAIN. Runs against a local MySQL server (e.g. the
+`mysql_test` service from docker-compose.yml on port 3308); its tables are dropped and recreated.
+
+Usage:
+    python -m benchmarks.bench_partitioning --port 3308 --rows 1000000 --partitions 16 --agencies-filtered 1
+"""
+import argparse
+import os
+import tempfile
+
+from app.data.generator import GeneratorConfig, write_trips_csv
+from app.persistence.connection import MySQLConnectionPoolBuilder
+from app.persistence.create_db import Partitioning, create_tables, drop_tables
+from app.persistence.dao import TripDbDao
+from app.persistence.unit_of_work import UnitOfWork
+from benchmarks.harness import run_benchmark
+
+
+def rows_read(pool, dao: TripDbDao, agency_ids: list[int]) -> int:
+    """Returns the number of rows the storage engine read to answer both reports."""
+    with UnitOfWork(pool) as unit_of_work:
+        cursor = unit_of_work.connection.cursor()
+        cursor.execute('FLUSH STATUS')
+        dao.count_trips_per_countries(agency_ids)
+        dao.countries_with_max_trips_for_agency(agency_ids)
+        cursor.execute("SHOW SESSION STATUS LIKE 'Handler_read%'")
+        return sum(int(value) for _, value in cursor.fetchall())
+
+
+def explained_partitions(pool, agency_ids: list[int]) -> str:
+    """Returns the partitions EXPLAIN reports for a scan filtered by the agencies."""
+    with UnitOfWork(pool) as unit_of_work:
+        cursor = unit_of_work.connection.cursor()
+        cursor.execute(f'EXPLAIN SELECT COUNT(*) FROM trips WHERE agency_id IN ({", ".join(map(str, agency_ids))})')
+        plan = dict(zip(cursor.column_names, cursor.fetchone()))
+        return plan.get('partitions') or 'all (not partitioned)'
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=3308)
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--agencies', type=int, default=100)
+    parser.add_argument('--partitions', type=int, default=16)
+    parser.add_argument('--agencies-filtered', type=int, default=1, help='number of agencies in the filter')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pool = MySQLConnectionPoolBuilder.builder().port(args.port).build()
+    dao = TripDbDao(pool)
+    agency_ids = list(range(1, args.agencies_filtered + 1))
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as f:
+        csv_path = f.name
+    write_trips_csv(csv_path, GeneratorConfig(rows=args.rows, agencies=args.agencies))
+
+    try:
+        for label, partitioning in (('unpartitioned', None), (f'hash x{args.partitions}', Partitioning('hash', args.partitions))):
+            drop_tables(pool)
+            create_tables(pool, csv_path, partitioning)
+            result = run_benchmark(label, lambda: (dao.count_trips_per_countries(agency_ids),
+                                                   dao.countries_with_max_trips_for_agency(agency_ids)),
+                                   args.rows, args.repeat)
+            print(f"{label:<16} p50 {result.percentile(50):8.4f} s   rows read {rows_read(pool, dao, agency_ids):>12,}"
+                  f"   partitions {explained_partitions(pool, agency_ids)}")
+    finally:
+        drop_tables(pool)
+        os.remove(csv_path)
+
+
+if __name__ == '__main__':
+    main()
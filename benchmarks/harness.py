@@ -0,0 +1,164 @@
+"""Timing, memory and result-comparison helpers shared by the benchmark scripts."""
+import json
+import math
+import platform
+import resource
+import statistics
+import subprocess
+import time
+import tracemalloc
+from dataclasses import dataclass, field, asdict
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterator
+
+from app.data.generator import GeneratorConfig, generate_trips
+from app.persistence.model import Trip
+
+
+class SyntheticTripDao:
+    """Stand-in for TripDbDao serving synthetic trips generated once, up front.
+
+    Every call reads the same pre-generated trips, so benchmarks time the code under test
+    rather than the trip generator.
+    """
+
+    def __init__(self, count: int, agencies: int = 50, destinations: int = 200, seed: int = 0):
+        self.config = GeneratorConfig(rows=count, agencies=agencies, destinations=destinations, seed=seed)
+        self.trips: tuple[Trip, ...] = tuple(generate_trips(self.config))
+
+    def iter_valid(self, batch_size: int = 1000) -> Iterator[Trip]:
+        return iter(self.trips)
+
+    def find_all_valid(self) -> list[Trip]:
+        return list(self.iter_valid())
+
+    def find_all(self) -> list[Trip]:
+        return self.find_all_valid()
+
+    def find_all_valid_by_destinations(self, destinations, chunk_size: int = 1000) -> list[Trip]:
+        destinations = set(destinations)
+        return [trip for trip in self.iter_valid() if trip.destination in destinations]
+
+    def count_trips_per_countries(self) -> list[tuple[str, int]]:
+        counts: dict[str, int] = {}
+        for trip in self.iter_valid():
+            counts[trip.destination] = counts.get(trip.destination, 0) + 1
+        return sorted(counts.items(), key=lambda item: item[1], reverse=True)
+
+
+@dataclass
+class BenchmarkResult:
+    """Measurements of a single benchmarked operation.
+
+    Attributes:
+        name (str): Operation name.
+        rows (int): Number of rows processed per run.
+        latencies (list[float]): Wall-clock seconds of each run.
+        peak_traced_kib (int): Peak Python heap allocated during the runs, in KiB.
+        peak_rss_kib (int): Process peak resident set size after the runs, in KiB (high-water mark).
+    """
+    name: str
+    rows: int
+    latencies: list[float] = field(default_factory=list)
+    peak_traced_kib: int = 0
+    peak_rss_kib: int = 0
+
+    def percentile(self, percentile: float) -> float:
+        """Returns a latency percentile in seconds (nearest rank)."""
+        ordered = sorted(self.latencies)
+        return ordered[max(math.ceil(percentile / 100 * len(ordered)), 1) - 1]
+
+    @property
+    def rows_per_sec(self) -> float:
+        """Returns throughput based on the median latency."""
+        median = statistics.median(self.latencies)
+        return self.rows / median if median else float('inf')
+
+    def to_dict(self) -> dict[str, Any]:
+        """Returns a JSON-serializable summary."""
+        return asdict(self) | {
+            'rows_per_sec': self.rows_per_sec,
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+        }
+
+
+def run_benchmark(name: str, func: Callable[[], Any], rows: int, repeat: int = 5,
+                  setup: Callable[[], Any] | None = None) -> BenchmarkResult:
+    """Runs an operation several times and records latency and memory.
+
+    Args:
+        name (str): Operation name.
+        func (Callable[[], Any]): Operation to measure.
+        rows (int): Number of rows processed per run.
+        repeat (int): Number of measured runs.
+        setup (Callable[[], Any] | None): Untimed callable run before every run.
+
+    Returns:
+        BenchmarkResult: Collected measurements.
+    """
+    result = BenchmarkResult(name, rows)
+    tracemalloc.start()
+    for _ in range(repeat):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        func()
+        result.latencies.append(time.perf_counter() - started)
+    result.peak_traced_kib = tracemalloc.get_traced_memory()[1] // 1024
+    tracemalloc.stop()
+    result.peak_rss_kib = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return result
+
+
+def _git_commit() -> str | None:
+    """Returns the current git commit hash, if available."""
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write_results(results: list[BenchmarkResult], path: str, backend: str) -> dict[str, Any]:
+    """Writes benchmark results with run metadata to a JSON file.
+
+    Args:
+        results (list[BenchmarkResult]): Results to write.
+        path (str): Output file path.
+        backend (str): Backend the benchmarks ran against.
+
+    Returns:
+        dict[str, Any]: The written document.
+    """
+    document = {
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'backend': backend,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'results': [result.to_dict() for result in results],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+    return document
+
+
+def find_regressions(baseline: dict[str, Any], current: dict[str, Any], threshold: float = 0.1) -> list[str]:
+    """Compares two result documents and lists operations whose median latency regressed.
+
+    Args:
+        baseline (dict[str, Any]): Earlier results document.
+        current (dict[str, Any]): New results document.
+        threshold (float): Allowed relative slowdown, e.g. 0.1 for 10%.
+
+    Returns:
+        list[str]: Human-readable descriptions of regressions.
+    """
+    previous = {(result['name'], result['rows']): result for result in baseline['results']}
+    regressions = []
+    for result in current['results']:
+        before = previous.get((result['name'], result['rows']))
+        if before and result['p50'] > before['p50'] * (1 + threshold):
+            regressions.append(f"{result['name']} ({result['rows']} rows): "
+                               f"p50 {before['p50']:.4f}s -> {result['p50']:.4f}s")
+    return regressions
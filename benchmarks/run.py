@@ -0,0 +1,114 @@
+"""Benchmark suite for DAO, ingestion and AgencyService hot paths.
+
+The `memory` backend runs the service reports over synthetic trips without a database.
+The `mysql` backend additionally measures `create_tables`, `CrudDao.insert_many` and
+`TripDbDao.find_all_valid` against a local MySQL server (e.g. the `mysql_test` service
+from docker-compose.yml on port 3308). Its tables are dropped and recreated.
+
+Usage:
+    python -m benchmarks.run --rows 10000 100000 --output results.json
+    python -m benchmarks.run --backend mysql --port 3308 --rows 10000 --compare baseline.json --threshold 0.1
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from itertools import islice
+
+from app.model.agency import Agency, AgencyRepo
+from app.service.agency_service import AgencyService
+from app.data.generator import GeneratorConfig, generate_trips, write_trips_csv
+from benchmarks.harness import BenchmarkResult, SyntheticTripDao, find_regressions, run_benchmark, write_results
+
+INSERT_BATCH_SIZE = 10_000
+
+
+def _agency_repo(agencies: int) -> AgencyRepo:
+    repo = AgencyRepo()
+    repo.agencies = {i: Agency(i, f"Agency {i}", "Warszawa") for i in range(1, agencies + 1)}
+    return repo
+
+
+def service_benchmarks(repo: AgencyRepo, dao, rows: int, repeat: int) -> list[BenchmarkResult]:
+    """Measures building the offer and every report derived from it."""
+    service = AgencyService(repo, dao)
+    return [
+        run_benchmark('service.build_offer', lambda: AgencyService(repo, dao), rows, repeat),
+        run_benchmark('service.find_agency_with_max_income', service.find_agency_with_max_income, rows, repeat),
+        run_benchmark('service.mean_report_for_agencies', service.mean_report_for_agencies, rows, repeat),
+        run_benchmark('service.percentile_report_for_agencies', service.percentile_report_for_agencies, rows, repeat),
+        run_benchmark('service.top_k_agencies_by_trips', lambda: service.top_k_agencies_by_trips(10), rows, repeat),
+    ]
+
+
+def mysql_benchmarks(port: int, rows: int, agencies: int, repeat: int) -> tuple[list[BenchmarkResult], object]:
+    """Measures ingestion and DAO reads against MySQL; returns results and the DAO for service benchmarks."""
+    from app.persistence.connection import MySQLConnectionPoolBuilder
+    from app.persistence.create_db import create_tables, drop_tables
+    from app.persistence.dao import TripDbDao
+
+    pool = MySQLConnectionPoolBuilder.builder().port(port).build()
+    dao = TripDbDao(pool)
+
+    config = GeneratorConfig(rows=rows, agencies=agencies)
+    with tempfile.NamedTemporaryFile(suffix='.csv', delete=False) as f:
+        csv_path = f.name
+    write_trips_csv(csv_path, config)
+
+    def insert_many():
+        trips = generate_trips(config)
+        while batch := list(islice(trips, INSERT_BATCH_SIZE)):
+            dao.insert_many(batch)
+
+    try:
+        results = [
+            run_benchmark('create_tables', lambda: create_tables(pool, csv_path), rows, repeat,
+                          setup=lambda: drop_tables(pool)),
+            run_benchmark('dao.insert_many', insert_many, rows, repeat, setup=dao.delete_all),
+            run_benchmark('dao.find_all_valid', dao.find_all_valid, rows, repeat),
+        ]
+    finally:
+        os.remove(csv_path)
+    return results, dao
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--backend', choices=['memory', 'mysql'], default='memory')
+    parser.add_argument('--port', type=int, default=3308, help='MySQL port for the mysql backend')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000])
+    parser.add_argument('--agencies', type=int, default=50)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='baseline JSON to check for regressions')
+    parser.add_argument('--threshold', type=float, default=0.1, help='allowed relative p50 slowdown')
+    args = parser.parse_args()
+
+    repo = _agency_repo(args.agencies)
+    results = []
+    for rows in args.rows:
+        if args.backend == 'mysql':
+            db_results, dao = mysql_benchmarks(args.port, rows, args.agencies, args.repeat)
+            results.extend(db_results)
+        else:
+            dao = SyntheticTripDao(rows, args.agencies)
+        results.extend(service_benchmarks(repo, dao, rows, args.repeat))
+
+    for result in results:
+        print(f"{result.name:<42} {result.rows:>10} rows  {result.rows_per_sec:>14,.0f} rows/s  "
+              f"p50 {result.percentile(50):8.4f}s  p95 {result.percentile(95):8.4f}s  "
+              f"rss {result.peak_rss_kib / 1024:8.1f} MiB")
+    document = write_results(results, args.output, args.backend)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = find_regressions(json.load(f), document, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
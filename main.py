@@ -1,8 +1,11 @@
+import argparse
 import logging
-from app.persistence.create_db import create_tables, drop_tables
+from app.persistence.create_db import Partitioning, create_tables, drop_tables, reload_tables_atomically, sync_trips_from_csv
 from app.persistence.connection import connection_pool
 from app.service.agency_service import AgencyService
-from app.persistence.dao import trip_db_dao
+from app.service.report_snapshots import ReportSnapshots
+from app.service.sharding import ShardedExecution
+from app.persistence.dao import summary_dao, trip_db_dao
 from app.model.agency import agency_repo
 from app.model.countries import european_countries_repo
 
@@ -14,25 +17,52 @@ def print_section(title: str, data: object) -> None:
     print(data)
 
 
+def load_trips(mode: str, partitioning: Partitioning | None = None) -> None:
+    """Loads the trips CSV into the database.
+
+    Args:
+        mode (str): `sync` applies only changed rows, `swap` reloads everything into a staging
+            table and swaps it in atomically, `reset` drops and recreates the table.
+        partitioning (Partitioning | None): Partitioning of a newly created trips table.
+    """
+    if mode == 'sync':
+        sync_trips_from_csv(connection_pool, partitioning=partitioning)
+    elif mode == 'swap':
+        reload_tables_atomically(connection_pool, partitioning=partitioning)
+    else:
+        drop_tables(connection_pool)
+        create_tables(connection_pool, partitioning=partitioning)
+
+
 def main() -> None:
-    # Reset DB
-    drop_tables(connection_pool)
-    create_tables(connection_pool)
+    parser = argparse.ArgumentParser(description='Loads trips and prints travel agency reports.')
+    parser.add_argument('--load-mode', choices=['sync', 'swap', 'reset'], default='sync',
+                        help='how the trips CSV is loaded (default: sync)')
+    parser.add_argument('--partitions', type=int, default=0,
+                        help='hash-partition a newly created trips table by agency_id into N partitions')
+    parser.add_argument('--shards', type=int, default=0,
+                        help='load the offer and compute per-agency reports in N worker processes')
+    args = parser.parse_args()
+    load_trips(args.load_mode, Partitioning('hash', args.partitions) if args.partitions else None)
 
-    # Init Service
-    service = AgencyService(agency_repo, trip_db_dao)
+    # Init Service; reports whose input data is unchanged since the last run come from snapshots
+    reports = ReportSnapshots(
+        lambda: AgencyService(agency_repo, trip_db_dao, summary_dao=summary_dao,
+                              sharding=ShardedExecution(shards=args.shards) if args.shards else None),
+        trip_db_dao, agency_repo)
 
     # Reports
-    print_section("OFFER (agency → trips)", service.offer)
-    print_section("AGENCY WITH MAX TRIPS", service.find_agency_with_max_trips())
-    print_section("AGENCY WITH MAX INCOME", service.find_agency_with_max_income())
-    print_section("COUNTRY WITH MAX TRIPS", service.find_country_with_max_trips())
-    print_section("MAX TRIPS PER COUNTRY", service.report_agencies_with_max_trips_for_each_country())
-    print_section("MEAN PRICE REPORT", service.mean_report_for_agencies())
+    print_section("OFFER (agency → trips)", reports.report('offer'))
+    print_section("AGENCY WITH MAX TRIPS", reports.report('find_agency_with_max_trips'))
+    print_section("AGENCY WITH MAX INCOME", reports.report('find_agency_with_max_income'))
+    print_section("COUNTRY WITH MAX TRIPS", reports.report('find_country_with_max_trips'))
+    print_section("MAX TRIPS PER COUNTRY", reports.report('report_agencies_with_max_trips_for_each_country'))
+    print_section("MEAN PRICE REPORT", reports.report('mean_report_for_agencies'))
     print_section("SELECTED EUROPEAN COUNTRIES", european_countries_repo.get_countries())
-    print_section("TRIPS ONLY TO EUROPEAN COUNTRIES", service.report_only_selected_countries_trips(european_countries_repo))
-    print_section("TRIPS BY PEOPLE QUANTITY", people_report := service.report_trips_for_people_quantity())
-    print_section("MAX PRICE PER QUANTITY", service.report_max_price_for_quantity_report(people_report))
+    print_section("TRIPS ONLY TO EUROPEAN COUNTRIES",
+                  reports.report('report_only_selected_countries_trips', countries=european_countries_repo))
+    print_section("TRIPS BY PEOPLE QUANTITY", people_report := reports.report('report_trips_for_people_quantity'))
+    print_section("MAX PRICE PER QUANTITY", AgencyService.report_max_price_for_quantity_report(people_report))
 
 
 if __name__ == '__main__':
@@ -0,0 +1,42 @@
+import threading
+import pytest
+from app.api.coalescing import RequestCoalescer
+
+
+def test_concurrent_calls_share_one_computation():
+    coalescer = RequestCoalescer()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "report"
+
+    results = []
+    owner = threading.Thread(target=lambda: results.append(coalescer.run("key", compute)))
+    owner.start()
+    assert started.wait(5)
+    waiters = [threading.Thread(target=lambda: results.append(coalescer.run("key", compute))) for _ in range(5)]
+    for waiter in waiters:
+        waiter.start()
+    while len(coalescer._in_flight["key"]._condition._waiters) < 5:  # all waiters blocked on the result
+        threading.Event().wait(0.01)
+    release.set()
+    for thread in [owner, *waiters]:
+        thread.join(5)
+
+    assert results == ["report"] * 6
+    assert len(calls) == 1
+
+
+def test_errors_are_shared_and_not_kept():
+    coalescer = RequestCoalescer()
+
+    def fail():
+        raise RuntimeError("database down")
+
+    with pytest.raises(RuntimeError, match="database down"):
+        coalescer.run("key", fail)
+    assert coalescer.run("key", lambda: "recovered") == "recovered"
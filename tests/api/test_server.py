@@ -0,0 +1,161 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock
+from app.api.server import ReportApi, ReportServer, to_json
+from app.model.agency import Agency
+from app.persistence.model import Trip
+
+
+@pytest.fixture
+def versions():
+    return {"trips": 1, "agencies": ("agencies.txt", 10, 100)}
+
+
+@pytest.fixture
+def service():
+    service = MagicMock()
+    service.top_k_countries.side_effect = lambda k: [("Spain", k)]
+    service.percentile_report_for_agencies.side_effect = lambda percentiles: {"TravelPlus": {p: Decimal("10.50") for p in percentiles}}
+    return service
+
+
+@pytest.fixture
+def clock():
+    return MagicMock(return_value=0.0)
+
+
+@pytest.fixture
+def api(versions, service, clock):
+    trip_dao, agency_repo = MagicMock(), MagicMock()
+    trip_dao.data_version.side_effect = lambda: versions["trips"]
+    agency_repo.data_version.side_effect = lambda: versions["agencies"]
+    api = ReportApi(MagicMock(return_value=service), trip_dao, agency_repo, cache=None, version_ttl=5.0, clock=clock)
+    api.trip_dao = trip_dao
+    return api
+
+
+def test_to_json_converts_report_values():
+    agency = Agency(1, "TravelPlus", "Warsaw")
+    trip = Trip(_id=7, _destination="Spain", _price=Decimal("10.50"), _num_of_people=2, _agency_id=1)
+
+    assert to_json({agency: [trip]}) == {"1": [
+        {"id": 7, "destination": "Spain", "price": "10.50", "num_of_people": 2, "agency_id": 1}]}
+    assert to_json([(agency, Decimal("1.5"))]) == [[{"id": 1, "name": "TravelPlus"}, "1.5"]]
+    assert to_json({2: {trip}}) == {"2": [to_json(trip)]}
+    assert to_json({agency: 1, Agency(2, "TravelPlus", "Krakow"): 2}) == {"1": 1, "2": 2}
+
+
+def test_report_is_served_as_json_with_etag(api):
+    status, headers, body = api.handle("/reports/top_k_countries?k=3", {})
+
+    assert status == 200
+    assert json.loads(body) == [["Spain", 3]]
+    assert headers["Content-Type"].startswith("application/json")
+    assert headers["ETag"].startswith('"')
+
+
+def test_matching_etag_returns_not_modified_without_computing(api, service):
+    _, headers, _ = api.handle("/reports/top_k_countries", {})
+
+    status, _, body = api.handle("/reports/top_k_countries", {"If-None-Match": headers["ETag"]})
+
+    assert (status, body) == (304, b"")
+    assert service.top_k_countries.call_count == 1
+
+
+def test_responses_are_cached_until_the_data_version_changes(api, service, versions, clock):
+    _, first, _ = api.handle("/reports/top_k_countries", {})
+    api.handle("/reports/top_k_countries", {})
+    assert service.top_k_countries.call_count == 1
+
+    versions["trips"] = 2
+    _, unchanged, _ = api.handle("/reports/top_k_countries", {})
+    assert unchanged["ETag"] == first["ETag"]  # versions are trusted for version_ttl seconds
+
+    clock.return_value = 6.0
+    _, changed, _ = api.handle("/reports/top_k_countries", {})
+    assert changed["ETag"] != first["ETag"]
+    assert service.top_k_countries.call_count == 2
+    assert api.trip_dao.data_version.call_count == 2
+
+
+def test_agency_reload_rekeys_the_service_and_refreshes_versions(api, service, versions):
+    api.handle("/reports/top_k_countries", {})
+    versions["agencies"] = ("agencies.txt", 20, 120)
+
+    api.agencies_changed()
+    api.handle("/reports/find_agency_with_max_trips", {})
+
+    service.on_agencies_changed.assert_called_once()
+    assert api._service_factory.call_count == 1
+    assert api._current_snapshots().version("offer") == (1, ("agencies.txt", 20, 120))
+
+
+def test_changed_trips_create_a_new_service(api, versions, clock):
+    api.handle("/reports/top_k_countries", {})
+    api.handle("/reports/top_k_countries", {})
+
+    versions["trips"] = 2
+    clock.return_value = 6.0
+    api.handle("/reports/top_k_countries", {})
+
+    assert api._service_factory.call_count == 2
+
+
+def test_data_versions_are_read_without_holding_the_lock(api):
+    locked = []
+    api.trip_dao.data_version.side_effect = lambda: locked.append(api._lock.locked()) or 1
+    api.handle("/reports/top_k_countries", {})
+    assert locked == [False]
+
+
+def test_percentiles_are_parsed(api):
+    status, _, body = api.handle("/reports/percentile_report_for_agencies?percentiles=50,99.5", {})
+
+    assert status == 200
+    assert json.loads(body) == {"TravelPlus": {"50": "10.50", "99.5": "10.50"}}
+
+
+@pytest.mark.parametrize("target, status", [
+    ("/reports/unknown", 404),
+    ("/elsewhere", 404),
+    ("/reports/top_k_countries?k=0", 400),
+    ("/reports/top_k_countries?limit=3", 400),
+    ("/reports/percentile_report_for_agencies?percentiles=120", 400),
+])
+def test_invalid_requests(api, target, status):
+    assert api.handle(target, {})[0] == status
+
+
+def test_failed_report_returns_server_error(api, service):
+    service.top_k_countries.side_effect = RuntimeError("pool exhausted")
+
+    status, _, body = api.handle("/reports/top_k_countries", {})
+
+    assert status == 500
+    assert json.loads(body) == {"error": "Report top_k_countries failed"}
+
+
+def test_server_answers_http_requests(api):
+    with ReportServer(("127.0.0.1", 0), api) as server:
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        try:
+            with urllib.request.urlopen(f"{base}/reports") as response:
+                assert "top_k_countries" in json.loads(response.read())
+            with urllib.request.urlopen(f"{base}/reports/top_k_countries?k=2") as response:
+                etag = response.headers["ETag"]
+                assert json.loads(response.read()) == [["Spain", 2]]
+
+            request = urllib.request.Request(f"{base}/reports/top_k_countries?k=2", headers={"If-None-Match": etag})
+            with pytest.raises(urllib.error.HTTPError) as not_modified:
+                urllib.request.urlopen(request)
+            assert not_modified.value.code == 304
+        finally:
+            server.shutdown()
+            thread.join(5)
@@ -0,0 +1,39 @@
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class TestBenchmarkRun:
+
+    def test_memory_backend_runs_without_database(self, tmp_path):
+        output = tmp_path / 'results.json'
+        completed = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.run', '--rows', '200', '--agencies', '5', '--repeat', '1',
+             '--output', str(output)],
+            cwd=ROOT, capture_output=True, text=True, timeout=120)
+        assert completed.returncode == 0, completed.stderr
+        with open(output, encoding='utf-8') as f:
+            document = json.load(f)
+        assert document['backend'] == 'memory'
+        assert {result['name'] for result in document['results']} >= {'service.build_offer'}
+
+    def test_importing_the_dao_does_not_connect(self):
+        completed = subprocess.run(
+            [sys.executable, '-c', 'import app.persistence.dao, app.service.agency_service, '
+                                   'benchmarks.bench_partitioning, benchmarks.bench_approximate_stats'],
+            cwd=ROOT, capture_output=True, text=True, timeout=60)
+        assert completed.returncode == 0, completed.stderr
+
+    def test_synthetic_dao_generates_trips_once(self, monkeypatch):
+        from benchmarks import harness
+        generated = []
+        generate_trips = harness.generate_trips
+        monkeypatch.setattr(harness, 'generate_trips', lambda config: generated.append(config) or generate_trips(config))
+
+        dao = harness.SyntheticTripDao(100, agencies=5)
+        assert dao.find_all_valid() == list(dao.iter_valid())
+        assert sum(count for _, count in dao.count_trips_per_countries()) == len(dao.trips)
+        assert len(generated) == 1
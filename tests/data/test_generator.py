@@ -0,0 +1,51 @@
+import csv
+from collections import Counter
+from app.data.generator import (GeneratorConfig, ZipfSampler, destination_name, generate_agency_lines,
+                                generate_trip_rows, generate_trips, write_agencies_file, write_trips_csv)
+from app.model.agency import AgencyConverter
+from app.persistence.csv_rows import validate_row
+import random
+
+
+def test_generator_is_deterministic():
+    config = GeneratorConfig(rows=200, seed=3)
+    assert list(generate_trip_rows(config)) == list(generate_trip_rows(config))
+    assert list(generate_trip_rows(config)) != list(generate_trip_rows(GeneratorConfig(rows=200, seed=4)))
+
+
+def test_destination_names_are_valid_and_unique():
+    names = [destination_name(i) for i in range(1000)]
+    assert len(set(names)) == 1000
+    assert all(name.replace(" ", "").isalpha() for name in names)
+
+
+def test_zipf_sampler_is_skewed():
+    sampler = ZipfSampler(50, 1.1, random.Random(0))
+    counts = Counter(sampler.sample() for _ in range(5000))
+    assert counts[0] > counts[10] > counts.get(49, 0)
+
+
+def test_invalid_rows_follow_validation_rules():
+    config = GeneratorConfig(rows=2000, invalid_rate=0.2, seed=1)
+    rows = list(generate_trip_rows(config))
+    rejected_on_load = sum(1 for number, row in enumerate(rows) if validate_row(row, number) is None)
+    valid = sum(1 for _ in generate_trips(config))
+    assert 0 < rejected_on_load < 2000 - valid
+    assert 0.15 < (2000 - valid) / 2000 < 0.25
+
+
+def test_write_trips_csv(tmp_path):
+    path = tmp_path / "trips.csv"
+    assert write_trips_csv(str(path), GeneratorConfig(rows=10)) == 10
+    with open(path, encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["id", "destination", "price", "num_of_people", "agency_id"]
+    assert len(rows) == 11
+
+
+def test_agency_lines_parse_with_agency_converter(tmp_path):
+    agencies = AgencyConverter.to_agencies(generate_agency_lines(20))
+    assert sorted(agencies) == list(range(1, 21))
+    path = tmp_path / "agencies.txt"
+    assert write_agencies_file(str(path), 5) == 5
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 5
@@ -22,6 +22,11 @@ def file_manager():
     return FileManager(operations=["write", "read", "delete"])
 
 
+@pytest.fixture
+def streaming_file_manager():
+    return FileManager(operations=["iter_lines", "iter_chunks", "iter_mmap_lines"])
+
+
 def test_write_file(file_manager, file_path):
     file_manager.write_file(file_path, "Test data")
     assert file_path.exists()
@@ -95,4 +100,45 @@ def test_delete_file_io_error(file_manager, test_file, monkeypatch):
     monkeypatch.setattr(os, "remove", mock_remove)
 
     with pytest.raises(IOError, match=f"Failed to delete file: {test_file}.*Mocked IOError"):
-        file_manager.delete_file(test_file)
\ No newline at end of file
+        file_manager.delete_file(test_file)
+
+
+def test_iter_lines_is_lazy(streaming_file_manager, file_path):
+    file_path.write_text("Line 1\nLine 2\n")
+    lines = streaming_file_manager.iter_lines(file_path)
+    assert not isinstance(lines, list)
+    assert list(lines) == ["Line 1", "Line 2"]
+
+
+def test_iter_chunks(streaming_file_manager, file_path):
+    file_path.write_bytes(b"abcdefg")
+    assert list(streaming_file_manager.iter_chunks(file_path, chunk_size=3)) == [b"abc", b"def", b"g"]
+
+
+def test_iter_mmap_lines(streaming_file_manager, file_path):
+    file_path.write_bytes("Łódź\r\nLine 2\nLast".encode("utf-8"))
+    assert list(streaming_file_manager.iter_mmap_lines(file_path)) == ["Łódź", "Line 2", "Last"]
+
+
+def test_iter_mmap_lines_empty_file(streaming_file_manager, file_path):
+    file_path.write_bytes(b"")
+    assert list(streaming_file_manager.iter_mmap_lines(file_path)) == []
+
+
+@pytest.mark.parametrize("operation", ["iter_lines", "iter_chunks", "iter_mmap_lines"])
+def test_streaming_read_file_not_found(streaming_file_manager, operation):
+    with pytest.raises(FileNotFoundError, match="File not found"):
+        getattr(streaming_file_manager, operation)("non_existent_file.txt")
+
+
+def test_iter_lines_io_error(streaming_file_manager, file_path, monkeypatch):
+    file_path.write_text("Test content")
+    lines = streaming_file_manager.iter_lines(file_path)
+
+    def mock_open(*args, **kwargs):
+        raise IOError("Mocked IOError")
+
+    monkeypatch.setattr("builtins.open", mock_open)
+
+    with pytest.raises(IOError, match="Failed to read file: .*Mocked IOError"):
+        next(lines)
@@ -0,0 +1,56 @@
+import os
+import threading
+import pytest
+from unittest.mock import MagicMock
+from app.file_manager.file_watcher import FileWatcher
+
+
+@pytest.fixture
+def file_path(tmp_path):
+    path = tmp_path / "watched.txt"
+    path.write_text("v1", encoding="utf-8")
+    return path
+
+
+def touch(path, text):
+    path.write_text(text, encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_check_reports_each_change_once(file_path):
+    on_change = MagicMock()
+    watcher = FileWatcher(file_path, on_change)
+
+    assert not watcher.check()
+    touch(file_path, "v2")
+    assert watcher.check()
+    assert not watcher.check()
+    on_change.assert_called_once()
+
+
+def test_deleted_file_is_not_reported_until_recreated(file_path):
+    on_change = MagicMock()
+    watcher = FileWatcher(file_path, on_change)
+
+    os.remove(file_path)
+    watcher.check()
+    on_change.assert_not_called()
+    touch(file_path, "v3")
+    watcher.check()
+    on_change.assert_called_once()
+
+
+def test_callback_errors_are_logged(file_path, caplog):
+    watcher = FileWatcher(file_path, MagicMock(side_effect=ValueError("bad file")))
+    touch(file_path, "v2")
+
+    assert watcher.check()
+    assert "bad file" in caplog.text
+
+
+def test_background_thread_polls_until_stopped(file_path):
+    changed = threading.Event()
+    with FileWatcher(file_path, changed.set, interval=0.01):
+        touch(file_path, "v2")
+        assert changed.wait(5)
@@ -0,0 +1,77 @@
+import os
+import pytest
+from unittest.mock import MagicMock
+from app.file_manager.snapshot_cache import CACHE_DIR_ENV, SnapshotCache
+from app.model.agency import Agency, AgencyRepo
+from app.model.countries import CountryRepo
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "agencies.txt"
+    path.write_text("1,Agency One,London\n2,Agency Two,Berlin\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SnapshotCache(str(tmp_path / "cache"))
+
+
+def test_snapshot_is_reused_while_source_is_unchanged(cache, source):
+    build = MagicMock(return_value={"parsed": 1})
+
+    assert cache.get_or_build(str(source), build) == {"parsed": 1}
+    assert cache.get_or_build(str(source), build) == {"parsed": 1}
+    build.assert_called_once()
+
+
+def test_changed_source_is_parsed_again(cache, source):
+    cache.get_or_build(str(source), lambda: "old")
+    source.write_text("1,Agency One,Paris and more\n", encoding="utf-8")
+
+    assert cache.get_or_build(str(source), lambda: "new") == "new"
+    assert cache.get_or_build(str(source), lambda: "newest") == "new"
+
+
+def test_unreadable_snapshot_is_rebuilt(cache, source, caplog):
+    cache.get_or_build(str(source), lambda: "first")
+    (snapshot,) = os.listdir(cache.directory)
+    (source.parent / "cache" / snapshot).write_bytes(b"not a pickle")
+
+    assert cache.get_or_build(str(source), lambda: "rebuilt") == "rebuilt"
+    assert "Ignoring unreadable snapshot" in caplog.text
+
+
+def test_cache_disabled_by_empty_environment_variable(source, monkeypatch, tmp_path):
+    monkeypatch.setenv(CACHE_DIR_ENV, "")
+    monkeypatch.chdir(tmp_path)
+    build = MagicMock(return_value="value")
+
+    SnapshotCache().get_or_build(str(source), build)
+    SnapshotCache().get_or_build(str(source), build)
+
+    assert build.call_count == 2
+    assert not (tmp_path / ".snapshot_cache").exists()
+
+
+def test_repositories_load_from_snapshot(cache, source, tmp_path):
+    countries = tmp_path / "countries.txt"
+    countries.write_text("Poland\nSpain\n", encoding="utf-8")
+    AgencyRepo(str(source), cache)
+    CountryRepo(str(countries), cache)
+    stat = os.stat(source)
+    source.write_bytes(b"x" * stat.st_size)  # unparsable, but with the same size and mtime
+    os.utime(source, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert AgencyRepo(str(source), cache).get_by_id(2) == Agency(2, "Agency Two", "Berlin")
+    assert CountryRepo(str(countries), cache).get_countries() == frozenset({"Poland", "Spain"})
+
+
+def test_versioned_snapshot_is_rebuilt_for_another_version(cache):
+    build = MagicMock(side_effect=["first", "second"])
+
+    assert cache.get_or_build_versioned("report:x", (1, 2), build) == "first"
+    assert cache.get_or_build_versioned("report:x", (1, 2), build) == "first"
+    assert cache.get_or_build_versioned("report:x", (1, 3), build) == "second"
+    assert build.call_count == 2
@@ -6,3 +6,32 @@ def test_agency_converter(agencies_data_text, agencies_converted_dict):
     converted_agencies = AgencyConverter().to_agencies(agencies_data_text)
     assert converted_agencies == agencies_converted_dict
 
+
+
+def test_agency_converter_consumes_iterator(agencies_data_text, agencies_converted_dict):
+    assert AgencyConverter.to_agencies(iter(agencies_data_text)) == agencies_converted_dict
+
+
+def test_parse_agencies_matches_to_agencies_across_chunk_boundaries(agencies_data_text, agencies_converted_dict):
+    data = "\n".join(agencies_data_text + ["4,Biuro,Kraków"]).encode("utf-8")
+    chunks = [data[start:start + 7] for start in range(0, len(data), 7)]
+
+    agencies = AgencyConverter.parse_agencies(chunks)
+
+    assert agencies == AgencyConverter.to_agencies(agencies_data_text + ["4,Biuro,Kraków"])
+    assert agencies[4] == Agency(4, "Biuro", "Kraków")
+
+
+def test_parse_agencies_collects_every_invalid_line(agencies_converted_dict):
+    errors = []
+    data = b"1,Agency One,London\r\nnot an agency\n\n2,Agency Two,Berlin\n3,Agency Three,Prague\nx,y,z\n"
+
+    agencies = AgencyConverter.parse_agencies([data], errors)
+
+    assert agencies == agencies_converted_dict
+    assert errors == ["Line 2: Invalid data: not an agency", "Line 3: Invalid data: ", "Line 6: Invalid data: x,y,z"]
+
+
+def test_parse_agencies_raises_after_parsing_without_error_list():
+    with pytest.raises(AttributeError, match="2 invalid lines, first: Line 1"):
+        AgencyConverter.parse_agencies([b"bad\n1,Agency One,London\nworse"])
@@ -20,7 +20,7 @@ def test_id_agencies(agency_repo, mock_agencies):
 
 
 @patch("app.file_manager.file_manager.FileManager._create_file_method")
-@patch("app.model.agency.AgencyConverter.to_agencies")
+@patch("app.model.agency.AgencyConverter.parse_agencies")
 def test_read_file(mock_to_agencies, mock_create_file_method):
     mock_create_file_method.return_value = MagicMock(
         return_value=["1,Travel Agency,New York"]
@@ -37,3 +37,88 @@ def test_read_file(mock_to_agencies, mock_create_file_method):
     }
 
     assert repo.agencies == expected
+
+
+@patch("app.model.agency.AgencyConverter.parse_agencies")
+def test_lazy_repo_reads_file_on_first_use(mock_parse_agencies, tmp_path):
+    path = tmp_path / "agencies.txt"
+    path.write_text("1,Travel Agency,New York", encoding="utf-8")
+    mock_parse_agencies.return_value = {1: Agency(_id=1, _name="Travel Agency", _localization="New York")}
+
+    repo = AgencyRepo(path, cache=None, lazy=True)
+    mock_parse_agencies.assert_not_called()
+
+    assert repo.get_by_id(1).name == "Travel Agency"
+    assert repo.agency_name_for_id(1) == "Travel Agency"
+    mock_parse_agencies.assert_called_once()
+
+
+def test_default_file_is_resolved_from_the_package():
+    from app.model.agency import AGENCIES_FILE_PATH
+    repo = AgencyRepo(AGENCIES_FILE_PATH, cache=None)
+    assert repo.get_by_id(1) is not None
+
+
+def test_reload_swaps_in_new_agencies_and_reports_changes(tmp_path):
+    from app.model.agency import AgencyChanges
+    path = tmp_path / "agencies.txt"
+    path.write_text("1,Agency One,London\n2,Agency Two,Berlin", encoding="utf-8")
+    repo = AgencyRepo(path, cache=None)
+    old_agencies = repo.agencies
+
+    path.write_text("1,Agency One,Paris\n3,Agency Three,Prague", encoding="utf-8")
+    changes = repo.reload()
+
+    assert changes == AgencyChanges(added=[Agency(3, "Agency Three", "Prague")],
+                                    removed=[Agency(2, "Agency Two", "Berlin")],
+                                    updated=[Agency(1, "Agency One", "Paris")])
+    assert repo.agencies is not old_agencies
+    assert old_agencies[2] == Agency(2, "Agency Two", "Berlin")
+
+
+def test_failed_reload_keeps_current_agencies(tmp_path):
+    path = tmp_path / "agencies.txt"
+    path.write_text("1,Agency One,London", encoding="utf-8")
+    repo = AgencyRepo(path, cache=None)
+
+    path.write_text("1,Agency One,London\n2,", encoding="utf-8")
+    with pytest.raises(AttributeError):
+        repo.reload()
+
+    assert repo.get_agencies() == [Agency(1, "Agency One", "London")]
+
+
+def test_watch_reloads_in_background(tmp_path):
+    import threading
+    path = tmp_path / "agencies.txt"
+    path.write_text("1,Agency One,London", encoding="utf-8")
+    repo = AgencyRepo(path, cache=None)
+    reloaded = threading.Event()
+
+    watcher = repo.watch(interval=0.01, on_change=lambda changes: reloaded.set())
+    try:
+        path.write_text("1,Agency One,London\n2,Agency Two,Berlin", encoding="utf-8")
+        assert reloaded.wait(5)
+    finally:
+        watcher.stop()
+
+    assert repo.agency_name_for_id(2) == "Agency Two"
+
+
+def test_data_version_follows_the_loaded_file(tmp_path):
+    import os
+    path = tmp_path / "agencies.txt"
+    path.write_text("1,Agency One,London", encoding="utf-8")
+    repo = AgencyRepo(path, cache=None, lazy=True)
+    before_load = repo.data_version()
+
+    assert repo.get_by_id(1) is not None
+    assert repo.data_version() == before_load == (os.path.abspath(path), os.stat(path).st_mtime_ns, os.stat(path).st_size)
+
+    path.write_text("1,Agency One,Paris and Rome", encoding="utf-8")
+    assert repo.data_version() == before_load
+    repo.reload()
+    assert repo.data_version() != before_load
+
+    repo.agencies = {}
+    assert repo.data_version() is None
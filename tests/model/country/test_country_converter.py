@@ -6,3 +6,7 @@ def test_country_converter(countries_data_text, countries_converted_dict):
     converted_countries = CountryConverter().to_countries(countries_data_text)
     assert converted_countries == countries_converted_dict
 
+
+
+def test_country_converter_consumes_iterator(countries_data_text, countries_converted_dict):
+    assert CountryConverter.to_countries(line for line in countries_data_text) == countries_converted_dict
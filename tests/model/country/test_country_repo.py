@@ -29,3 +29,75 @@ def test_read_file(mock_to_countries, mock_create_file_method):
     }
 
     assert repo.countries == expected
+
+
+def test_get_countries_is_frozen_and_precomputed(country_repo):
+    countries = country_repo.get_countries()
+    assert isinstance(countries, frozenset)
+    assert country_repo.get_countries() is countries
+
+
+def test_lazy_repo_reads_file_on_first_use(tmp_path):
+    path = tmp_path / "countries.txt"
+    path.write_text("Poland\nSpain", encoding="utf-8")
+
+    repo = CountryRepo(path, cache=None, lazy=True)
+    path.write_text("Malta", encoding="utf-8")
+
+    assert repo.get_countries() == frozenset({"Malta"})
+
+
+def test_default_file_is_resolved_from_the_package():
+    from app.model.countries import EUROPEAN_COUNTRIES_FILE_PATH
+    assert CountryRepo(EUROPEAN_COUNTRIES_FILE_PATH, cache=None).get_countries()
+
+
+def test_data_version_follows_the_loaded_file(tmp_path):
+    import os
+    path = tmp_path / "countries.txt"
+    path.write_text("Poland\n", encoding="utf-8")
+    repo = CountryRepo(path, cache=None, lazy=True)
+    before_load = repo.data_version()
+
+    assert repo.get_countries()
+    assert repo.data_version() == before_load == (os.path.abspath(path), os.stat(path).st_mtime_ns, os.stat(path).st_size)
+    assert CountryRepo(cache=None).data_version() is None
+
+
+def test_assigned_countries_have_no_data_version(tmp_path):
+    path = tmp_path / "countries.txt"
+    path.write_text("Poland\n", encoding="utf-8")
+    repo = CountryRepo(path, cache=None)
+    assert repo.data_version() is not None
+
+    repo.countries = {0: Country(name="Atlantis")}
+    assert repo.data_version() is None
+
+
+def test_concurrent_first_use_waits_for_the_names(tmp_path, monkeypatch):
+    import threading
+    from concurrent.futures import Future
+
+    path = tmp_path / "countries.txt"
+    path.write_text("Poland\n", encoding="utf-8")
+    repo = CountryRepo(path, cache=None, lazy=True)
+    concurrent = Future()
+
+    class Countries(dict):
+        def values(self):
+            # Another thread asks for the countries while the names are being computed.
+            def read():
+                try:
+                    concurrent.set_result(repo.get_countries())
+                except Exception as e:
+                    concurrent.set_exception(e)
+            thread = threading.Thread(target=read)
+            thread.start()
+            thread.join(timeout=0.2)
+            return super().values()
+
+    to_countries = CountryConverter.to_countries
+    monkeypatch.setattr(CountryConverter, "to_countries", staticmethod(lambda lines: Countries(to_countries(lines))))
+
+    assert repo.get_countries() == frozenset({"Poland"})
+    assert concurrent.result(timeout=5) == frozenset({"Poland"})
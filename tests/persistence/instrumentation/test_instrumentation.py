@@ -0,0 +1,100 @@
+import logging
+import pytest
+from unittest.mock import MagicMock
+from app.persistence.dao import TripDbDao
+from app.persistence.instrumentation import QueryInstrumentation, statement_fingerprint
+
+
+def test_statement_fingerprint_replaces_literals():
+    assert statement_fingerprint("SELECT * FROM trips WHERE id=15") == "SELECT * FROM trips WHERE id=?"
+    assert statement_fingerprint("UPDATE trips SET destination='Spain', price=10.5 WHERE id=3") == \
+        "UPDATE trips SET destination=?, price=? WHERE id=?"
+
+
+def test_statement_fingerprint_collapses_large_value_lists():
+    sql = "INSERT INTO trips (destination) VALUES " + ", ".join(["('Spain')"] * 5000)
+    assert statement_fingerprint(sql) == "INSERT INTO trips (destination) VALUES (?), ..."
+
+
+def test_record_aggregates_by_fingerprint():
+    instrumentation = QueryInstrumentation()
+    instrumentation.record("SELECT * FROM trips WHERE id=1", {"execute": 0.5, "fetch": 0.25}, 1)
+    instrumentation.record("SELECT * FROM trips WHERE id=2", {"execute": 0.25}, 1)
+    [stats] = instrumentation.snapshot()
+    assert stats.calls == 2
+    assert stats.rows == 2
+    assert stats.phase_seconds == {"execute": 0.75, "fetch": 0.25}
+    assert stats.max_seconds == 0.75
+    instrumentation.reset()
+    assert instrumentation.snapshot() == []
+
+
+def test_slow_query_is_logged(caplog):
+    instrumentation = QueryInstrumentation(slow_query_seconds=0.1)
+    with caplog.at_level(logging.WARNING):
+        instrumentation.record("SELECT * FROM trips", {"execute": 0.2}, 10)
+    assert "[SLOW SQL]" in caplog.text
+    assert instrumentation.snapshot()[0].slow_calls == 1
+
+
+def test_disabled_instrumentation_records_nothing():
+    instrumentation = QueryInstrumentation(enabled=False)
+    timer = instrumentation.timer("SELECT 1")
+    with timer.phase("execute"):
+        pass
+    timer.finish()
+    assert instrumentation.snapshot() == []
+
+
+def test_to_prometheus():
+    instrumentation = QueryInstrumentation()
+    instrumentation.record('SELECT "x" FROM trips', {"execute": 0.5}, 3)
+    text = instrumentation.to_prometheus()
+    assert '# TYPE travel_agency_sql_phase_seconds_total counter' in text
+    assert 'travel_agency_sql_phase_seconds_total{statement="SELECT \\"x\\" FROM trips",phase="execute"} 0.5' in text
+    assert 'travel_agency_sql_rows_total{statement="SELECT \\"x\\" FROM trips"} 3' in text
+    assert text.endswith("\n")
+
+
+def test_dao_records_all_phases():
+    pool = MagicMock()
+    cursor = pool.get_connection.return_value.__enter__.return_value.cursor.return_value
+    cursor.fetchall.return_value = [(1, "Spain", 100, 2, 1)]
+    instrumentation = QueryInstrumentation()
+
+    trips = TripDbDao(pool, instrumentation).find_all()
+
+    assert len(trips) == 1
+    [stats] = instrumentation.snapshot()
+    assert stats.statement == "SELECT id, destination, price, num_of_people, agency_id FROM trips"
+    assert stats.rows == 1
+    assert set(stats.phase_seconds) == {"pool_wait", "execute", "fetch", "mapping"}
+
+
+def test_dao_records_failed_statements():
+    pool = MagicMock()
+    cursor = pool.get_connection.return_value.__enter__.return_value.cursor.return_value
+    cursor.execute.side_effect = RuntimeError("connection lost")
+    instrumentation = QueryInstrumentation()
+
+    with pytest.raises(RuntimeError):
+        TripDbDao(pool, instrumentation).find_all()
+
+    [stats] = instrumentation.snapshot()
+    assert stats.statement == "SELECT id, destination, price, num_of_people, agency_id FROM trips"
+    assert "execute" in stats.phase_seconds
+
+
+def test_dao_records_failed_statements_in_transactions():
+    pool = MagicMock()
+    cursor = pool.get_connection.return_value.__enter__.return_value.cursor.return_value
+    cursor.rowcount = 1
+    cursor.execute.side_effect = [None, RuntimeError("deadlock")]
+    instrumentation = QueryInstrumentation()
+
+    with pytest.raises(RuntimeError):
+        TripDbDao(pool, instrumentation)._run_in_transaction([("DELETE FROM trips WHERE id = %s", (1,)),
+                                                              ("DELETE FROM agencies WHERE id = %s", (2,))])
+
+    assert {stats.statement for stats in instrumentation.snapshot()} == {
+        "DELETE FROM trips WHERE id = ?", "DELETE FROM agencies WHERE id = ?"}
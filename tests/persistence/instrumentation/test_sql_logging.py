@@ -0,0 +1,45 @@
+import logging
+from decimal import Decimal
+from unittest.mock import MagicMock
+from app.persistence.dao import TripDbDao
+from app.persistence.sql_logging import LazySql, SampledWarnings, log_sql
+
+
+def test_lazy_sql_keeps_short_statements():
+    assert str(LazySql("SELECT * FROM trips", max_length=100)) == "SELECT * FROM trips"
+
+
+def test_lazy_sql_truncates_and_hashes_long_statements():
+    text = str(LazySql("INSERT INTO trips VALUES " + "(1), " * 1000, max_length=30))
+    assert text.startswith("INSERT INTO trips VALUES (1), ")
+    assert "[5025 chars, sha1 " in text
+
+
+def test_log_sql_skips_formatting_when_info_disabled(caplog):
+    logger = logging.getLogger("tests.sql_logging")
+    sql = MagicMock()
+    with caplog.at_level(logging.WARNING, logger="tests.sql_logging"):
+        log_sql(logger, sql)
+    sql.__len__.assert_not_called()
+    assert caplog.text == ""
+
+
+def test_sampled_warnings_logs_one_summary(caplog):
+    logger = logging.getLogger("tests.sql_logging")
+    summary = SampledWarnings("Invalid records skipped", sample_size=2)
+    for i in range(10):
+        summary.add(f"record {i}")
+    with caplog.at_level(logging.WARNING, logger="tests.sql_logging"):
+        summary.log(logger)
+    assert caplog.text.count("WARNING") == 1
+    assert "Invalid records skipped: 10 (first 2: record 0; record 1)" in caplog.text
+
+
+def test_find_all_valid_aggregates_invalid_records(caplog):
+    pool = MagicMock()
+    cursor = pool.get_connection.return_value.__enter__.return_value.cursor.return_value
+    cursor.fetchall.return_value = [(i, "12#", Decimal("-1"), -1, 1) for i in range(50)] + [(99, "Spain", Decimal("5"), 1, 1)]
+    with caplog.at_level(logging.WARNING):
+        trips = TripDbDao(pool).find_all_valid()
+    assert [trip.id for trip in trips] == [99]
+    assert caplog.text.count("Invalid records skipped: 50") == 1
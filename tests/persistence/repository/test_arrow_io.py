@@ -0,0 +1,81 @@
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock
+from app.persistence import arrow_io
+from app.persistence.dao import TripDbDao
+from app.persistence.model import Trip
+
+
+@pytest.fixture
+def cursor():
+    return MagicMock()
+
+
+@pytest.fixture
+def fake_pool(cursor):
+    pool = MagicMock()
+    conn = pool.get_connection.return_value.__enter__.return_value
+    conn.cursor.return_value = cursor
+    return pool
+
+
+@pytest.fixture
+def rows():
+    return [(1, "Spain", Decimal("1000.00"), 2, 1), (2, "Italy", Decimal("-1.00"), 4, 1), (3, "Malta", Decimal("9.99"), 1, 2)]
+
+
+@pytest.mark.parametrize("path, file_format, expected", [
+    ("trips.parquet", None, "parquet"),
+    ("trips.ARROW", None, "arrow"),
+    ("trips.bin", "arrow", "arrow"),
+])
+def test_file_format_for(path, file_format, expected):
+    assert arrow_io.file_format_for(path, file_format) == expected
+
+
+def test_file_format_for_unknown_extension():
+    with pytest.raises(ValueError, match="trips.csv"):
+        arrow_io.file_format_for("trips.csv")
+
+
+def test_missing_pyarrow_is_reported_on_use(monkeypatch):
+    def import_module(name):
+        raise ModuleNotFoundError(f"No module named '{name}'")
+    monkeypatch.setattr(arrow_io.importlib, 'import_module', import_module)
+
+    with pytest.raises(ImportError, match="pip install pyarrow"):
+        arrow_io.trip_schema()
+
+
+@pytest.mark.parametrize("suffix", [".parquet", ".arrow"])
+def test_export_and_import_trips_round_trip(tmp_path, fake_pool, cursor, rows, suffix):
+    pytest.importorskip("pyarrow")
+    cursor.fetchmany.side_effect = [rows[:2], rows[2:], []]
+    path = tmp_path / f"trips{suffix}"
+
+    assert TripDbDao(fake_pool).export_trips(str(path), batch_size=2) == 3
+    assert "ORDER BY id" in cursor.execute.call_args.args[0]
+    assert not (tmp_path / f"trips{suffix}.tmp").exists()
+
+    dao = TripDbDao(fake_pool)
+    dao.upsert_many = MagicMock()
+    assert dao.import_trips(str(path), batch_size=2) == 3
+    imported = [trip for call in dao.upsert_many.call_args_list for trip in call.args[0]]
+    assert imported == [Trip(*row) for row in rows]
+
+
+def test_write_rows_infers_column_types(tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    path = tmp_path / "report.arrow"
+
+    assert arrow_io.write_rows(path, ("agency", "income"), [("TravelPlus", Decimal("1.5")), ("GoHoliday", Decimal("12.25"))]) == 2
+
+    table = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+    assert table.column_names == ["agency", "income"]
+    assert table.column("income").to_pylist() == [Decimal("1.50"), Decimal("12.25")]
+
+
+def test_write_rows_rejects_rows_not_matching_the_columns(tmp_path):
+    with pytest.raises(ValueError, match="2 values for 3 columns"):
+        arrow_io.write_rows(tmp_path / "report.arrow", ("agency_id", "agency", "trip_count"), [(1, "A", 1), (None, 2)])
+    assert list(tmp_path.iterdir()) == []
@@ -2,9 +2,9 @@ import pytest
 from decimal import Decimal
 from mysql.connector.pooling import MySQLConnectionPool
 from app.persistence.connection import MySQLConnectionPoolBuilder
-from app.persistence.dao import TripDbDao
+from app.persistence.dao import AgencyDbRepo, SummaryDao, TripDbDao
 from app.persistence.model import Trip
-from app.persistence.create_db import create_tables, drop_tables
+from app.persistence.create_db import create_tables, drop_tables, load_agencies, reload_tables_atomically
 import logging
 
 # ---- Fixtures ----
@@ -73,6 +73,12 @@ class TestTripDbDao:
             assert trip.price is not None and trip.price >= 0
             assert trip.num_of_people is not None and trip.num_of_people >= 0
 
+    def test_find_all_valid_by_destinations(self, trip_dao, valid_trip):
+        trip_dao.insert(valid_trip)
+        trips = trip_dao.find_all_valid_by_destinations([valid_trip.destination])
+        assert trips
+        assert all(trip.destination == valid_trip.destination for trip in trips)
+
     def test_find_by_agency_id(self, trip_dao, valid_trip):
         trip_dao.insert(valid_trip)
         results = trip_dao.find_by_agency_id(valid_trip.agency_id)
@@ -135,6 +141,81 @@ class TestTripDbDao:
         assert "Paris" in destinations
         assert "Berlin" in destinations
 
+    def test_upsert_many_inserts_and_updates(self, trip_dao, valid_trip):
+        trip_id = trip_dao.insert(valid_trip)
+        changed = Trip(_id=trip_id, _destination="Lisbon", _price=valid_trip.price,
+                       _num_of_people=valid_trip.num_of_people, _agency_id=valid_trip.agency_id)
+        new = Trip(_destination="Porto", _price=Decimal("10.00"), _num_of_people=1, _agency_id=1)
+        assert trip_dao.upsert_many([changed, new]) == 3
+        assert trip_dao.find_by_id(trip_id)[1] == "Lisbon"
+
+    def test_update_many(self, trip_dao, valid_trip):
+        first, second = trip_dao.insert(valid_trip), trip_dao.insert(valid_trip)
+        trip_dao.update_many([(first, Trip(_destination="Oslo")), (second, Trip(_num_of_people=7))])
+        assert trip_dao.find_by_id(first)[1] == "Oslo"
+        assert trip_dao.find_by_id(second)[3] == 7
+
+    def test_delete_many(self, trip_dao, valid_trip):
+        ids = [trip_dao.insert(valid_trip) for _ in range(3)]
+        assert trip_dao.delete_many(ids, batch_size=2) == 3
+        assert all(trip_dao.find_by_id(id_) is None for id_ in ids)
+
+    def test_row_hashes_match_row_hash(self, trip_dao, valid_trip):
+        trip_id = trip_dao.insert(valid_trip)
+        stored = Trip(trip_id, valid_trip.destination, valid_trip.price, valid_trip.num_of_people, valid_trip.agency_id)
+        assert trip_dao.row_hashes()[trip_id] == TripDbDao.row_hash(stored)
+
+    def test_changes_since(self, trip_dao, valid_trip):
+        cursor = trip_dao.changes_since().cursor
+        kept, removed = trip_dao.insert(valid_trip), trip_dao.insert(valid_trip)
+        trip_dao.update(kept, Trip(_destination="Rome", _price=None))
+        trip_dao.delete(removed)
+
+        changes = trip_dao.changes_since(cursor)
+        assert [(trip.id, trip.destination) for trip in changes.inserted] == [(kept, "Rome")]
+        assert [tombstone.id for tombstone in changes.deleted] == [removed]
+        assert trip_dao.changes_since(changes.cursor).inserted == []
+
+    def test_changes_since_reports_atomic_reload(self, connection_pool, trip_dao, valid_trip):
+        removed = trip_dao.insert(valid_trip)
+        cursor = trip_dao.changes_since().cursor
+
+        reload_tables_atomically(connection_pool)
+
+        changes = trip_dao.changes_since(cursor)
+        assert changes.reloaded
+        assert len(changes.inserted) + len(changes.updated) == len(trip_dao.find_all())
+        assert removed in [tombstone.id for tombstone in changes.deleted]
+
+    def test_summaries_follow_writes(self, connection_pool, valid_trip):
+        summary_dao = SummaryDao(connection_pool)
+        trip_dao = TripDbDao(connection_pool, summary_dao=summary_dao)
+        summary_dao.refresh()
+        first, second = trip_dao.insert(valid_trip), trip_dao.insert(valid_trip)
+        trip_dao.update(first, Trip(_destination="Oslo"))
+        trip_dao.upsert_many([Trip(_destination="Porto", _price=Decimal("10.00"), _num_of_people=1, _agency_id=2)])
+        trip_dao.delete_many([second])
+
+        def summaries():
+            return (sorted(summary_dao.find_all(), key=lambda stats: stats.id),
+                    sorted(summary_dao.count_trips_per_countries()),
+                    summary_dao.countries_with_max_trips_for_agency())
+
+        incremental = summaries()
+        summary_dao.refresh()
+        assert summaries() == incremental
+        assert incremental[1] == sorted(trip_dao.count_trips_per_countries())
+
+    def test_agency_names_are_joined_from_the_agencies_table(self, connection_pool, trip_dao, valid_trip):
+        assert load_agencies(connection_pool) > 0
+        agency_repo = AgencyDbRepo(connection_pool)
+        trip_dao.insert(valid_trip)
+
+        named = trip_dao.countries_with_max_trips_for_agency_names()
+        expected = [(destination, agency_repo.agency_name_for_id(agency_id), count)
+                    for destination, agency_id, count in trip_dao.countries_with_max_trips_for_agency()]
+        assert named == expected
+
     def test_delete_all(self, trip_dao):
         trip_dao.delete_all()
         results = trip_dao.find_all()
@@ -0,0 +1,119 @@
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock
+from mysql.connector import Error
+from app.persistence.create_db import SyncResult, load_agencies, reload_tables_atomically, sync_trips_from_csv
+from app.persistence.dao import TripDbDao
+from app.persistence.model import Trip
+
+
+@pytest.fixture
+def cursor():
+    cursor = MagicMock()
+    cursor.rowcount = 1
+    cursor.lastrowid = 7
+    return cursor
+
+
+@pytest.fixture
+def fake_pool(cursor):
+    pool = MagicMock()
+    cursor.__enter__.return_value = cursor
+    pool.get_connection.return_value.cursor.return_value = cursor
+    pool.get_connection.return_value.__enter__.return_value.cursor.return_value = cursor
+    return pool
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / "trips.csv"
+    path.write_text("id,destination,price,num_of_people,agency_id\n"
+                    "1,Spain,1000,2,1\n"
+                    "2,Italy,500.5,3,2\n"
+                    "3,Malta,10.005,1,1\n"
+                    ",Nowhere,1,1,1\n", encoding="utf-8")
+    return str(path)
+
+
+def executed(cursor):
+    return [call.args[0] for call in cursor.execute.call_args_list]
+
+
+def test_row_hash_matches_database_formatting():
+    trip = Trip(1, "Spain", Decimal("1000.00"), None, 1)
+    assert TripDbDao.row_hash(trip) == TripDbDao.row_hash(Trip(2, "Spain", Decimal("1000.00"), None, 1))
+    assert TripDbDao.row_hash(trip) != TripDbDao.row_hash(Trip(1, "Spain", Decimal("1000.01"), None, 1))
+
+
+def test_sync_applies_only_differences(fake_pool, cursor, csv_path, caplog):
+    unchanged = TripDbDao.row_hash(Trip(1, "Spain", Decimal("1000.00"), 2, 1))
+    cursor.fetchall.return_value = [(1, unchanged), (2, "stale"), (9, "gone")]
+
+    result = sync_trips_from_csv(fake_pool, csv_path)
+
+    assert result == SyncResult(inserted=1, updated=1, deleted=1, unchanged=1)
+    statements = executed(cursor)
+    upsert = next(call for call in cursor.execute.call_args_list if call.args[0].startswith("INSERT INTO trips ("))
+    assert upsert.args[1] == [2, "Italy", Decimal("500.50"), 3, 2, 7, 7, 3, "Malta", Decimal("10.01"), 1, 1, 7, 7]
+    assert any(sql.startswith("DELETE FROM trips WHERE id IN (%s)") for sql in statements)
+    fake_pool.get_connection.return_value.commit.assert_called_once()
+    assert "Missing id" in caplog.text
+
+
+def test_sync_without_changes_writes_nothing(fake_pool, cursor, tmp_path):
+    path = tmp_path / "trips.csv"
+    path.write_text("id,destination,price,num_of_people,agency_id\n1,Spain,1000,2,1\n", encoding="utf-8")
+    cursor.fetchall.return_value = [(1, TripDbDao.row_hash(Trip(1, "Spain", Decimal("1000.00"), 2, 1)))]
+    cursor.fetchone.return_value = (3,)  # summary tables exist
+
+    assert sync_trips_from_csv(fake_pool, str(path)) == SyncResult(unchanged=1)
+    assert not any(sql.startswith(("INSERT", "DELETE")) for sql in executed(cursor))
+
+
+def test_sync_database_error(csv_path, caplog):
+    fake_pool = MagicMock()
+    fake_pool.get_connection.side_effect = Error("Mocked sync error")
+
+    assert sync_trips_from_csv(fake_pool, csv_path) is None
+    assert "Database error during CSV sync: Mocked sync error" in caplog.text
+
+
+def test_reload_swaps_staging_table(fake_pool, cursor, csv_path):
+    reload_tables_atomically(fake_pool, csv_path)
+
+    statements = [" ".join(sql.split()) for sql in executed(cursor)]
+    loads = [sql for sql in statements if sql.startswith("INSERT INTO trips")]
+    assert len(loads) == 4 and all(sql.startswith("INSERT INTO trips_staging") for sql in loads)
+    rename = statements.index("RENAME TABLE trips TO trips_old, trips_staging TO trips")
+    stamp = next(i for i, sql in enumerate(statements) if sql.startswith("UPDATE trips_staging AS loaded"))
+    tombstones = next(i for i, sql in enumerate(statements) if sql.startswith("REPLACE INTO trips_tombstones"))
+    assert statements.index(loads[-1]) < stamp < tombstones < rename
+    assert statements[rename + 1] == "DROP TABLE trips_old"
+    assert any(sql.startswith("INSERT INTO agency_stats") for sql in statements[rename:])
+
+
+def test_sync_refreshes_missing_summary_tables(fake_pool, cursor, csv_path):
+    cursor.fetchall.return_value = []
+    cursor.fetchone.return_value = (0,)
+
+    sync_trips_from_csv(fake_pool, csv_path)
+
+    statements = executed(cursor)
+    upsert = next(i for i, sql in enumerate(statements) if sql.startswith("INSERT INTO trips ("))
+    assert not any("FOR UPDATE" in sql for sql in statements)
+    assert [sql.split()[2] for sql in statements[upsert:] if sql.startswith("INSERT INTO")][1:] == \
+           ["agency_stats", "destination_stats", "destination_agency_stats"]
+
+
+def test_load_agencies_replaces_table_contents(fake_pool, cursor, tmp_path, caplog):
+    path = tmp_path / "agencies.txt"
+    path.write_text("1, TravelCo, Warszawa\nbroken\n2, Holiday Tours, Kraków\n", encoding="utf-8")
+
+    assert load_agencies(fake_pool, str(path)) == 2
+
+    statements = [" ".join(sql.split()) for sql in executed(cursor)]
+    assert statements[0].startswith("CREATE TABLE IF NOT EXISTS agencies")
+    assert "DELETE FROM agencies" in statements
+    upsert = next(call for call in cursor.execute.call_args_list if call.args[0].startswith("INSERT INTO agencies"))
+    assert upsert.args[1] == [1, " TravelCo", " Warszawa", 2, " Holiday Tours", " Kraków"]
+    assert "Invalid agency lines skipped: 1" in caplog.text
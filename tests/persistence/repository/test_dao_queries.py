@@ -0,0 +1,420 @@
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock
+from app.model.agency import Agency
+from app.persistence.dao import AgencyDbRepo, SummaryDao, TripDbDao
+from app.persistence.unit_of_work import UnitOfWork
+from app.persistence.model import AgencyRecord, Trip, TripTombstone
+
+
+@pytest.fixture
+def cursor():
+    return MagicMock()
+
+
+@pytest.fixture
+def fake_pool(cursor):
+    pool = MagicMock()
+    conn = pool.get_connection.return_value.__enter__.return_value
+    conn.cursor.return_value = cursor
+    pool.get_connection.return_value.cursor.return_value = cursor  # connection bound by a UnitOfWork
+    return pool
+
+
+@pytest.fixture
+def trip_dao(fake_pool):
+    return TripDbDao(fake_pool)
+
+
+def test_find_all_valid_by_destinations_chunks_in_clause(trip_dao, cursor):
+    cursor.fetchall.side_effect = [
+        [(3, "Spain", Decimal("900.00"), 1, 2)],
+        [(1, "Italy", Decimal("1000.00"), 2, 1), (2, "Malta", Decimal("-1.00"), 2, 1)],
+    ]
+    result = trip_dao.find_all_valid_by_destinations(["Spain", "Italy", "Malta", "Italy"], chunk_size=2)
+
+    assert cursor.execute.call_count == 2
+    first_sql, first_params = cursor.execute.call_args_list[0].args
+    assert "WHERE destination IN (%s, %s)" in first_sql
+    assert first_params == ["Italy", "Malta"]
+    assert [trip.id for trip in result] == [1, 3]
+
+
+def test_find_all_valid_by_destinations_empty_list(trip_dao, cursor):
+    assert trip_dao.find_all_valid_by_destinations([]) == []
+    cursor.execute.assert_not_called()
+
+
+def test_upsert_many_batches_in_one_transaction(trip_dao, cursor, fake_pool):
+    cursor.rowcount = 2
+    cursor.lastrowid = 7
+    cursor.fetchone.return_value = (0,)  # unpartitioned table
+    trips = [Trip(_id=i, _destination="Spain", _price=Decimal("10"), _num_of_people=1, _agency_id=1) for i in range(5)]
+
+    affected = trip_dao.upsert_many(trips, batch_size=2)
+
+    assert affected == 6  # 3 upserts, each reporting the mocked rowcount
+    assert cursor.execute.call_count == 5
+    assert cursor.execute.call_args_list[0].args[0].startswith("INSERT INTO change_versions")
+    assert cursor.execute.call_args_list[1].args[0].startswith("SELECT COUNT(*) FROM information_schema.PARTITIONS")
+    assert not any(call.args[0].startswith("DELETE") for call in cursor.execute.call_args_list)
+    sql, params = cursor.execute.call_args_list[2].args
+    assert sql.startswith("INSERT INTO trips (id, destination, price, num_of_people, agency_id, row_version, created_version) "
+                          "VALUES (%s, %s, %s, %s, %s, %s, %s), (")
+    assert sql.endswith("AS new ON DUPLICATE KEY UPDATE row_version=IF(destination <=> new.destination AND "
+                        "price <=> new.price AND num_of_people <=> new.num_of_people AND agency_id <=> new.agency_id, "
+                        "row_version, new.row_version), destination=new.destination, price=new.price, "
+                        "num_of_people=new.num_of_people, agency_id=new.agency_id")
+    assert params == [0, "Spain", Decimal("10"), 1, 1, 7, 7, 1, "Spain", Decimal("10"), 1, 1, 7, 7]
+    fake_pool.get_connection.return_value.commit.assert_called_once()
+
+
+def test_update_many_uses_case_and_skips_none(trip_dao, cursor):
+    cursor.rowcount = 2
+    cursor.lastrowid = 7
+    pairs = [(1, Trip(_destination="Spain", _price=None)), (2, Trip(_destination="Italy", _price=Decimal("5")))]
+
+    assert trip_dao.update_many(pairs) == 2
+
+    sql, params = cursor.execute.call_args.args
+    assert sql == ("UPDATE trips SET destination=CASE id WHEN %s THEN %s WHEN %s THEN %s ELSE destination END, "
+                   "price=CASE id WHEN %s THEN %s ELSE price END, row_version=%s WHERE id IN (%s, %s)")
+    assert params == [1, "Spain", 2, "Italy", 2, Decimal("5"), 7, 1, 2]
+
+
+def test_update_many_rolls_back_on_error(trip_dao, cursor, fake_pool):
+    cursor.execute.side_effect = RuntimeError("boom")
+    with pytest.raises(RuntimeError):
+        trip_dao.update_many([(1, Trip(_destination="Spain"))])
+    conn = fake_pool.get_connection.return_value
+    conn.rollback.assert_called_once()
+    conn.commit.assert_not_called()
+
+
+def test_upsert_many_with_no_items_does_nothing(trip_dao, fake_pool):
+    assert trip_dao.upsert_many([]) == 0
+    assert trip_dao.update_many(iter([])) == 0
+    assert trip_dao.delete_many([]) == 0
+    fake_pool.get_connection.assert_not_called()
+
+
+def test_delete_many_records_tombstones_before_deleting(trip_dao, cursor, fake_pool):
+    cursor.rowcount = 2
+    cursor.lastrowid = 3
+
+    assert trip_dao.delete_many([4, 5, 6], batch_size=2) == 4
+
+    statements = [call.args for call in cursor.execute.call_args_list]
+    assert statements[1] == ("REPLACE INTO trips_tombstones (id, row_version, destination, agency_id) "
+                             "SELECT id, %s, destination, agency_id FROM trips WHERE id IN (%s, %s)", [3, 4, 5])
+    assert statements[2] == ("DELETE FROM trips WHERE id IN (%s, %s)", [4, 5])
+    assert statements[4] == ("DELETE FROM trips WHERE id IN (%s)", [6])
+    fake_pool.get_connection.return_value.commit.assert_called_once()
+
+
+def test_insert_stamps_row_version(trip_dao, cursor):
+    cursor.rowcount = 1
+    cursor.lastrowid = 9
+
+    trip_dao.insert(Trip(_destination="Spain", _price=Decimal("10"), _num_of_people=1, _agency_id=1))
+
+    assert cursor.execute.call_args.args[0] == ("INSERT INTO trips (destination, price, num_of_people, agency_id, "
+                                                "row_version, created_version) VALUES ('Spain', 10, 1, 1, 9, 9)")
+
+
+def test_changes_since_splits_inserts_updates_and_deletes(trip_dao, cursor):
+    cursor.fetchall.side_effect = [
+        [(1, "Spain", Decimal("10.00"), 1, 1, 6, 2), (2, "Italy", Decimal("20.00"), 2, 1, 8, 8),
+         (3, "Malta", Decimal("30.00"), 1, 2, 9, 9)],
+        [(3, "Malta", 2, 7, None), (4, "Peru", 3, 10, None)],
+    ]
+    cursor.fetchone.return_value = (3,)
+
+    changes = trip_dao.changes_since(5)
+
+    assert [trip.id for trip in changes.inserted] == [2, 3]
+    assert [trip.id for trip in changes.updated] == [1]
+    assert changes.deleted == [TripTombstone(4, "Peru", 3, 10)]
+    assert changes.cursor == 10
+    assert not changes.reloaded
+    assert [call.args[1] for call in cursor.execute.call_args_list] == [[5], [5], ["trips:reload"]]
+
+
+def test_changes_since_reports_a_later_bulk_load(trip_dao, cursor):
+    cursor.fetchall.side_effect = [[(1, "Spain", Decimal("10.00"), 1, 1, 6, 6)], []]
+    cursor.fetchone.return_value = (6,)
+
+    changes = trip_dao.changes_since(5)
+
+    assert changes.reloaded
+    assert [trip.id for trip in changes.inserted] == [1]
+
+
+def test_record_bulk_load_stamps_staging_rows_and_tombstones_missing_trips(trip_dao, cursor):
+    cursor.rowcount = 3
+    cursor.lastrowid = 12
+
+    assert trip_dao.record_bulk_load("trips_staging") == 12
+
+    statements = [(" ".join(call.args[0].split()), call.args[1]) for call in cursor.execute.call_args_list]
+    assert statements[1] == ("REPLACE INTO change_versions (table_name, version) VALUES (%s, %s)", ["trips:reload", 12])
+    assert statements[2] == ("UPDATE trips_staging AS loaded LEFT JOIN trips AS current ON current.id = loaded.id "
+                             "SET loaded.row_version=%s, loaded.created_version=COALESCE(current.created_version, %s)",
+                             [12, 12])
+    assert statements[3] == ("REPLACE INTO trips_tombstones (id, row_version, destination, agency_id) "
+                             "SELECT id, %s, destination, agency_id FROM trips WHERE id NOT IN (SELECT id FROM trips_staging)",
+                             [12])
+
+
+def test_record_bulk_load_stamps_unversioned_rows(trip_dao, cursor):
+    cursor.rowcount = 3
+    cursor.lastrowid = 4
+
+    trip_dao.record_bulk_load()
+
+    assert cursor.execute.call_args_list[-1].args == (
+        "UPDATE trips SET row_version=%s, created_version=%s WHERE row_version=0", [4, 4])
+
+
+def test_upsert_many_deletes_moved_rows_of_partitioned_table_with_tombstones(trip_dao, cursor):
+    cursor.rowcount = 2
+    cursor.lastrowid = 7
+    cursor.fetchone.return_value = (4,)
+    trips = [Trip(_id=i, _destination="Spain", _price=Decimal("10"), _num_of_people=1, _agency_id=1) for i in range(3)]
+
+    affected = trip_dao.upsert_many(trips, batch_size=2)
+
+    assert affected == 4  # moved-row deletes are not counted
+    statements = [call.args for call in cursor.execute.call_args_list]
+    condition = "id IN (%s, %s) AND (id, agency_id) NOT IN ((%s, %s), (%s, %s))"
+    assert statements[2] == ("REPLACE INTO trips_tombstones (id, row_version, destination, agency_id) "
+                             f"SELECT id, %s, destination, agency_id FROM trips WHERE {condition}", [7, 0, 1, 0, 1, 1, 1])
+    assert statements[3] == (f"DELETE FROM trips WHERE {condition}", [0, 1, 0, 1, 1, 1])
+    assert statements[4][0].startswith("INSERT INTO trips (")
+    assert [sql.split()[0] for sql, _ in statements[5:]] == ["REPLACE", "DELETE", "INSERT"]
+
+
+def test_upsert_many_skips_moved_row_delete_without_ids(trip_dao, cursor):
+    cursor.rowcount = 1
+    cursor.lastrowid = 7
+    cursor.fetchone.return_value = (4,)
+
+    trip_dao.upsert_many([Trip(_destination="Spain", _price=Decimal("10"), _num_of_people=1, _agency_id=1)])
+
+    assert not any(call.args[0].startswith("DELETE") for call in cursor.execute.call_args_list)
+
+
+@pytest.mark.parametrize("agency_ids, where, agency_where, params", [
+    (None, "FROM trips \n", "FROM trips WHERE agency_id IS NOT NULL\n", None),
+    ([3, 1, 3], "FROM trips WHERE agency_id IN (%s, %s)", "FROM trips WHERE agency_id IN (%s, %s)", [1, 3]),
+    ([], "FROM trips WHERE FALSE", "FROM trips WHERE FALSE", None),
+])
+def test_group_by_reports_filter_by_agency(trip_dao, cursor, agency_ids, where, agency_where, params):
+    cursor.rowcount = 0
+    cursor.fetchall.return_value = []
+
+    trip_dao.count_trips_per_countries(agency_ids)
+    trip_dao.countries_with_max_trips_for_agency(agency_ids)
+    trip_dao.countries_with_max_trips_for_agency_names(agency_ids)
+
+    for call, expected in zip(cursor.execute.call_args_list, (where, agency_where, agency_where)):
+        sql, *sql_params = call.args
+        assert expected in sql
+        assert (sql_params or [None])[0] == params
+
+
+def test_summary_apply_changes_adds_deltas(fake_pool, cursor):
+    cursor.rowcount = 1
+
+    SummaryDao(fake_pool).apply_changes(
+        [Trip(1, "Spain", Decimal("10.00"), 1, 1), Trip(3, "Peru", Decimal("5.00"), 1, 2)],
+        [Trip(1, "Italy", Decimal("12.50"), 1, 1), Trip(2, "Spain", Decimal("-1.00"), 1, 2),
+         Trip(3, "Peru", Decimal("5.00"), 1, 2), Trip(4, "Spain", Decimal("8.00"), 1, None)])
+
+    statements = {call.args[0].split()[2]: call.args for call in cursor.execute.call_args_list}
+    assert statements["agency_stats"] == (
+        "INSERT INTO agency_stats (id, trip_count, price_sum) VALUES (%s, %s, %s) AS new "
+        "ON DUPLICATE KEY UPDATE trip_count=trip_count+new.trip_count, price_sum=price_sum+new.price_sum",
+        [1, 0, Decimal("2.50")])
+    assert statements["destination_stats"][1] == ["Italy", 1, "Spain", 1]
+    assert statements["destination_agency_stats"][1] == ["Italy", 1, 1, "Spain", 1, -1, "Spain", 2, 1]
+    fake_pool.get_connection.return_value.commit.assert_called_once()
+
+
+def test_observed_update_reports_old_and_new_rows(fake_pool, cursor):
+    summary_dao = MagicMock()
+    cursor.rowcount = 1
+    cursor.rowcount = 3
+    cursor.lastrowid = 4
+    cursor.fetchall.side_effect = [[(1, "Spain", Decimal("10.00"), 1, 1)], [(1, "Italy", Decimal("10.00"), 1, 1)]]
+
+    TripDbDao(fake_pool, summary_dao=summary_dao).update(1, Trip(_destination="Italy"))
+
+    locking_read = cursor.execute.call_args_list[1].args
+    assert locking_read == ("SELECT id, destination, price, num_of_people, agency_id FROM trips "
+                            "WHERE id IN (%s) FOR UPDATE", [1])
+    summary_dao.apply_changes.assert_called_once_with([Trip(1, "Spain", Decimal("10.00"), 1, 1)],
+                                                      [Trip(1, "Italy", Decimal("10.00"), 1, 1)])
+    fake_pool.get_connection.return_value.commit.assert_called_once()
+
+
+def test_observed_delete_all_clears_summaries(fake_pool, cursor):
+    summary_dao = MagicMock()
+    cursor.rowcount = 3
+    cursor.lastrowid = 5
+
+    TripDbDao(fake_pool, summary_dao=summary_dao).delete_all()
+
+    summary_dao.clear.assert_called_once()
+    summary_dao.apply_changes.assert_not_called()
+
+
+def test_writes_skip_missing_summary_tables(fake_pool, cursor):
+    summary_dao = MagicMock()
+    summary_dao.is_available.return_value = False
+    cursor.rowcount = 1
+    cursor.lastrowid = 4
+
+    TripDbDao(fake_pool, summary_dao=summary_dao).update(1, Trip(_destination="Italy"))
+
+    assert not any("FOR UPDATE" in call.args[0] for call in cursor.execute.call_args_list)
+    summary_dao.apply_changes.assert_not_called()
+
+
+def test_available_summary_tables_are_checked_once(fake_pool, cursor):
+    summary_dao = MagicMock()
+    summary_dao.is_available.return_value = True
+    cursor.rowcount = 1
+    cursor.lastrowid = 4
+    cursor.fetchall.return_value = []
+    dao = TripDbDao(fake_pool, summary_dao=summary_dao)
+
+    dao.delete(1)
+    dao.delete(2)
+
+    summary_dao.is_available.assert_called_once()
+
+
+def test_agency_db_repo_caches_lookups(fake_pool, cursor):
+    cursor.rowcount = 1
+    cursor.fetchone.side_effect = [(1, "TravelCo", "Warszawa"), None]
+    repo = AgencyDbRepo(fake_pool)
+
+    assert repo.get_by_id(1) == Agency(1, "TravelCo", "Warszawa")
+    assert repo.agency_name_for_id(1) == "TravelCo"
+    assert repo.agency_name_for_id(2) == "Unknown agency"
+    assert repo.get_by_id(2) is None
+
+    assert [call.args for call in cursor.execute.call_args_list] == [
+        ("SELECT id, name, localization FROM agencies WHERE id=%s", [1]),
+        ("SELECT id, name, localization FROM agencies WHERE id=%s", [2]),
+    ]
+
+
+def test_agency_db_repo_replace_all_clears_cache(fake_pool, cursor):
+    cursor.rowcount = 1
+    cursor.fetchone.side_effect = [None, (1, "TravelCo", "Warszawa")]
+    repo = AgencyDbRepo(fake_pool)
+    assert repo.get_by_id(1) is None
+
+    assert repo.replace_all([Agency(1, "TravelCo", "Warszawa")]) == 1
+
+    statements = [call.args[0] for call in cursor.execute.call_args_list]
+    assert statements[1] == "DELETE FROM agencies"
+    assert statements[2].startswith("INSERT INTO agencies (id, name, localization) VALUES (%s, %s, %s) AS new")
+    assert repo.get_by_id(1) == Agency(1, "TravelCo", "Warszawa")
+    fake_pool.get_connection.return_value.commit.assert_called_once()
+
+
+@pytest.mark.parametrize("write", [
+    lambda repo: repo.insert(AgencyRecord(_name="TravelCo", _localization="Gdańsk")),
+    lambda repo: repo.update(1, AgencyRecord(_name="TravelCo", _localization="Gdańsk")),
+    lambda repo: repo.upsert_many([AgencyRecord(1, "TravelCo", "Gdańsk")]),
+    lambda repo: repo.delete(1),
+    lambda repo: repo.delete_all(),
+])
+def test_agency_db_repo_writes_clear_cache(fake_pool, cursor, write):
+    cursor.rowcount = 1
+    cursor.fetchone.side_effect = [(1, "TravelCo", "Warszawa"), (1, "TravelCo", "Gdańsk")]
+    repo = AgencyDbRepo(fake_pool)
+    assert repo.get_by_id(1) == Agency(1, "TravelCo", "Warszawa")
+
+    write(repo)
+
+    assert repo.get_by_id(1) == Agency(1, "TravelCo", "Gdańsk")
+
+
+def test_agency_db_repo_does_not_cache_rows_of_a_rolled_back_unit_of_work(fake_pool, cursor):
+    cursor.rowcount = 1
+    cursor.fetchone.side_effect = [(1, "TravelCo", "Gdańsk"), (1, "TravelCo", "Warszawa")]
+    repo = AgencyDbRepo(fake_pool)
+
+    with pytest.raises(RuntimeError):
+        with UnitOfWork(fake_pool):
+            with UnitOfWork(fake_pool):
+                repo.update(1, AgencyRecord(_name="TravelCo", _localization="Gdańsk"))
+            assert repo.get_by_id(1) == Agency(1, "TravelCo", "Gdańsk")
+            raise RuntimeError("rolled back")
+
+    fake_pool.get_connection.return_value.rollback.assert_called_once()
+    assert repo.get_by_id(1) == Agency(1, "TravelCo", "Warszawa")
+
+
+def test_agency_db_repo_cache_is_cleared_when_the_outer_unit_of_work_commits(fake_pool, cursor):
+    import threading
+    cursor.rowcount = 1
+    cursor.fetchone.side_effect = [(1, "TravelCo", "Warszawa"), (1, "TravelCo", "Gdańsk")]
+    repo = AgencyDbRepo(fake_pool)
+
+    with UnitOfWork(fake_pool):
+        with UnitOfWork(fake_pool):
+            repo.update(1, AgencyRecord(_name="TravelCo", _localization="Gdańsk"))
+        # Another thread caches the committed row before the update commits.
+        reader = threading.Thread(target=repo.get_by_id, args=(1,))
+        reader.start()
+        reader.join()
+
+    fake_pool.get_connection.return_value.commit.assert_called_once()
+    assert repo.get_by_id(1) == Agency(1, "TravelCo", "Gdańsk")
+
+
+def test_agency_db_repo_lookup_racing_a_write_is_not_kept(fake_pool, cursor):
+    cursor.rowcount = 1
+    repo = AgencyDbRepo(fake_pool)
+    rows = iter([(1, "TravelCo", "Warszawa"), (1, "TravelCo", "Gdańsk")])
+
+    def fetchone():
+        row = next(rows)
+        if row[2] == "Warszawa":
+            repo.clear_cache()  # a write commits after the old row was read
+        return row
+    cursor.fetchone.side_effect = fetchone
+
+    assert repo.get_by_id(1) == Agency(1, "TravelCo", "Warszawa")
+    assert repo.get_by_id(1) == Agency(1, "TravelCo", "Gdańsk")
+
+
+def test_max_trips_report_joins_agency_names(trip_dao, cursor):
+    cursor.rowcount = 0
+    cursor.fetchall.return_value = [("Spain", "TravelCo", 4)]
+
+    assert trip_dao.countries_with_max_trips_for_agency_names() == [("Spain", "TravelCo", 4)]
+    assert "LEFT JOIN agencies a ON a.id = t.agency_id" in cursor.execute.call_args.args[0]
+
+
+def test_find_all_valid_by_agency_range(trip_dao, cursor):
+    cursor.fetchall.return_value = [(1, "Italy", Decimal("1000.00"), 2, 3), (2, "Malta", Decimal("-1.00"), 2, 4)]
+
+    assert [trip.id for trip in trip_dao.find_all_valid_by_agency_range(3, 5)] == [1]
+    assert cursor.execute.call_args.args == (
+        "SELECT id, destination, price, num_of_people, agency_id FROM trips WHERE agency_id BETWEEN %s AND %s ORDER BY id", [3, 5])
+
+    trip_dao.find_all_valid_by_agency_range(None, None)
+    assert "WHERE agency_id IS NULL" in cursor.execute.call_args.args[0]
+
+
+def test_data_version_is_the_table_checksum(trip_dao, cursor):
+    cursor.fetchone.return_value = ("db_1.trips", 123456)
+
+    assert trip_dao.data_version() == 123456
+    assert cursor.execute.call_args.args == ("CHECKSUM TABLE trips",)
@@ -1,7 +1,8 @@
 import pytest
 import os
 import tempfile
-from app.persistence.create_db import _validate_row, create_tables, drop_tables
+from app.persistence.create_db import create_tables, drop_tables
+from app.persistence.csv_rows import validate_row
 from app.persistence.connection import MySQLConnectionPoolBuilder
 from mysql.connector.errors import InterfaceError
 from unittest.mock import MagicMock, patch
@@ -9,14 +10,14 @@ from mysql.connector import Error
 
 def test_validate_row_invalid_column_count(caplog):
     row = ["1", "Madrid", "1000"]
-    result = _validate_row(row, row_number=1)
+    result = validate_row(row, row_number=1)
     assert result is None
     assert "Invalid number of columns" in caplog.text
 
 
 def test_validate_row_invalid_data_type(caplog):
     row = ["abc", "Madrid", "xyz", "five", "NaN"]
-    result = _validate_row(row, row_number=2)
+    result = validate_row(row, row_number=2)
     assert result is None
     assert "Data type error" in caplog.text
 
@@ -0,0 +1,69 @@
+import pytest
+from unittest.mock import MagicMock
+from app.persistence.create_db import Partitioning, _create_trips_table
+
+
+def create_table_sql(partitioning):
+    cursor = MagicMock()
+    _create_trips_table(cursor, partitioning=partitioning)
+    return " ".join(cursor.execute.call_args_list[0].args[0].split())
+
+
+def test_hash_partitioning_clause():
+    assert Partitioning('hash', 8).clause() == "PARTITION BY HASH(agency_id) PARTITIONS 8"
+
+
+def test_range_partitioning_clause():
+    assert Partitioning('range', boundaries=(10, 100)).clause() == (
+        "PARTITION BY RANGE (agency_id) (PARTITION p0 VALUES LESS THAN (10), "
+        "PARTITION p1 VALUES LESS THAN (100), PARTITION pmax VALUES LESS THAN MAXVALUE)")
+
+
+@pytest.mark.parametrize("kwargs", [
+    {"method": "list"},
+    {"method": "hash", "partitions": 0},
+    {"method": "range"},
+    {"method": "range", "boundaries": (100, 10)},
+])
+def test_invalid_partitioning(kwargs):
+    with pytest.raises(ValueError):
+        Partitioning(**kwargs)
+
+
+def test_partitioned_table_keys_on_id_and_agency():
+    sql = create_table_sql(Partitioning('hash', 4))
+    assert "agency_id INTEGER NOT NULL" in sql
+    assert "PRIMARY KEY (id, agency_id)" in sql
+    assert sql.endswith(") PARTITION BY HASH(agency_id) PARTITIONS 4")
+
+
+def test_unpartitioned_table_keys_on_id():
+    sql = create_table_sql(None)
+    assert "PRIMARY KEY (id)," in sql
+    assert "PARTITION" not in sql
+
+
+@pytest.mark.integration
+def test_partitioned_table_filters_and_keeps_ids_unique(tmp_path):
+    from decimal import Decimal
+    from app.persistence.connection import MySQLConnectionPoolBuilder
+    from app.persistence.create_db import create_tables, drop_tables
+    from app.persistence.dao import TripDbDao
+    from app.persistence.model import Trip
+
+    csv_path = tmp_path / "trips.csv"
+    csv_path.write_text("id,destination,price,num_of_people,agency_id\n"
+                        "1,Spain,100,2,1\n2,Spain,200,2,2\n3,Italy,300,1,2\n", encoding="utf-8")
+    pool = MySQLConnectionPoolBuilder.builder().port(3308).build()
+    drop_tables(pool)
+    create_tables(pool, str(csv_path), Partitioning('hash', 4))
+    try:
+        dao = TripDbDao(pool)
+        assert dao.count_trips_per_countries([2]) == [("Spain", 1), ("Italy", 1)] or \
+               dao.count_trips_per_countries([2]) == [("Italy", 1), ("Spain", 1)]
+        assert dao.countries_with_max_trips_for_agency([1]) == [("Spain", 1, 1)]
+
+        dao.upsert_many([Trip(1, "Spain", Decimal("100.00"), 2, 3)])
+        assert [(trip.id, trip.agency_id) for trip in dao.find_all() if trip.id == 1] == [(1, 3)]
+    finally:
+        drop_tables(pool)
@@ -0,0 +1,132 @@
+import pytest
+from decimal import Decimal
+from unittest.mock import MagicMock
+from app.persistence.dao import TripDbDao
+from app.persistence.model import Trip
+from app.persistence.unit_of_work import UnitOfWork, current_unit_of_work
+
+
+@pytest.fixture
+def cursor():
+    cursor = MagicMock()
+    cursor.rowcount = 1
+    cursor.lastrowid = 1
+    return cursor
+
+
+@pytest.fixture
+def fake_pool(cursor):
+    pool = MagicMock()
+    pool.get_connection.return_value.cursor.return_value = cursor
+    pool.get_connection.return_value.__enter__.return_value.cursor.return_value = cursor
+    return pool
+
+
+@pytest.fixture
+def connection(fake_pool):
+    return fake_pool.get_connection.return_value
+
+
+@pytest.fixture
+def trip_dao(fake_pool):
+    return TripDbDao(fake_pool)
+
+
+def executed(cursor):
+    return [call.args[0] for call in cursor.execute.call_args_list]
+
+
+def test_dao_calls_share_one_connection_and_commit(trip_dao, fake_pool, connection, cursor):
+    trip = Trip(1, "Italy", Decimal("1000.00"), 2, 1)
+    with UnitOfWork(fake_pool):
+        trip_dao.insert(trip)
+        trip_dao.update(1, trip)
+        trip_dao.delete(2)
+        connection.commit.assert_not_called()
+
+    fake_pool.get_connection.assert_called_once()
+    connection.commit.assert_called_once()
+    connection.close.assert_called_once()
+    assert [sql.split()[0] for sql in executed(cursor) if "change_versions" not in sql] == \
+           ["SAVEPOINT", "INSERT", "RELEASE", "SAVEPOINT", "UPDATE", "RELEASE", "SAVEPOINT", "REPLACE", "DELETE", "RELEASE"]
+
+
+def test_exception_rolls_back_and_propagates(trip_dao, fake_pool, connection):
+    with pytest.raises(ValueError):
+        with UnitOfWork(fake_pool):
+            trip_dao.delete(1)
+            raise ValueError("boom")
+
+    connection.commit.assert_not_called()
+    connection.rollback.assert_called_once()
+    connection.close.assert_called_once()
+
+
+def test_batched_writes_defer_commit(trip_dao, fake_pool, connection):
+    with UnitOfWork(fake_pool):
+        trip_dao.upsert_many([Trip(1, "Italy", Decimal("1000.00"), 2, 1)])
+        trip_dao.update_many([(1, Trip(None, "Spain", None, None, None))])
+        connection.commit.assert_not_called()
+    connection.commit.assert_called_once()
+
+
+def test_nested_units_use_savepoints(fake_pool, connection, cursor):
+    with UnitOfWork(fake_pool) as outer:
+        with UnitOfWork(fake_pool) as inner:
+            assert inner.connection is outer.connection
+            assert current_unit_of_work(fake_pool) is inner
+        with pytest.raises(ValueError):
+            with outer.savepoint():
+                raise ValueError("undo")
+        assert current_unit_of_work(fake_pool) is outer
+
+    assert executed(cursor) == ["SAVEPOINT uow_savepoint_1", "RELEASE SAVEPOINT uow_savepoint_1",
+                                "SAVEPOINT uow_savepoint_2", "ROLLBACK TO SAVEPOINT uow_savepoint_2"]
+    fake_pool.get_connection.assert_called_once()
+    connection.commit.assert_called_once()
+
+
+def test_savepoint_requires_innermost_unit(fake_pool):
+    outer = UnitOfWork(fake_pool)
+    with pytest.raises(RuntimeError):
+        with outer.savepoint():
+            pass
+
+
+def test_unit_of_work_is_bound_to_its_pool(fake_pool, connection):
+    with UnitOfWork(MagicMock()):
+        assert current_unit_of_work(fake_pool) is None
+        TripDbDao(fake_pool).find_all()
+    fake_pool.get_connection.return_value.__enter__.assert_called_once()
+
+
+def test_calls_outside_unit_of_work_commit_each(trip_dao, fake_pool, connection):
+    trip_dao.delete(1)
+    trip_dao.delete(2)
+    assert fake_pool.get_connection.call_count == 2
+    assert connection.commit.call_count == 2
+
+
+def test_completion_callbacks_run_after_the_outermost_transaction(fake_pool, connection):
+    events = []
+    connection.commit.side_effect = lambda: events.append("commit")
+    callback = lambda: events.append("callback")
+
+    with UnitOfWork(fake_pool):
+        with UnitOfWork(fake_pool) as inner:
+            inner.after_completion(callback)
+            inner.after_completion(callback)
+        assert events == []
+
+    assert events == ["commit", "callback"]
+
+
+def test_completion_callbacks_run_after_rollback(fake_pool, connection):
+    callback = MagicMock()
+    with pytest.raises(ValueError):
+        with UnitOfWork(fake_pool) as unit_of_work:
+            unit_of_work.after_completion(callback)
+            raise ValueError("boom")
+
+    connection.rollback.assert_called_once()
+    callback.assert_called_once_with()
@@ -35,6 +35,8 @@ def mocked_trip_dao(sample_trips):
     mock = MagicMock()
     mock.find_all_valid.return_value = sample_trips
     mock.find_all.return_value = sample_trips
+    mock.find_all_valid_by_destinations.side_effect = \
+        lambda destinations: [trip for trip in sample_trips if trip.destination in destinations]
     mock.count_trips_per_countries.return_value = [("Spain", 2), ("Italy", 1)]
     mock.countries_with_max_trips_for_agency.return_value = [("Spain", 1), ("Italy", 2)]
     return mock
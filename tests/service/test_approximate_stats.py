@@ -0,0 +1,85 @@
+import pytest
+import random
+from decimal import Decimal
+from app.service.approximate_stats import HyperLogLog, KllSketch, SpaceSaving, ApproximateTripStats
+
+
+def test_hyperloglog_estimates_distinct_count_within_error():
+    hll = HyperLogLog(precision=12)
+    for i in range(20000):
+        hll.add(f"country-{i % 5000}")
+    assert abs(hll.count() - 5000) / 5000 < 0.05
+
+
+def test_hyperloglog_small_cardinality_is_exact_enough():
+    hll = HyperLogLog()
+    for name in ["Spain", "Italy", "Spain", "France"]:
+        hll.add(name)
+    assert hll.count() == 3
+
+
+def test_hyperloglog_rejects_invalid_precision():
+    with pytest.raises(ValueError):
+        HyperLogLog(precision=2)
+
+
+def test_kll_quantiles_within_rank_error():
+    sketch = KllSketch(k=200)
+    values = list(range(100000))
+    for value in reversed(values):
+        sketch.add(value)
+    for q in (0.1, 0.5, 0.9):
+        assert abs(sketch.quantile(q) - q * len(values)) / len(values) < 0.03
+    assert sketch.count == len(values)
+
+
+def test_kll_empty_and_invalid_quantile():
+    sketch = KllSketch()
+    assert sketch.quantile(0.5) is None
+    with pytest.raises(ValueError):
+        sketch.quantile(1.5)
+
+
+def test_space_saving_finds_heavy_hitters():
+    counter = SpaceSaving(capacity=10)
+    for i in range(1000):
+        counter.add("Spain" if i % 2 == 0 else f"rare-{i}")
+    top_value, top_count = counter.most_common(1)[0]
+    assert top_value == "Spain"
+    assert 500 <= top_count <= 500 + 1000 / 10
+
+
+def test_approximate_trip_stats_reports(mocked_agency_repo, mocked_trip_dao, sample_trips):
+    mocked_trip_dao.iter_valid.return_value = iter(sample_trips)
+    stats = ApproximateTripStats.from_dao(mocked_agency_repo, mocked_trip_dao)
+
+    assert stats.trips_count == 3
+    assert stats.count_distinct_destinations() == 2
+    assert stats.find_country_with_max_trips() == [("Spain", 2)]
+    report = stats.mean_report_for_agencies()
+    assert report["TravelPlus"] == (Decimal("1250"), Decimal("1000.00"))
+    assert stats.price_quantiles_for_agencies([0.5])["GoHoliday"] == {0.5: Decimal("900.00")}
+
+
+def test_space_saving_evicts_the_least_counted_value():
+    counter = SpaceSaving(capacity=3)
+    for value in ["a", "a", "a", "b", "b", "c", "d", "e"]:
+        counter.add(value)
+    assert dict(counter.most_common()) == {"a": 3, "d": 2, "e": 3}  # c, then b (older than d) evicted
+
+
+def test_space_saving_matches_linear_eviction_on_long_streams():
+    rng = random.Random(7)
+    counter, expected = SpaceSaving(capacity=20), {}
+    for _ in range(5000):
+        value = rng.randrange(60)
+        counter.add(value)
+        if value in expected:
+            expected[value] += 1
+        elif len(expected) < 20:
+            expected[value] = 1
+        else:
+            minimum = min(expected.values())
+            expected[value] = expected.pop(next(v for v, c in expected.items() if c == minimum)) + 1
+    assert sorted(count for _, count in counter.most_common()) == sorted(expected.values())
+    assert len(counter._heap) <= 4 * counter.capacity
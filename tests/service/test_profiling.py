@@ -0,0 +1,42 @@
+from app.service.profiling import PROFILE_DIR_ENV, profiled
+
+
+@profiled
+def _inner():
+    return 1
+
+
+@profiled
+def _outer():
+    return _inner() + 1
+
+
+def test_profiled_without_env_does_not_write(monkeypatch, tmp_path):
+    monkeypatch.delenv(PROFILE_DIR_ENV, raising=False)
+    assert _outer() == 2
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_profiled_dumps_one_file_per_outer_call(monkeypatch, tmp_path):
+    monkeypatch.setenv(PROFILE_DIR_ENV, str(tmp_path))
+    assert _outer() == 2
+    [profile] = list(tmp_path.iterdir())
+    assert profile.name.startswith("_outer-")
+    assert profile.suffix == ".prof"
+
+
+def test_concurrent_calls_are_profiled_one_at_a_time(monkeypatch, tmp_path):
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    monkeypatch.setenv(PROFILE_DIR_ENV, str(tmp_path))
+    barrier = threading.Barrier(2, timeout=5)
+
+    @profiled
+    def report():
+        barrier.wait()
+        return 1
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        assert list(executor.map(lambda _: report(), range(2))) == [1, 1]
+    assert len(list(tmp_path.iterdir())) == 1
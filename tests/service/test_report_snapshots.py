@@ -0,0 +1,96 @@
+import pytest
+from unittest.mock import MagicMock
+from app.file_manager.snapshot_cache import SnapshotCache
+from app.service.report_snapshots import ReportSnapshots
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return SnapshotCache(str(tmp_path / "reports"))
+
+
+@pytest.fixture
+def versions():
+    return {"trips": 1, "agencies": ("agencies.txt", 10, 100)}
+
+
+def snapshots(cache, versions, service):
+    trip_dao, agency_repo = MagicMock(), MagicMock()
+    trip_dao.data_version.side_effect = lambda: versions["trips"]
+    agency_repo.data_version.side_effect = lambda: versions["agencies"]
+    factory = MagicMock(return_value=service)
+    return ReportSnapshots(factory, trip_dao, agency_repo, cache), factory
+
+
+@pytest.fixture
+def service():
+    service = MagicMock()
+    service.top_k_agencies_by_income.side_effect = lambda k: [("agency", k)]
+    service.top_k_countries.side_effect = lambda k: [("Spain", k)]
+    service.offer = {"agency": ["trip"]}
+    return service
+
+
+def test_unchanged_data_is_served_without_creating_the_service(cache, versions, service):
+    first, _ = snapshots(cache, versions, service)
+    assert first.report("top_k_agencies_by_income", k=3) == [("agency", 3)]
+    assert first.report("offer") == {"agency": ["trip"]}
+
+    second, factory = snapshots(cache, versions, service)
+    assert second.report("top_k_agencies_by_income", k=3) == [("agency", 3)]
+    assert second.report("offer") == {"agency": ["trip"]}
+    factory.assert_not_called()
+    assert service.top_k_agencies_by_income.call_count == 1
+
+
+def test_arguments_are_part_of_the_key(cache, versions, service):
+    reports, _ = snapshots(cache, versions, service)
+    assert reports.report("top_k_countries", k=1) == [("Spain", 1)]
+    assert reports.report("top_k_countries", k=2) == [("Spain", 2)]
+
+
+def test_only_reports_of_changed_inputs_are_recomputed(cache, versions, service):
+    reports, _ = snapshots(cache, versions, service)
+    reports.report("top_k_agencies_by_income", k=3)
+    reports.report("top_k_countries", k=3)
+
+    versions["agencies"] = ("agencies.txt", 11, 100)
+    reports, _ = snapshots(cache, versions, service)
+    reports.report("top_k_agencies_by_income", k=3)
+    reports.report("top_k_countries", k=3)
+    assert (service.top_k_agencies_by_income.call_count, service.top_k_countries.call_count) == (2, 1)
+
+    versions["trips"] = 2
+    reports, _ = snapshots(cache, versions, service)
+    reports.report("top_k_countries", k=3)
+    assert service.top_k_countries.call_count == 2
+
+
+def test_unknown_versions_and_object_arguments_are_not_cached(cache, versions, service):
+    versions["agencies"] = None
+    reports, _ = snapshots(cache, versions, service)
+    reports.report("top_k_agencies_by_income", k=3)
+    reports.report("top_k_agencies_by_income", k=3)
+    assert service.top_k_agencies_by_income.call_count == 2
+
+    countries = object()
+    reports.report("report_only_selected_countries_trips", countries=countries)
+    reports.report("report_only_selected_countries_trips", countries=countries)
+    assert service.report_only_selected_countries_trips.call_count == 2
+
+
+def test_data_versioned_arguments_are_keyed_by_their_version(cache, versions, service):
+    service.report_only_selected_countries_trips.side_effect = lambda countries: ["trip"]
+    countries = MagicMock()
+    countries.data_version.return_value = ("countries.txt", 10, 100)
+    reports, _ = snapshots(cache, versions, service)
+    reports.report("report_only_selected_countries_trips", countries=countries)
+
+    versions["agencies"] = ("agencies.txt", 11, 100)
+    reports, factory = snapshots(cache, versions, service)
+    assert reports.report("report_only_selected_countries_trips", countries=countries) == ["trip"]
+    factory.assert_not_called()
+
+    countries.data_version.return_value = ("countries.txt", 11, 100)
+    reports.report("report_only_selected_countries_trips", countries=countries)
+    assert service.report_only_selected_countries_trips.call_count == 2
@@ -1,9 +1,10 @@
 import pytest
+import time
 from decimal import Decimal
 from unittest.mock import MagicMock
-from app.model.agency import Agency
+from app.model.agency import Agency, AgencyRepo
 from app.service.agency_service import AgencyService
-from app.persistence.model import Trip
+from app.persistence.model import AgencyStats, Trip
 
 
 
@@ -85,4 +86,201 @@ def test_mean_price_for_empty_trips():
 def test_find_agency_with_max_trips_empty():
     service = AgencyService(agency_repo=MagicMock(), trip_db_dao=MagicMock(), offer={})
     result = service.find_agency_with_max_trips()
-    assert result == []
\ No newline at end of file
+    assert result == []
+
+def test_top_k_agencies_by_trips(service, sample_agencies):
+    result = service.top_k_agencies_by_trips(2)
+    assert result == [(sample_agencies[1], 2), (sample_agencies[2], 1)]
+
+
+def test_top_k_agencies_by_income(service, sample_agencies):
+    result = service.top_k_agencies_by_income(1)
+    assert [agency for agency, _ in result] == [sample_agencies[1]]
+
+
+def test_top_k_countries(service):
+    assert service.top_k_countries(5) == [("Spain", 2), ("Italy", 1)]
+    assert service.top_k_countries(0) == []
+
+
+def test_top_k_keeps_ties_at_boundary():
+    items = [("a", 3), ("b", 5), ("c", 3), ("d", 1)]
+    assert AgencyService._top_k(items, 2) == [("b", 5), ("a", 3), ("c", 3)]
+
+
+def test_mean_report_closest_trip_matches_linear_scan():
+    trips = [Trip(_id=i, _price=Decimal(price), _destination="Spain", _num_of_people=1, _agency_id=1)
+             for i, price in enumerate(["300", "100", "200", "100", "300"])]
+    mean_price = AgencyService._mean_price_for_trips(trips)
+    expected = min(trips, key=lambda trip: abs(trip.price - mean_price))
+    assert AgencyService._closest_to_price(trips, mean_price) is expected
+    assert AgencyService._closest_to_price(trips, Decimal("150")) is trips[1]
+    assert AgencyService._closest_to_price(trips, Decimal("999")) is trips[0]
+
+
+def test_select_returns_kth_smallest():
+    values = [5, 1, 4, 1, 3, 9, 2]
+    assert [AgencyService._select(values, k) for k in range(len(values))] == sorted(values)
+
+
+def test_percentile_report_for_agencies(service):
+    report = service.percentile_report_for_agencies((0, 50, 100))
+    assert report["TravelPlus"] == {0: Decimal("1000.00"), 50: Decimal("1000.00"), 100: Decimal("1500.00")}
+    assert service.median_report_for_agencies()["GoHoliday"] == Decimal("900.00")
+
+
+def test_percentile_report_for_destinations(service):
+    report = service.percentile_report_for_destinations((50,))
+    assert report == {"Spain": {50: Decimal("900.00")}, "Italy": {50: Decimal("1500.00")}}
+
+
+@pytest.fixture
+def summary_dao():
+    mock = MagicMock()
+    mock.is_available.return_value = True
+    mock.find_all.return_value = [AgencyStats(1, 2, Decimal("2500.00")), AgencyStats(2, 1, Decimal("900.00")),
+                                  AgencyStats(3, 0, Decimal("0.00"))]
+    mock.count_trips_per_countries.return_value = [("Spain", 5)]
+    mock.countries_with_max_trips_for_agency.return_value = [("Spain", 2, 4)]
+    return mock
+
+
+def test_reports_read_summary_tables_when_available(mocked_agency_repo, mocked_trip_dao, summary_dao, sample_agencies):
+    service = AgencyService(mocked_agency_repo, mocked_trip_dao, summary_dao=summary_dao)
+
+    assert service.top_k_agencies_by_trips(2) == [(sample_agencies[1], 2), (sample_agencies[2], 1)]
+    assert service.top_k_agencies_by_income(1) == [(sample_agencies[1], Decimal("2500.00") * Decimal("0.019"))]
+    assert service.top_k_countries(1) == [("Spain", 5)]
+    assert service.report_agencies_with_max_trips_for_each_country() == {"Spain": ["GoHoliday"]}
+    mocked_trip_dao.count_trips_per_countries.assert_not_called()
+
+
+def test_summary_results_match_trip_aggregation(service, mocked_agency_repo, mocked_trip_dao, summary_dao):
+    summarized = AgencyService(mocked_agency_repo, mocked_trip_dao, summary_dao=summary_dao)
+    assert summarized.top_k_agencies_by_trips(5) == service.top_k_agencies_by_trips(5)
+    assert summarized.top_k_agencies_by_income(5) == service.top_k_agencies_by_income(5)
+
+
+def test_summary_ties_are_broken_in_offer_order(mocked_agency_repo, mocked_trip_dao, summary_dao, sample_agencies):
+    mocked_trip_dao.find_all_valid.return_value = [
+        Trip(_id=1, _destination="Spain", _price=Decimal("100.00"), _num_of_people=1, _agency_id=2),
+        Trip(_id=2, _destination="Italy", _price=Decimal("100.00"), _num_of_people=1, _agency_id=1),
+    ]
+    summary_dao.find_all.return_value = [AgencyStats(1, 1, Decimal("100.00")), AgencyStats(2, 1, Decimal("100.00"))]
+    summarized = AgencyService(mocked_agency_repo, mocked_trip_dao, summary_dao=summary_dao)
+    aggregated = AgencyService(mocked_agency_repo, mocked_trip_dao)
+
+    assert summarized.top_k_agencies_by_trips(2) == aggregated.top_k_agencies_by_trips(2) == \
+           [(sample_agencies[2], 1), (sample_agencies[1], 1)]
+    assert summarized.top_k_agencies_by_income(2) == aggregated.top_k_agencies_by_income(2)
+
+
+def test_agency_summaries_are_read_once_with_the_offer(mocked_agency_repo, mocked_trip_dao, summary_dao, sample_agencies):
+    service = AgencyService(mocked_agency_repo, mocked_trip_dao, summary_dao=summary_dao)
+    summary_dao.find_all.return_value = [AgencyStats(2, 5, Decimal("9000.00"))]
+
+    assert service.top_k_agencies_by_trips(1) == [(sample_agencies[1], 2)]
+    assert service.find_agency_with_max_income() == [(sample_agencies[1], Decimal("2500.00") * Decimal("0.019"))]
+    summary_dao.find_all.assert_called_once()
+
+
+def test_missing_summary_tables_fall_back_to_trips(mocked_agency_repo, mocked_trip_dao, summary_dao):
+    summary_dao.is_available.return_value = False
+    service = AgencyService(mocked_agency_repo, mocked_trip_dao, summary_dao=summary_dao)
+
+    assert service.top_k_countries(1) == [("Spain", 2)]
+    summary_dao.find_all.assert_not_called()
+
+
+def test_db_agency_repo_names_are_joined_by_the_database(mocked_trip_dao):
+    from app.persistence.dao import AgencyDbRepo
+    agency_repo = MagicMock(spec=AgencyDbRepo)
+    mocked_trip_dao.countries_with_max_trips_for_agency_names.return_value = [("Spain", "TravelPlus", 1),
+                                                                              ("Spain", "GoHoliday", 1)]
+    service = AgencyService(agency_repo, mocked_trip_dao)
+
+    assert service.report_agencies_with_max_trips_for_each_country() == {"Spain": ["TravelPlus", "GoHoliday"]}
+    agency_repo.agency_name_for_id.assert_not_called()
+
+
+def test_report_rows_flatten_nested_reports(service, sample_agencies):
+    assert list(AgencyService._report_rows(service.find_agency_with_max_trips())) == [(1, "TravelPlus", 2)]
+    assert list(AgencyService._report_rows(service.report_agencies_with_max_trips_for_each_country())) == [
+        ("Spain", "TravelPlus"), ("Italy", "GoHoliday")]
+    assert list(AgencyService._report_rows({"TravelPlus": {50: Decimal("1000.00")}})) == [("TravelPlus", 50, Decimal("1000.00"))]
+
+    by_people = AgencyService._report_rows(service.report_trips_for_people_quantity())
+    assert (2, 1, "Spain", Decimal("1000.00"), 2, 1) in list(by_people)
+
+
+def test_write_report_passes_columns_and_rows(service, monkeypatch):
+    write_rows = MagicMock(return_value=2)
+    monkeypatch.setattr("app.service.agency_service.arrow_io.write_rows", write_rows)
+
+    assert service.write_report("top_k_countries", "countries.parquet", k=2) == 2
+
+    path, columns, rows, file_format = write_rows.call_args.args
+    assert (path, columns, list(rows), file_format) == ("countries.parquet", ("country", "trip_count"),
+                                                        [("Spain", 2), ("Italy", 1)], None)
+
+
+def test_write_report_fills_both_agency_columns_of_unknown_agencies(mocked_trip_dao, monkeypatch):
+    agency_repo = MagicMock()
+    agency_repo.get_by_id.side_effect = lambda agency_id: Agency(1, "A", "Warsaw") if agency_id == 1 else None
+    mocked_trip_dao.find_all_valid.return_value = [
+        Trip(_id=1, _destination="Spain", _price=Decimal("10"), _num_of_people=1, _agency_id=9),
+        Trip(_id=2, _destination="Spain", _price=Decimal("10"), _num_of_people=1, _agency_id=9),
+        Trip(_id=3, _destination="Italy", _price=Decimal("10"), _num_of_people=1, _agency_id=1)]
+    write_rows = MagicMock(return_value=2)
+    monkeypatch.setattr("app.service.agency_service.arrow_io.write_rows", write_rows)
+
+    AgencyService(agency_repo, mocked_trip_dao).write_report("top_k_agencies_by_trips", "agencies.parquet", k=5)
+
+    _, columns, rows, _ = write_rows.call_args.args
+    assert list(rows) == [(None, None, 2), (1, "A", 1)]
+    assert columns == ("agency_id", "agency", "trip_count")
+
+
+def test_write_report_rejects_unknown_report(service):
+    with pytest.raises(ValueError, match="Unknown report"):
+        service.write_report("__post_init__", "report.parquet")
+
+
+def test_sorted_prices_are_built_once_per_agency(service, sample_agencies, monkeypatch):
+    sort = MagicMock(side_effect=AgencyService._sorted_prices)
+    monkeypatch.setattr(AgencyService, "_sorted_prices", staticmethod(sort))
+
+    first = service.mean_report_for_agencies()
+    assert service.mean_report_for_agencies() == first
+    assert sort.call_count == len(service.offer)
+
+
+def test_reloaded_agencies_are_visible_through_the_service(tmp_path, mocked_trip_dao):
+    path = tmp_path / "agencies.txt"
+    path.write_text("1,TravelPlus,Warsaw\n2,GoHoliday,Krakow", encoding="utf-8")
+    repo = AgencyRepo(path, cache=None)
+    service = AgencyService(repo, mocked_trip_dao)
+    path.write_text("1,TravelPlus Premium,Warsaw\n2,GoHoliday,Krakow", encoding="utf-8")
+
+    service.on_agencies_changed(repo.reload())
+
+    assert service.find_agency_with_max_trips() == [(Agency(1, "TravelPlus Premium", "Warsaw"), 2)]
+    assert set(service.mean_report_for_agencies()) == {"TravelPlus Premium", "GoHoliday"}
+    assert [trip.id for trip in service.offer[Agency(1, "TravelPlus Premium", "Warsaw")]] == [1, 2]
+
+
+def test_watched_agencies_are_reloaded_into_the_offer(tmp_path, mocked_trip_dao):
+    path = tmp_path / "agencies.txt"
+    path.write_text("1,TravelPlus,Warsaw\n2,GoHoliday,Krakow", encoding="utf-8")
+    service = AgencyService(AgencyRepo(path, cache=None), mocked_trip_dao)
+
+    watcher = service.watch_agencies(interval=0.01)
+    try:
+        path.write_text("1,TravelPlus,Warsaw\n2,GoHoliday Tours,Krakow", encoding="utf-8")
+        deadline = time.monotonic() + 5
+        while Agency(2, "GoHoliday Tours", "Krakow") not in service.offer and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        watcher.stop()
+
+    assert service.top_k_agencies_by_trips(2)[1] == (Agency(2, "GoHoliday Tours", "Krakow"), 1)
@@ -0,0 +1,107 @@
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from app.model.agency import Agency
+from app.persistence.model import Trip
+from app.service.agency_service import AgencyService
+from app.service.sharding import ShardedExecution, agency_id_ranges
+
+TRIPS = [
+    Trip(_id=1, _destination="Spain", _price=Decimal("1000.00"), _num_of_people=2, _agency_id=3),
+    Trip(_id=2, _destination="Italy", _price=Decimal("1500.00"), _num_of_people=4, _agency_id=1),
+    Trip(_id=3, _destination="Spain", _price=Decimal("900.00"), _num_of_people=1, _agency_id=2),
+    Trip(_id=4, _destination="Malta", _price=Decimal("900.00"), _num_of_people=3, _agency_id=3),
+    Trip(_id=5, _destination="Spain", _price=Decimal("10.00"), _num_of_people=1, _agency_id=None),
+    Trip(_id=6, _destination="Italy", _price=Decimal("1200.00"), _num_of_people=2, _agency_id=1),
+]
+AGENCIES = {1: Agency(1, "TravelPlus", "Warsaw"), 2: Agency(2, "GoHoliday", "Krakow"), 3: Agency(3, "SunTrips", "Gdansk"),
+            None: Agency(0, "Unknown", "Unknown")}
+
+
+class FakeTripDao:
+    """Picklable stand-in for TripDbDao serving the trips above."""
+
+    def find_all_valid(self):
+        return list(TRIPS)
+
+    def agency_ids(self):
+        return [None, 1, 2, 3]
+
+    def find_all_valid_by_agency_range(self, first_agency_id, last_agency_id):
+        if first_agency_id is None:
+            return [trip for trip in TRIPS if trip.agency_id is None]
+        return [trip for trip in TRIPS if trip.agency_id is not None and first_agency_id <= trip.agency_id <= last_agency_id]
+
+
+class FakeTripDaoFactory:
+    def __call__(self):
+        return FakeTripDao()
+
+
+class FakeAgencyRepo:
+    def get_by_id(self, agency_id):
+        return AGENCIES.get(agency_id)
+
+
+def reports(service):
+    return (dict(service.offer), service.top_k_agencies_by_income(3), service.top_k_agencies_by_trips(3),
+            dict(service.mean_report_for_agencies()))
+
+
+@pytest.mark.parametrize("agency_ids, shards, expected", [
+    ([1, 2, 3, 4, 5], 2, [(1, 2), (3, 5)]),
+    ([5, 1, 3], 8, [(1, 1), (3, 3), (5, 5)]),
+    ([None, 2, 2, 7], 1, [(2, 7), (None, None)]),
+    ([], 4, []),
+])
+def test_agency_id_ranges(agency_ids, shards, expected):
+    assert agency_id_ranges(agency_ids, shards) == expected
+
+
+def test_sharded_reports_match_single_process_reports():
+    sharding = ShardedExecution(FakeTripDaoFactory(), shards=2, executor=ThreadPoolExecutor(2))
+    sharded = AgencyService(FakeAgencyRepo(), FakeTripDao(), sharding=sharding)
+    plain = AgencyService(FakeAgencyRepo(), FakeTripDao())
+
+    assert reports(sharded) == reports(plain)
+    assert list(sharded.offer) == list(plain.offer)
+
+
+def test_agency_ids_mapped_to_the_same_agency_are_merged():
+    repo = FakeAgencyRepo()
+    repo.get_by_id = lambda agency_id: AGENCIES[1] if agency_id in (1, 2) else AGENCIES.get(agency_id)
+    sharding = ShardedExecution(FakeTripDaoFactory(), shards=3, executor=ThreadPoolExecutor(3))
+    sharded = AgencyService(repo, FakeTripDao(), sharding=sharding)
+    plain = AgencyService(repo, FakeTripDao())
+
+    assert [trip.id for trip in sharded.offer[AGENCIES[1]]] == [2, 3, 6]
+    assert reports(sharded) == reports(plain)
+
+
+def test_shards_run_in_worker_processes():
+    sharded = AgencyService(FakeAgencyRepo(), FakeTripDao(), sharding=ShardedExecution(FakeTripDaoFactory(), shards=2))
+    assert reports(sharded) == reports(AgencyService(FakeAgencyRepo(), FakeTripDao()))
+
+
+def test_shards_connect_like_the_service_dao():
+    from unittest.mock import MagicMock
+    from app.persistence.connection import LazyConnectionPool, MySQLConnectionPoolBuilder
+    from app.persistence.dao import TripDbDao
+    from app.service.sharding import TripDaoFactory
+
+    pool = LazyConnectionPool(MySQLConnectionPoolBuilder.builder().port(3310).database("reports"))
+    executor = MagicMock()
+    executor.map.return_value = []
+
+    ShardedExecution(shards=1, executor=executor).map(MagicMock(), [1], TripDbDao(pool))
+
+    factory = next(executor.map.call_args.args[1])
+    assert isinstance(factory, TripDaoFactory)
+    assert {key: factory.pool_params[key] for key in ("port", "database", "host")} == {
+        "port": 3310, "database": "reports", "host": "localhost"}
+    assert pool._pool is None  # the configuration is read without connecting
+
+
+def test_sharding_needs_a_dao_factory_or_a_dao():
+    with pytest.raises(ValueError, match="trip_dao_factory"):
+        ShardedExecution(shards=1, executor=ThreadPoolExecutor(1)).map(lambda *_: None, [1])
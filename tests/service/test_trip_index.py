@@ -0,0 +1,52 @@
+from decimal import Decimal
+from app.service.trip_index import TripIndex
+from app.persistence.model import Trip
+
+
+def test_query_without_filters_returns_all(sample_trips):
+    index = TripIndex(sample_trips)
+    assert index.query() == sample_trips
+    assert len(index) == 3
+
+
+def test_query_by_destination(sample_trips):
+    index = TripIndex(sample_trips)
+    result = index.query(destination="Spain")
+    assert [trip.id for trip in result] == [1, 3]
+
+
+def test_query_combined_filters(sample_trips):
+    index = TripIndex(sample_trips)
+    result = index.query(destination="Spain", agency_id=2, max_price=Decimal("1000"))
+    assert [trip.id for trip in result] == [3]
+
+
+def test_query_price_range_is_inclusive(sample_trips):
+    index = TripIndex(sample_trips)
+    result = index.query(min_price=Decimal("900.00"), max_price=Decimal("1000.00"))
+    assert [trip.id for trip in result] == [1, 3]
+
+
+def test_query_unknown_key_returns_empty(sample_trips):
+    index = TripIndex(sample_trips)
+    assert index.query(agency_id=99) == []
+    assert index.count(destination="Italy", num_of_people=4) == 1
+
+
+def test_from_dao(mocked_trip_dao, sample_trips):
+    index = TripIndex.from_dao(mocked_trip_dao)
+    assert index.trips == sample_trips
+    mocked_trip_dao.find_all_valid.assert_called_once()
+
+
+def test_query_matches_linear_scan():
+    trips = [
+        Trip(_id=i, _destination=("Spain", "Italy", "France")[i % 3], _price=Decimal(100 + (i * 37) % 900),
+             _num_of_people=i % 5, _agency_id=i % 4)
+        for i in range(200)
+    ]
+    index = TripIndex(trips)
+    result = index.query(destination="Italy", agency_id=3, min_price=Decimal("300"), max_price=Decimal("700"))
+    expected = [trip for trip in trips
+                if trip.destination == "Italy" and trip.agency_id == 3 and Decimal("300") <= trip.price <= Decimal("700")]
+    assert result == expected